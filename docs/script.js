@@ -23,6 +23,7 @@ window.addEventListener('scroll', () => {
     if (now - lastScrollTime >= throttleDelay) {
         lastScrollTime = now;
         const navbar = document.querySelector('.navbar');
+        if (!navbar) return;
         if (window.scrollY > 50) {
             navbar.classList.add('bg-dark', 'shadow');
         } else {
@@ -33,6 +34,7 @@ window.addEventListener('scroll', () => {
 
 // Initialize tooltips
 const initTooltips = () => {
+    if (typeof bootstrap === 'undefined') return;
     const tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
     tooltipTriggerList.map(tooltipTriggerEl => new bootstrap.Tooltip(tooltipTriggerEl));
 };
@@ -94,6 +96,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
 // Add scroll to top button functionality
 const createScrollTopButton = () => {
+    if (!document.querySelector('.navbar')) return;
     const button = document.createElement('button');
     button.innerHTML = '<i class="fas fa-arrow-up"></i>';
     button.className = 'scroll-top-btn';
@@ -116,3 +119,322 @@ const createScrollTopButton = () => {
 };
 
 createScrollTopButton();
+
+// Client-side charts from visualizations/chart_data.{json,bin}, written by
+// `python chart_data.py`: a few KB of quantized, delta-coded series instead of
+// megabytes of GIF. Any <canvas data-chart="supply"> is drawn and animated.
+const CHART_DATA_BASE = 'visualizations/';
+
+const inflate = async (bytes) => {
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'));
+    return new Uint8Array(await new Response(stream).arrayBuffer());
+};
+
+const halfToFloat = (h) => {
+    const exponent = (h >> 10) & 0x1f;
+    const fraction = h & 0x3ff;
+    const sign = h & 0x8000 ? -1 : 1;
+    if (exponent === 0) return sign * fraction * 2 ** -24;
+    if (exponent === 31) return fraction ? NaN : sign * Infinity;
+    return sign * (1 + fraction / 1024) * 2 ** (exponent - 15);
+};
+
+// Inverse of chart_data.encode(): a Float64Array of rows * cols values
+const decodeSeries = (bytes, entry) => {
+    const [rows, cols] = entry.shape;
+    const scale = entry.max - entry.min;
+    const out = new Float64Array(rows * cols);
+    const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+    if (entry.encoding === 'f16') {
+        for (let i = 0; i < out.length; i++) {
+            out[i] = entry.min + halfToFloat(view.getUint16(2 * i, true)) * scale;
+        }
+        return out;
+    }
+    const delta = entry.dtype === 'int8' ? (i) => view.getInt8(i) : (i) => view.getUint16(2 * i, true);
+    const q = new Int32Array(rows * cols);
+    let start = 0;
+    for (let r = 0; r < rows; r++) {
+        const row = r * cols;
+        start = (start + delta(row)) & 0xffff;
+        q[row] = start;
+        for (let c = 1; c < cols; c++) q[row + c] = delta(row + c);
+        for (let pass = 0; pass < entry.order; pass++) {
+            for (let c = 1; c < cols; c++) q[row + c] = (q[row + c] + q[row + c - 1]) & 0xffff;
+        }
+    }
+    for (let i = 0; i < out.length; i++) out[i] = entry.min + q[i] * scale / 65535;
+    return out;
+};
+
+const loadChartData = async (base = CHART_DATA_BASE) => {
+    const index = await (await fetch(base + 'chart_data.json')).json();
+    const data = new Uint8Array(await (await fetch(base + index.data)).arrayBuffer());
+    const series = {};
+    for (const [name, entry] of Object.entries(index.series)) {
+        let bytes = data.subarray(entry.offset, entry.offset + entry.bytes);
+        if (entry.compression === 'deflate') bytes = await inflate(bytes);
+        series[name] = { entry, values: decodeSeries(bytes, entry), cols: entry.shape[1] };
+    }
+    return { index, series };
+};
+
+// x values of an evenly spaced axis ({start, stop, num}) or per-frame steps
+const axisValue = (axis, i) => axis.step !== undefined
+    ? axis.start + i * axis.step
+    : axis.start + (axis.stop - axis.start) * i / (axis.num - 1);
+
+const formatTick = (value, format) => format === 'billions'
+    ? `${(value / 1e9).toFixed(1)}B`
+    : Math.abs(value) >= 1e4 ? value.toExponential(1) : String(+value.toFixed(2));
+
+const drawChart = (canvas, chart, data, frame) => {
+    const ctx = canvas.getContext('2d');
+    const { width, height } = canvas;
+    const box = { left: 80, right: width - 20, top: 36, bottom: height - 50 };
+    const [x0, x1] = chart.xlim;
+    const [y0, y1] = chart.ylim;
+    const px = (x) => box.left + (x - x0) / (x1 - x0) * (box.right - box.left);
+    const py = (y) => box.bottom - (y - y0) / (y1 - y0) * (box.bottom - box.top);
+    const row = (name, fr) => {
+        const { values, cols } = data.series[name];
+        const r = Math.min(fr, values.length / cols - 1);
+        return values.subarray(r * cols, (r + 1) * cols);
+    };
+    const trace = (name, fr) => {
+        const ys = row(name, fr);
+        const axis = data.series[name].entry.x;
+        ctx.beginPath();
+        ys.forEach((y, i) => (i ? ctx.lineTo : ctx.moveTo).call(ctx, px(axisValue(axis, i)), py(y)));
+    };
+
+    ctx.fillStyle = '#ffffff';
+    ctx.fillRect(0, 0, width, height);
+    ctx.strokeStyle = 'rgba(0, 0, 0, 0.3)';
+    ctx.fillStyle = '#000000';
+    ctx.font = '12px sans-serif';
+    ctx.lineWidth = 1;
+    for (let i = 0; i <= 5; i++) {
+        const x = x0 + (x1 - x0) * i / 5;
+        const y = y0 + (y1 - y0) * i / 5;
+        ctx.beginPath();
+        ctx.moveTo(px(x), box.top);
+        ctx.lineTo(px(x), box.bottom);
+        ctx.moveTo(box.left, py(y));
+        ctx.lineTo(box.right, py(y));
+        ctx.stroke();
+        ctx.textAlign = 'center';
+        ctx.fillText(formatTick(x), px(x), box.bottom + 16);
+        ctx.textAlign = 'right';
+        ctx.fillText(formatTick(y, chart.yformat), box.left - 6, py(y) + 4);
+    }
+
+    if (chart.kind === 'line') {
+        trace(chart.series[0], frame);
+        ctx.strokeStyle = chart.color;
+        ctx.lineWidth = 2;
+        ctx.stroke();
+    } else if (chart.kind === 'bands') {
+        const layers = chart.series.map((name) => row(name, frame));
+        const axis = data.series[chart.series[0]].entry.x;
+        const lower = new Float64Array(layers[0].length);
+        layers.forEach((layer, k) => {
+            const upper = lower.map((y, i) => y + layer[i]);
+            ctx.beginPath();
+            upper.forEach((y, i) => ctx.lineTo(px(axisValue(axis, i)), py(y)));
+            for (let i = lower.length - 1; i >= 0; i--) ctx.lineTo(px(axisValue(axis, i)), py(lower[i]));
+            ctx.fillStyle = chart.colors[k];
+            ctx.fill();
+            lower.set(upper);
+        });
+    } else if (chart.kind === 'path') {
+        trace(chart.curve, 0);
+        ctx.strokeStyle = chart.colors[0];
+        ctx.lineWidth = 2;
+        ctx.stroke();
+        if (chart.hline) {
+            ctx.setLineDash([6, 4]);
+            ctx.strokeStyle = 'rgba(0, 128, 0, 0.5)';
+            ctx.beginPath();
+            ctx.moveTo(box.left, py(chart.hline[0]));
+            ctx.lineTo(box.right, py(chart.hline[0]));
+            ctx.stroke();
+            ctx.setLineDash([]);
+        }
+        const path = data.series[chart.path];
+        ctx.fillStyle = chart.colors[1];
+        ctx.beginPath();
+        ctx.arc(px(axisValue(path.entry.x, frame)), py(row(chart.path, frame)[0]), 6, 0, 2 * Math.PI);
+        ctx.fill();
+    }
+
+    const labels = chart.labels || (chart.hline ? [chart.hline[1]] : []);
+    labels.forEach((label, k) => {
+        ctx.fillStyle = chart.colors ? chart.colors[k] : 'rgba(0, 128, 0, 0.5)';
+        ctx.fillRect(box.right - 150, box.top + 8 + 18 * k, 14, 10);
+        ctx.fillStyle = '#000000';
+        ctx.textAlign = 'left';
+        ctx.fillText(label, box.right - 130, box.top + 17 + 18 * k);
+    });
+
+    const frames = chart.series
+        ? data.series[chart.series[0]].entry.frames
+        : data.series[chart.path].entry.frames;
+    const title = frames
+        ? chart.title.replace('{frame}', axisValue(frames, frame).toFixed(frames.decimals))
+        : chart.title;
+    ctx.textAlign = 'center';
+    ctx.font = '14px sans-serif';
+    ctx.fillText(title, (box.left + box.right) / 2, box.top - 12);
+    ctx.font = '12px sans-serif';
+    ctx.fillText(chart.xlabel, (box.left + box.right) / 2, height - 14);
+    ctx.save();
+    ctx.translate(16, (box.top + box.bottom) / 2);
+    ctx.rotate(-Math.PI / 2);
+    ctx.fillText(chart.ylabel, 0, 0);
+    ctx.restore();
+};
+
+// Draw every <canvas data-chart> and loop its frames while it is on screen
+const animateCharts = async () => {
+    const canvases = [...document.querySelectorAll('canvas[data-chart]')];
+    if (!canvases.length || typeof DecompressionStream === 'undefined') return;
+    let data;
+    try {
+        data = await loadChartData(canvases[0].dataset.chartBase || CHART_DATA_BASE);
+    } catch (error) {
+        return; // no export on this deployment; the canvases stay blank
+    }
+    const visible = new Set();
+    const observer = new IntersectionObserver((entries) => {
+        entries.forEach((entry) => (entry.isIntersecting ? visible.add : visible.delete)
+            .call(visible, entry.target));
+    });
+    canvases.forEach((canvas) => {
+        drawChart(canvas, data.index.charts[canvas.dataset.chart], data, 0);
+        observer.observe(canvas);
+    });
+    const interval = 1000 / data.index.fps;
+    let last = 0;
+    let frame = 0;
+    const tick = (now) => {
+        if (now - last >= interval) {
+            last = now;
+            frame = (frame + 1) % data.index.frames;
+            visible.forEach((canvas) => drawChart(canvas, data.index.charts[canvas.dataset.chart],
+                                                   data, frame));
+        }
+        requestAnimationFrame(tick);
+    };
+    requestAnimationFrame(tick);
+};
+
+document.addEventListener('DOMContentLoaded', animateCharts);
+
+// Live series pushed by visualizations/live_dashboard.py over Server-Sent
+// Events. Open the page as index.html?live when the dashboard serves it, or
+// as ?live=http://127.0.0.1:8766 from elsewhere; otherwise nothing connects.
+const LIVE_CHARTS = {
+    supply: { title: 'Live Supply', series: ['supply'], colors: ['#0000ff'],
+              labels: ['Total Supply'], ylabel: 'Tokens' },
+    burn: { title: 'Live Burn and Marketing Fees', series: ['burned', 'fees'],
+            colors: ['#e74c3c', '#9333ea'], labels: ['Burned', 'Marketing'], ylabel: 'Tokens' },
+    transfers: { title: 'Transfers per Hour', series: ['transfers'], colors: ['#2ecc71'],
+                 labels: ['Transfers'], ylabel: 'Transfers' },
+    rejections: { title: 'Rate-Limit Rejections per Hour', series: ['cooldown', 'daily', 'combined'],
+                  colors: ['#f39c12', '#3498db', '#e74c3c'], labels: ['Cooldown', 'Daily', 'Combined'],
+                  ylabel: 'Rejected Transfers' },
+};
+
+const drawLiveChart = (canvas, chart, live) => {
+    const ctx = canvas.getContext('2d');
+    const { width, height } = canvas;
+    const box = { left: 80, right: width - 20, top: 36, bottom: height - 50 };
+    const hours = live.hours || [];
+    const columns = chart.series.map((name) => live[name] || []);
+    const x0 = hours[0] || 0;
+    const x1 = Math.max(hours[hours.length - 1] || 0, x0 + 3600);
+    const y1 = Math.max(1, ...columns.map((ys) => ys.reduce((a, b) => Math.max(a, b), 0))) * 1.1;
+    const px = (x) => box.left + (x - x0) / (x1 - x0) * (box.right - box.left);
+    const py = (y) => box.bottom - y / y1 * (box.bottom - box.top);
+
+    ctx.fillStyle = '#ffffff';
+    ctx.fillRect(0, 0, width, height);
+    ctx.strokeStyle = 'rgba(0, 0, 0, 0.3)';
+    ctx.fillStyle = '#000000';
+    ctx.font = '12px sans-serif';
+    ctx.lineWidth = 1;
+    for (let i = 0; i <= 5; i++) {
+        const x = x0 + (x1 - x0) * i / 5;
+        const y = y1 * i / 5;
+        ctx.beginPath();
+        ctx.moveTo(px(x), box.top);
+        ctx.lineTo(px(x), box.bottom);
+        ctx.moveTo(box.left, py(y));
+        ctx.lineTo(box.right, py(y));
+        ctx.stroke();
+        ctx.textAlign = 'center';
+        ctx.fillText(new Date(x * 1000).toISOString().slice(5, 16).replace('T', ' '),
+                     px(x), box.bottom + 16);
+        ctx.textAlign = 'right';
+        ctx.fillText(formatTick(y, y >= 1e8 ? 'billions' : undefined), box.left - 6, py(y) + 4);
+    }
+
+    columns.forEach((ys, k) => {
+        ctx.beginPath();
+        ys.forEach((y, i) => (i ? ctx.lineTo : ctx.moveTo).call(ctx, px(hours[i]), py(y)));
+        ctx.strokeStyle = chart.colors[k];
+        ctx.lineWidth = 2;
+        ctx.stroke();
+        ctx.fillStyle = chart.colors[k];
+        ctx.fillRect(box.right - 150, box.top + 8 + 18 * k, 14, 10);
+        ctx.fillStyle = '#000000';
+        ctx.textAlign = 'left';
+        ctx.fillText(chart.labels[k], box.right - 130, box.top + 17 + 18 * k);
+    });
+
+    ctx.textAlign = 'center';
+    ctx.font = '14px sans-serif';
+    ctx.fillText(chart.title, (box.left + box.right) / 2, box.top - 12);
+    ctx.font = '12px sans-serif';
+    ctx.fillText('Hour (UTC)', (box.left + box.right) / 2, height - 14);
+    ctx.save();
+    ctx.translate(16, (box.top + box.bottom) / 2);
+    ctx.rotate(-Math.PI / 2);
+    ctx.fillText(chart.ylabel, 0, 0);
+    ctx.restore();
+};
+
+// Keep a copy of the series, patch it with each delta and redraw once per frame
+const liveCharts = () => {
+    const params = new URLSearchParams(window.location.search);
+    const section = document.getElementById('liveCharts');
+    if (!params.has('live') || !section || typeof EventSource === 'undefined') return;
+    const canvases = [...section.querySelectorAll('canvas[data-live]')];
+    const live = {};
+    let pending = false;
+    const redraw = () => {
+        pending = false;
+        canvases.forEach((canvas) => drawLiveChart(canvas, LIVE_CHARTS[canvas.dataset.live], live));
+    };
+    const apply = (event) => {
+        const update = JSON.parse(event.data);
+        Object.entries(update).forEach(([name, values]) => {
+            if (!Array.isArray(values)) return;
+            const series = event.type === 'snapshot' || !live[name] ? [] : live[name];
+            values.forEach((value, i) => { series[update.start + i] = value; });
+            series.length = update.start + values.length;
+            live[name] = series;
+        });
+        section.hidden = false;
+        if (!pending) {
+            pending = true;
+            requestAnimationFrame(redraw);
+        }
+    };
+    const source = new EventSource((params.get('live') || '').replace(/\/$/, '') + '/events');
+    source.addEventListener('snapshot', apply);
+    source.addEventListener('delta', apply);
+};
+
+document.addEventListener('DOMContentLoaded', liveCharts);
@@ -0,0 +1,252 @@
+import argparse
+import time
+
+import numpy as np
+
+import tokenomics_model as model
+
+# Constant-product (x * y = k) pool trading MemePi against ETH, with the
+# token's fee-on-transfer hook, to check the arctan price-impact model.
+#
+# Every MemePi transfer that is not a mint or burn charges the recipient a
+# burn of BURN_RATE and a marketing fee of MARKETING_RATE. A sell sends
+# tokens to the pair, so the pair pays both fees and its reserve grows by
+# (1 - b - m) of the amount (swapExactTokensForETHSupportingFeeOnTransferTokens
+# prices the balance actually received). A buy sends tokens from the pair,
+# so the buyer pays them. The marketing transfer is itself charged, which
+# burns b * m / (1 - m) more per token moved (see supply_simulator's
+# cascade). The pair keeps a SWAP_FEE of every input, as in Uniswap V2.
+#
+# Trades against the same starting reserves are independent and broadcast
+# (sell, buy, impact_curves). A sequence of trades is not: each one prices
+# against the reserves the last one left. simulate() walks the reserves in
+# a plain loop over Python floats, which is the fastest option here (a
+# vectorized scan needs several passes, as the swap fee moves k), and then
+# derives what each trade moved from the reserves before it, vectorized.
+
+SELL, BUY = 0, 1
+SWAP_FEE = 0.003
+POOL_TOKENS = 0.05 * model.INITIAL_SUPPLY
+POOL_ETH = 1000.0
+BUY_LIMIT = 0.8  # largest share of the token reserve one buy curve point removes
+
+
+def transfer_fees(amount, burn_rate=model.BURN_RATE, marketing_rate=model.MARKETING_RATE):
+    """(burned, marketing wallet's net gain) when `amount` tokens are transferred"""
+    burned = amount * burn_rate / (1 - marketing_rate)
+    return burned, amount * (burn_rate + marketing_rate) - burned
+
+
+def sell(tokens, eth, amount, burn_rate=model.BURN_RATE, marketing_rate=model.MARKETING_RATE,
+         swap_fee=SWAP_FEE):
+    """Sell `amount` tokens into a pool: (token reserve, ETH reserve, ETH to the seller)"""
+    net = amount * (1 - burn_rate - marketing_rate)
+    out = eth * (1 - swap_fee) * net / (tokens + (1 - swap_fee) * net)
+    return tokens + net, eth - out, out
+
+
+def buy(tokens, eth, amount, swap_fee=SWAP_FEE):
+    """Buy with `amount` ETH: (token reserve, ETH reserve, tokens leaving the pool)"""
+    out = tokens * (1 - swap_fee) * amount / (eth + (1 - swap_fee) * amount)
+    return tokens - out, eth + amount, out
+
+
+class AmmTrace:
+    """Reserves after every trade and what each trade moved"""
+
+    def __init__(self, kinds, amounts, token_reserve, eth_reserve, pool_tokens, received,
+                 burned, marketing, initial):
+        self.kinds = kinds
+        self.amounts = amounts  # tokens sold, or ETH paid
+        self.token_reserve = token_reserve
+        self.eth_reserve = eth_reserve
+        self.pool_tokens = pool_tokens  # tokens into (net of fees) or out of the pool
+        self.received = received  # ETH to a seller, tokens to a buyer after fees
+        self.burned = burned
+        self.marketing = marketing
+        self.initial = initial  # (token reserve, ETH reserve) before the first trade
+
+    def before(self):
+        """(token reserve, ETH reserve) before every trade"""
+        return (np.concatenate([[self.initial[0]], self.token_reserve[:-1]]),
+                np.concatenate([[self.initial[1]], self.eth_reserve[:-1]]))
+
+    def price_moves(self):
+        """Relative change of the pool price (ETH per token) caused by each trade"""
+        tokens, eth = self.before()
+        return (self.eth_reserve / self.token_reserve) / (eth / tokens) - 1
+
+    def size_ratios(self):
+        """Tokens each trade moved through the pool, relative to its token reserve"""
+        tokens, _ = self.before()
+        gross = np.where(self.kinds == SELL, self.amounts, self.pool_tokens)
+        return gross / tokens
+
+
+def simulate(kinds, amounts, tokens=POOL_TOKENS, eth=POOL_ETH, burn_rate=model.BURN_RATE,
+             marketing_rate=model.MARKETING_RATE, swap_fee=SWAP_FEE):
+    """Execute trades in order; kinds are SELL (amount in tokens) or BUY (amount in ETH)"""
+    kinds = np.asarray(kinds, dtype=np.int8)
+    amounts = np.asarray(amounts, dtype=float)
+    if kinds.shape != amounts.shape or kinds.ndim != 1:
+        raise ValueError('kinds and amounts must be 1-D and of the same length')
+    if not np.isin(kinds, (SELL, BUY)).all():
+        raise ValueError('kinds must be SELL or BUY')
+    if not (np.isfinite(amounts) & (amounts >= 0)).all():
+        raise ValueError('amounts must be finite and non-negative')
+    selling = kinds == SELL
+    net_in = np.where(selling, amounts * (1 - burn_rate - marketing_rate), amounts)
+    initial = (float(tokens), float(eth))
+    tokens, eth = initial
+    gamma = 1 - swap_fee
+    token_reserve, eth_reserve = [], []
+    for is_sell, amount in zip(selling.tolist(), net_in.tolist()):
+        if is_sell:
+            eth -= eth * gamma * amount / (tokens + gamma * amount)
+            tokens += amount
+        else:
+            tokens -= tokens * gamma * amount / (eth + gamma * amount)
+            eth += amount
+        token_reserve.append(tokens)
+        eth_reserve.append(eth)
+    token_reserve, eth_reserve = np.array(token_reserve), np.array(eth_reserve)
+
+    # Each trade again from the reserves before it, rather than as a difference of
+    # large reserves, which would lose the precision of the smallest trades
+    prior_tokens = np.r_[initial[0], token_reserve[:-1]]
+    prior_eth = np.r_[initial[1], eth_reserve[:-1]]
+    eth_out = sell(prior_tokens, prior_eth, amounts, burn_rate, marketing_rate, swap_fee)[2]
+    tokens_out = buy(prior_tokens, prior_eth, amounts, swap_fee)[2]
+    pool_tokens = np.where(selling, net_in, tokens_out)
+    received = np.where(selling, eth_out, tokens_out * (1 - burn_rate - marketing_rate))
+    burned, marketing = transfer_fees(np.where(selling, amounts, pool_tokens),
+                                      burn_rate, marketing_rate)
+    return AmmTrace(kinds, amounts, token_reserve, eth_reserve, pool_tokens, received,
+                    burned, marketing, initial)
+
+
+def simulate_reference(kinds, amounts, tokens=POOL_TOKENS, eth=POOL_ETH,
+                       burn_rate=model.BURN_RATE, marketing_rate=model.MARKETING_RATE,
+                       swap_fee=SWAP_FEE):
+    """Trade-by-trade Python loop, used to check simulate(); returns the final reserves"""
+    received = []
+    for kind, amount in zip(kinds, amounts):
+        if kind == SELL:
+            tokens, eth, out = sell(tokens, eth, amount, burn_rate, marketing_rate, swap_fee)
+        else:
+            tokens, eth, out = buy(tokens, eth, amount, swap_fee)
+            out *= 1 - burn_rate - marketing_rate
+        received.append(out)
+    return tokens, eth, received
+
+
+def synthetic_trades(n, seed=0, tokens=POOL_TOKENS, eth=POOL_ETH, sigma=2.5):
+    """Half sells, half buys; lognormal sizes around 0.01% of the reserves, heavy tailed"""
+    rng = np.random.default_rng(seed)
+    kinds = rng.integers(0, 2, n).astype(np.int8)
+    scale = rng.lognormal(np.log(1e-4) - sigma ** 2 / 2, sigma, n)
+    return kinds, scale * np.where(kinds == SELL, tokens, eth)
+
+
+class ImpactCurves:
+    """Price moves of single trades against a fresh pool, by size / token reserve"""
+
+    def __init__(self, ratio, sell, sell_cost, buy_ratio, buy, fitted_k, rms):
+        self.ratio = ratio
+        self.sell = sell  # drop of the pool price after a sell
+        self.sell_cost = sell_cost  # ETH short of selling at the spot price, fees included
+        self.buy_ratio = buy_ratio
+        self.buy = buy  # rise of the pool price after a buy
+        self.fitted_k = fitted_k  # least-squares k in k * arctan(v/L) for sells
+        self.rms = rms  # of that fit
+        self.trades = None  # trade_impact() of a simulation
+
+
+def impact_curves(ratio=None, burn_rate=model.BURN_RATE, marketing_rate=model.MARKETING_RATE,
+                  swap_fee=SWAP_FEE):
+    """Empirical counterparts of model.impact_curves(), one independent trade per ratio"""
+    if ratio is None:
+        ratio = model.impact_curves()[0]
+    ratio = np.asarray(ratio, dtype=float)
+    tokens, eth, out = sell(1.0, 1.0, ratio, burn_rate, marketing_rate, swap_fee)
+    sell_move = 1 - eth / tokens
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sell_cost = np.where(ratio > 0, 1 - out / ratio, burn_rate + marketing_rate)
+
+    buy_ratio = ratio[ratio <= BUY_LIMIT]
+    # ETH that takes buy_ratio of the token reserve out of a (1, 1) pool
+    tokens, eth, _ = buy(1.0, 1.0, buy_ratio / ((1 - buy_ratio) * (1 - swap_fee)), swap_fee)
+    buy_move = eth / tokens - 1
+
+    shape = np.arctan(ratio)
+    fitted_k = float(shape @ sell_move / (shape @ shape))
+    rms = float(np.sqrt(np.mean((fitted_k * shape - sell_move) ** 2)))
+    return ImpactCurves(ratio, sell_move, sell_cost, buy_ratio, buy_move, fitted_k, rms)
+
+
+def trade_impact(trace, bins=30, low=1e-3, high=5.0):
+    """{SELL: (ratios, median |price move|), BUY: ...} of simulated trades, by size / reserve"""
+    ratio, moves = trace.size_ratios(), np.abs(trace.price_moves())
+    edges = np.geomspace(low, high, bins + 1)
+    result = {}
+    for kind in (SELL, BUY):
+        mine = trace.kinds == kind
+        which = np.digitize(ratio[mine], edges) - 1
+        inside = (which >= 0) & (which < bins)
+        order = np.argsort(which[inside], kind='stable')
+        grouped, values = which[inside][order], moves[mine][inside][order]
+        starts = np.searchsorted(grouped, np.arange(bins))
+        stops = np.searchsorted(grouped, np.arange(bins), side='right')
+        filled = stops - starts >= 5
+        centres = np.sqrt(edges[:-1] * edges[1:])[filled]
+        result[kind] = (centres, np.array([np.median(values[lo:hi])
+                                           for lo, hi in zip(starts[filled], stops[filled])]))
+    return result
+
+
+def empirical_impact(trades=10**6, seed=0):
+    """impact_curves() plus the binned price moves of a synthetic simulate() run"""
+    curves = impact_curves()
+    curves.trades = trade_impact(simulate(*synthetic_trades(trades, seed)))
+    return curves
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Constant-product pool with MemePi transfer fees')
+    parser.add_argument('-n', '--trades', type=int, default=10**6)
+    parser.add_argument('--check', type=int, default=50_000,
+                        help='trades to verify against the trade-by-trade Python loop')
+    parser.add_argument('--plot', action='store_true',
+                        help='overlay the empirical curves on price_impact.svg')
+    args = parser.parse_args()
+
+    kinds, amounts = synthetic_trades(args.trades)
+    m = min(args.check, args.trades)
+    start = time.perf_counter()
+    tokens, eth, received = simulate_reference(kinds[:m].tolist(), amounts[:m].tolist())
+    reference_rate = m / (time.perf_counter() - start)
+    trace = simulate(kinds[:m], amounts[:m])
+    errors = [abs(trace.token_reserve[-1] / tokens - 1), abs(trace.eth_reserve[-1] / eth - 1),
+              np.max(np.abs(trace.received / received - 1))]
+    print(f'{m:,} trades vs. Python loop: reserve error {max(errors[:2]):.1e}, '
+          f'worst trade error {errors[2]:.1e}')
+
+    start = time.perf_counter()
+    trace = simulate(kinds, amounts)
+    elapsed = time.perf_counter() - start
+    print(f'{args.trades:,} trades in {elapsed:.2f}s ({args.trades / elapsed:,.0f} trades/s, '
+          f'Python loop: {reference_rate:,.0f} trades/s)')
+    print(f'reserves {trace.token_reserve[-1]:,.0f} tokens / {trace.eth_reserve[-1]:,.2f} ETH, '
+          f'burned {trace.burned.sum():,.0f}, marketing {trace.marketing.sum():,.0f} tokens')
+
+    curves = impact_curves()
+    model_impact = model.price_impact(curves.ratio)
+    print(f'sell price drop at v/L = 1: {np.interp(1, curves.ratio, curves.sell):.3f} '
+          f'(model {model.price_impact(1.0):.3f}); at v/L = 5: {curves.sell[-1]:.3f} '
+          f'(model {model_impact[-1]:.3f})')
+    print(f'best k for sells: {curves.fitted_k:.3f} (model {model.IMPACT_SCALE:.3f}), '
+          f'rms {curves.rms:.3f}')
+    if args.plot:
+        import tokenomics_visualizer
+        curves.trades = trade_impact(trace)
+        tokenomics_visualizer.plot_price_impact(curves)
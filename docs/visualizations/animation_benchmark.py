@@ -0,0 +1,97 @@
+import argparse
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.ticker import FuncFormatter
+
+import animation_engine
+import tokenomics_animator as animator
+import tokenomics_model as model
+
+SCENES = {
+    'supply_burn': animator.supply_burn_scene,
+    'price_impact': animator.price_impact_scene,
+    'governance_weight': animator.governance_weight_scene,
+    'transaction_rate': animator.transaction_rate_scene,
+}
+
+
+def full_redraw_frames(scene):
+    """Redraw the whole figure every frame, as FuncAnimation.save does"""
+    canvas = FigureCanvasAgg(scene.fig)
+    for artist in scene.artists:
+        artist.set_animated(False)
+    for frame in scene.frames:
+        scene.update(frame)
+        canvas.draw()
+        yield np.asarray(canvas.buffer_rgba())
+
+
+def legacy_supply_burn_frames(frames):
+    """The previous supply animation: clear and rebuild ax2 plus tight_layout per frame"""
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 12))
+    canvas = FigureCanvasAgg(fig)
+    initial_supply = model.INITIAL_SUPPLY
+    transactions = np.linspace(0, 1000, 100)
+    line1, = ax1.plot([], [], 'b-', linewidth=2)
+    ax1.set_xlim(0, 1000)
+    ax1.set_ylim(0, initial_supply * 1.1)
+    for frame in frames:
+        current_supply = initial_supply * (1 - model.BURN_RATE) ** (transactions * frame/100)
+        current_burned = initial_supply - current_supply
+        line1.set_data(transactions, current_supply)
+        ax2.clear()
+        ax2.stackplot(transactions, [current_supply, current_burned],
+                      labels=['Remaining Supply', 'Burned Tokens'],
+                      colors=['#2ecc71', '#e74c3c'])
+        ax1.set_title('MemePi Supply Dynamics')
+        ax1.set_xlabel('Number of Transactions (thousands)')
+        ax1.set_ylabel('Total Supply')
+        ax1.yaxis.set_major_formatter(FuncFormatter(animator.format_billions))
+        ax1.grid(True, alpha=0.3)
+        ax2.set_title('Token Distribution')
+        ax2.set_xlabel('Number of Transactions (thousands)')
+        ax2.set_ylabel('Token Amount')
+        ax2.yaxis.set_major_formatter(FuncFormatter(animator.format_billions))
+        ax2.grid(True, alpha=0.3)
+        ax2.legend()
+        plt.tight_layout()
+        canvas.draw()
+        yield np.asarray(canvas.buffer_rgba())
+    plt.close(fig)
+
+
+def _limited(scene, num_frames):
+    return scene._replace(frames=range(min(num_frames, len(scene.frames))))
+
+
+def run(num_frames=100):
+    """Measure fps per animation and return {name: (baseline_fps, engine_fps)}"""
+    results = {}
+    for name, build in SCENES.items():
+        if name == 'supply_burn':
+            baseline = animation_engine.measure_fps(legacy_supply_burn_frames(range(num_frames)))
+        else:
+            scene = _limited(build(), num_frames)
+            baseline = animation_engine.measure_fps(full_redraw_frames(scene))
+            plt.close(scene.fig)
+        scene = _limited(build(), num_frames)
+        blitted = animation_engine.measure_fps(animation_engine.iter_frames(scene))
+        plt.close(scene.fig)
+        results[name] = (baseline, blitted)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Frames-per-second benchmark: blitted animation engine vs. full redraws')
+    parser.add_argument('--frames', type=int, default=100,
+                        help='frames rendered per animation (default: 100)')
+    args = parser.parse_args()
+
+    print(f"{'animation':<20}{'full redraw fps':>17}{'blitted fps':>13}{'speedup':>9}")
+    for name, (baseline, blitted) in run(args.frames).items():
+        print(f"{name:<20}{baseline:>17.1f}{blitted:>13.1f}{blitted / baseline:>8.1f}x")
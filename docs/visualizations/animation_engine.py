@@ -0,0 +1,168 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.patches import Polygon
+from matplotlib.transforms import Bbox
+from PIL import Image
+
+import streaming_writer
+
+# An animation split into what is drawn once and what changes per frame.
+# update(frame) mutates the artists in place; only `artists` are redrawn.
+Scene = namedtuple('Scene', ['fig', 'artists', 'update', 'frames'])
+
+
+class StackedBands:
+    """Stackplot whose layers are rewritten in place instead of rebuilt.
+
+    Each band is a Polygon with a preallocated vertex buffer laid out as the
+    upper edge left-to-right, the lower edge right-to-left and a closing
+    vertex, so an update only writes y values into existing memory.
+    """
+
+    def __init__(self, ax, x, labels, colors):
+        x = np.asarray(x, dtype=float)
+        n = len(x)
+        self.n = n
+        self.tops = np.zeros((len(labels), n))
+        self.polygons = []
+        for label, color in zip(labels, colors):
+            verts = np.zeros((2 * n + 1, 2))
+            verts[:n, 0] = x
+            verts[n:2 * n, 0] = x[::-1]
+            verts[-1] = verts[0]
+            polygon = Polygon(verts, closed=True, facecolor=color, edgecolor='none',
+                              label=label, animated=True)
+            ax.add_patch(polygon)
+            self.polygons.append(polygon)
+        # Views into the polygons' own vertex buffers
+        self._uppers = [p.get_path().vertices[:n, 1] for p in self.polygons]
+        self._lowers = [p.get_path().vertices[n:2 * n, 1] for p in self.polygons]
+        self._closers = [p.get_path().vertices[-1:, 1] for p in self.polygons]
+
+    def update(self, layers):
+        """Set the band heights from a (num_layers, n) array"""
+        np.cumsum(layers, axis=0, out=self.tops)
+        for i in range(len(self.polygons)):
+            self._uppers[i][:] = self.tops[i]
+            if i == 0:
+                self._lowers[i][:] = 0
+            else:
+                self._lowers[i][:] = self.tops[i - 1, ::-1]
+            self._closers[i][:] = self.tops[i, 0]
+
+
+class SplitTitle:
+    """Axes title whose leading text is fixed and only its tail changes.
+
+    Laying out and rasterizing a whole title every frame costs more than the
+    rest of a blitted frame when only a number in it changes. The prefix
+    becomes the axes' own title, drawn once with the scaffolding, placed so
+    that prefix plus the widest tail is centred; `tail` is an animated
+    annotation anchored to the prefix's right edge at draw time, so it lines
+    up at any dpi.
+    """
+
+    def __init__(self, ax, prefix, widest_tail):
+        title = ax.set_title(prefix + widest_tail)
+        full = title.get_window_extent(FigureCanvasAgg(ax.figure).get_renderer())
+        title.set(text=prefix, horizontalalignment='left',
+                  x=ax.transAxes.inverted().transform((full.x0, 0))[0])
+        self.title = title
+        self.tail = ax.annotate('', xy=(1, title.get_position()[1]),
+                                xycoords=(title, title.get_transform()),
+                                horizontalalignment='left', verticalalignment='baseline',
+                                fontproperties=title.get_fontproperties(),
+                                annotation_clip=False, animated=True)
+
+    def set_text(self, text):
+        """Replace the tail"""
+        self.tail.set_text(text)
+
+
+def iter_frames(scene, dpi=None):
+    """Yield each frame of a scene as an RGBA array.
+
+    The static scaffolding (axes, labels, grids, legends, reference lines)
+    is rasterized once; every frame restores that background and draws only
+    the scene's animated artists on top. The yielded array is a view of the
+    canvas buffer and is overwritten by the next frame.
+    """
+    fig = scene.fig
+    if dpi is not None:
+        fig.set_dpi(dpi)
+    canvas = FigureCanvasAgg(fig)
+    for artist in scene.artists:
+        artist.set_animated(True)
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
+    for frame in scene.frames:
+        scene.update(frame)
+        canvas.restore_region(background)
+        for artist in scene.artists:
+            fig.draw_artist(artist)
+        yield np.asarray(canvas.buffer_rgba())
+
+
+def save(scene, path, fps=20, dpi=None, fmt=None):
+    """Render a scene and stream each frame to an encoder as it is drawn.
+
+    The format (gif, apng, mp4 or webm) follows the file extension unless
+    fmt is given; no more than one frame is held in memory at a time.
+    """
+    writer = streaming_writer.open_writer(path, fps, fmt)
+    try:
+        for rgba in iter_frames(scene, dpi):
+            writer.write(rgba)
+    finally:
+        writer.close()
+
+
+def tight_crop(scene, dpi=None, pad_inches=0.1):
+    """(rows, cols) slices of the frame buffer that hold every frame's content.
+
+    The equivalent of savefig(bbox_inches='tight') for a whole scene: the
+    figure's tight bbox plus, for every frame, the extent of the animated
+    artists (e.g. a title whose text changes).
+    """
+    fig = scene.fig
+    if dpi is not None:
+        fig.set_dpi(dpi)
+    renderer = FigureCanvasAgg(fig).get_renderer()
+    extents = [fig.get_tightbbox(renderer).transformed(fig.dpi_scale_trans)]
+    for frame in scene.frames:
+        scene.update(frame)
+        extents += [artist.get_window_extent(renderer) for artist in scene.artists]
+    box = Bbox.union(extents).padded(pad_inches * fig.dpi)
+    width, height = renderer.get_canvas_width_height()
+    x0, x1 = max(int(np.floor(box.x0)), 0), min(int(np.ceil(box.x1)), int(width))
+    top, bottom = max(int(height - np.ceil(box.y1)), 0), min(int(height - np.floor(box.y0)),
+                                                            int(height))
+    return slice(top, bottom), slice(x0, x1)
+
+
+def write_png(rgba, path, dpi):
+    """Encode one RGBA frame as a PNG file"""
+    Image.fromarray(rgba).save(path, format='png', dpi=(dpi, dpi))
+
+
+def save_stills(scene, paths, dpi=None, crop=None, write=None):
+    """Write frame i of a scene to paths[i] as a PNG, drawing only what changes.
+
+    The scaffolding is rasterized once for the whole series, as in save();
+    crop is a (rows, cols) pair from tight_crop(). write(rgba, path, dpi)
+    replaces write_png, e.g. to also write downscaled copies.
+    """
+    dpi = dpi or scene.fig.dpi
+    write = write or write_png
+    for rgba, path in zip(iter_frames(scene, dpi), paths):
+        write(rgba if crop is None else rgba[crop], path, dpi)
+
+
+def measure_fps(frames):
+    """Frames per second of a frame iterator, excluding encoding"""
+    start = time.perf_counter()
+    count = sum(1 for _ in frames)
+    return count / (time.perf_counter() - start)
@@ -4,227 +4,359 @@ from matplotlib.ticker import FuncFormatter
 from matplotlib.patches import Rectangle
 import os
 
+import artifact_cache
+import formula_cache
+import instrumentation
+import render_farm
+import responsive_images
+import tokenomics_model as model
+import static_visualizer
+from static_visualizer import (SUPPLY_SNAPSHOTS, IMPACT_SNAPSHOTS,
+                               GOVERNANCE_SNAPSHOTS, RATE_SNAPSHOTS)
+
 # Create output directory if it doesn't exist
 output_dir = os.path.dirname(os.path.abspath(__file__))
 os.makedirs(output_dir, exist_ok=True)
 
+DPI = 300
+# Rendered formula boxes, reused across snapshots, render workers and runs
+FORMULA_CACHE = formula_cache.FormulaCache(os.path.join(output_dir, formula_cache.CACHE_DIR_NAME))
+render_farm.register_counters(FORMULA_CACHE.take_counts)
+
+SUPPLY_FORMULA = (
+    r"Supply Formula:"
+    "\n"
+    r"$S(t) = S_0 \times (1-b)^{n(t)}$"
+    "\n"
+    r"where:"
+    "\n"
+    r"$S_0 = \pi \times 10^{11}$"
+    "\n"
+    r"$b = 0.02$ (burn rate)"
+    "\n"
+    r"$n(t)$ = transaction count"
+)
+
+BURN_FORMULA = (
+    r"Burn Amount per Transaction:"
+    "\n"
+    r"$B(t_i) = 0.02 \times V(t_i)$"
+    "\n"
+    r"Total Burned:"
+    "\n"
+    r"$B_{total}(t) = S_0 - S(t)$"
+)
+
+IMPACT_FORMULA = (
+    r"Price Impact Formula:"
+    "\n"
+    r"$I(v) = \frac{\pi}{2} \arctan(\frac{v}{L})$"
+    "\n"
+    r"where:"
+    "\n"
+    r"$v$ = transaction volume"
+    "\n"
+    r"$L$ = liquidity pool size"
+    "\n"
+    r"Maximum Impact: $\lim_{v \to \infty} I(v) = \frac{\pi}{2}$"
+)
+
+GOVERNANCE_FORMULA = (
+    r"Voting Power Formula:"
+    "\n"
+    r"$VP(a,t) = Balance(a) \times \sqrt{\frac{HoldingTime(a)}{\pi}}$"
+    "\n"
+    r"Properties:"
+    "\n"
+    r"1. Linear with balance"
+    "\n"
+    r"2. Square root of holding time"
+    "\n"
+    r"3. π-normalized time factor"
+)
+
+RATE_FORMULA = (
+    r"Transaction Rate Limits:"
+    "\n"
+    r"$Rate = \frac{1}{\pi \times 100}$ tx/s"
+    "\n"
+    r"$Cooldown = \pi \times 100$ seconds"
+    "\n"
+    r"Daily Limit:"
+    "\n"
+    r"$Max_{daily} = \frac{86400}{\pi \times 100} \approx 275$ tx"
+)
+
 def format_billions(x, pos):
     """Format large numbers in billions"""
     return f'{x/1e9:.1f}B'
 
 def add_math_box(ax, text, position='top'):
     """Add a box with mathematical formula"""
+    bbox = dict(boxstyle='round,pad=0.5', facecolor='white', alpha=0.8)
     if position == 'top':
-        bbox = dict(boxstyle='round,pad=0.5', facecolor='white', alpha=0.8)
-        ax.text(0.5, 0.98, text, transform=ax.transAxes, ha='center', va='top',
-                bbox=bbox, fontsize=10)
+        return FORMULA_CACHE.place(ax, 0.5, 0.98, text, DPI, fontsize=10, box=bbox,
+                                   ha='center', va='top')
     else:  # right
-        bbox = dict(boxstyle='round,pad=0.5', facecolor='white', alpha=0.8)
-        ax.text(0.98, 0.5, text, transform=ax.transAxes, ha='right', va='center',
-                bbox=bbox, fontsize=10, rotation=0)
+        return FORMULA_CACHE.place(ax, 0.98, 0.5, text, DPI, fontsize=10, box=bbox,
+                                   ha='right', va='center')
+
+def save_figure(fig, output, responsive=()):
+    """Save and close a snapshot, plus srcset variants in the formats listed in responsive"""
+    if responsive:
+        responsive_images.save(fig, output, DPI, tight=True, formats=responsive)
+    else:
+        plt.savefig(output, dpi=DPI, bbox_inches='tight')
+    plt.close(fig)
+
+def render_supply_snapshot(frame, output, responsive=()):
+    """Render one annotated supply dynamics snapshot"""
+    # One broadcasted evaluation covers every snapshot
+    transactions, supply_grid = model.supply_curves(
+        [f / 1000 for f in SUPPLY_SNAPSHOTS], num_points=100)
+    _, burned_grid = model.burned_curves(
+        [f / 1000 for f in SUPPLY_SNAPSHOTS], num_points=100)
+    i = SUPPLY_SNAPSHOTS.index(frame)
+
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 14))
+
+    supply = supply_grid[0, i]
+    burned = burned_grid[0, i]
+
+    # Plot supply curve
+    ax1.plot(transactions, supply, 'b-', linewidth=2)
+    ax1.set_title(f'MemePi Supply Dynamics (Transaction Period: {frame})')
+    ax1.set_xlabel('Number of Transactions (thousands)')
+    ax1.set_ylabel('Total Supply')
+    ax1.yaxis.set_major_formatter(FuncFormatter(format_billions))
+    ax1.grid(True, alpha=0.3)
+
+    # Add mathematical annotations
+    add_math_box(ax1, SUPPLY_FORMULA, 'right')
+
+    # Plot distribution
+    ax2.stackplot(transactions, [supply, burned],
+                 labels=['Remaining Supply', 'Burned Tokens'],
+                 colors=['#2ecc71', '#e74c3c'])
+    ax2.set_title('Token Distribution')
+    ax2.set_xlabel('Number of Transactions (thousands)')
+    ax2.set_ylabel('Token Amount')
+    ax2.yaxis.set_major_formatter(FuncFormatter(format_billions))
+    ax2.grid(True, alpha=0.3)
+    ax2.legend()
+
+    # Add burn formula
+    add_math_box(ax2, BURN_FORMULA, 'right')
+
+    plt.tight_layout()
+    save_figure(fig, output, responsive)
+
+def render_price_impact_snapshot(current_volume, output, responsive=()):
+    """Render one annotated price impact snapshot"""
+    volume_to_liquidity, impact = model.impact_curves()
+    impact = impact[0]
+    current_impact = model.price_impact(float(current_volume))
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+
+    # Plot full curve
+    ax.plot(volume_to_liquidity, impact, 'r-', linewidth=2, alpha=0.3)
+
+    # Plot current point
+    ax.plot(current_volume, current_impact, 'bo', markersize=10)
+
+    # Add reference line
+    ax.axhline(y=np.pi/2, color='g', linestyle='--', alpha=0.5,
+              label='Maximum Impact (π/2)')
+
+    ax.set_title(f'MemePi Price Impact Model (Volume/Liquidity: {current_volume})')
+    ax.set_xlabel('Transaction Volume / Liquidity Pool Size')
+    ax.set_ylabel('Price Impact')
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+
+    # Add mathematical annotations
+    add_math_box(ax, IMPACT_FORMULA, 'right')
+
+    save_figure(fig, output, responsive)
+
+def render_governance_snapshot(time, output, responsive=()):
+    """Render one annotated governance weight snapshot"""
+    balances, weights = model.governance_curves(GOVERNANCE_SNAPSHOTS)
+    weight = weights[GOVERNANCE_SNAPSHOTS.index(time)]
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+
+    ax.plot(balances, weight, 'b-', linewidth=2)
+    ax.set_title(f'MemePi Governance Weight (Holding Time: {time} days)')
+    ax.set_xlabel('Token Balance')
+    ax.set_ylabel('Voting Power')
+    ax.grid(True, alpha=0.3)
+
+    # Add mathematical annotations
+    add_math_box(ax, GOVERNANCE_FORMULA, 'right')
+
+    save_figure(fig, output, responsive)
 
-def create_supply_snapshots():
+def render_transaction_rate_snapshot(current_hour, output, responsive=()):
+    """Render one annotated transaction rate snapshot"""
+    hours, tx_limit = model.rate_curves()
+    tx_limit = tx_limit[0]
+    current_limit = model.transaction_limit(current_hour)
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+
+    # Plot full curve and current point
+    ax.plot(hours, tx_limit, 'b-', linewidth=2, alpha=0.3)
+    ax.plot(current_hour, current_limit, 'ro', markersize=10)
+
+    ax.set_title(f'MemePi Transaction Rate (Hour: {current_hour})')
+    ax.set_xlabel('Time (hours)')
+    ax.set_ylabel('Cumulative Transactions Allowed')
+    ax.grid(True, alpha=0.3)
+
+    # Add mathematical annotations
+    add_math_box(ax, RATE_FORMULA, 'right')
+
+    save_figure(fig, output, responsive)
+
+# Template mode reuses the static templates at the annotated sizes. The
+# formula boxes cover the data, so they are redrawn above it on every
+# snapshot, as cached images
+
+def annotate_supply(ax1, ax2):
+    return [add_math_box(ax1, SUPPLY_FORMULA, 'right'), add_math_box(ax2, BURN_FORMULA, 'right')]
+
+def annotate_price_impact(ax):
+    return [add_math_box(ax, IMPACT_FORMULA, 'right')]
+
+def annotate_governance(ax):
+    return [add_math_box(ax, GOVERNANCE_FORMULA, 'right')]
+
+def annotate_transaction_rate(ax):
+    return [add_math_box(ax, RATE_FORMULA, 'right')]
+
+def render_supply_templates(output, values, responsive=()):
+    scene = static_visualizer.supply_template(values, (12, 14), annotate_supply)
+    static_visualizer.save_snapshots(scene, output, values, DPI, tight=True,
+                                     responsive=responsive)
+
+def render_price_impact_templates(output, values, responsive=()):
+    scene = static_visualizer.price_impact_template(values, (12, 8), annotate_price_impact)
+    static_visualizer.save_snapshots(scene, output, values, DPI, tight=True,
+                                     responsive=responsive)
+
+def render_governance_templates(output, values, responsive=()):
+    scene = static_visualizer.governance_template(values, (12, 8), annotate_governance)
+    static_visualizer.save_snapshots(scene, output, values, DPI, tight=True,
+                                     responsive=responsive)
+
+def render_transaction_rate_templates(output, values, responsive=()):
+    scene = static_visualizer.transaction_rate_template(values, (12, 8),
+                                                        annotate_transaction_rate)
+    static_visualizer.save_snapshots(scene, output, values, DPI, tight=True,
+                                     responsive=responsive)
+
+TEMPLATE_RENDERERS = {
+    'supply': (render_supply_templates, 'supply_snapshot_{}_annotated.png'),
+    'price_impact': (render_price_impact_templates, 'price_impact_{}_annotated.png'),
+    'governance': (render_governance_templates, 'governance_weight_{}_annotated.png'),
+    'transaction_rate': (render_transaction_rate_templates, 'transaction_rate_{}_annotated.png'),
+}
+
+def template_job(chart, num_snapshots=None, responsive=()):
+    """One job rendering a chart's whole annotated snapshot series from its template"""
+    render, pattern = TEMPLATE_RENDERERS[chart]
+    return render_farm.make_job(render, os.path.join(output_dir, pattern),
+                                values=static_visualizer.snapshot_values(chart, num_snapshots),
+                                responsive=responsive)
+
+def supply_snapshot_jobs(responsive=()):
+    """Render jobs for the annotated supply snapshots"""
+    return [render_farm.make_job(render_supply_snapshot,
+                                 os.path.join(output_dir, f'supply_snapshot_{frame}_annotated.png'),
+                                 frame=frame, responsive=responsive)
+            for frame in SUPPLY_SNAPSHOTS]
+
+def price_impact_snapshot_jobs(responsive=()):
+    """Render jobs for the annotated price impact snapshots"""
+    return [render_farm.make_job(render_price_impact_snapshot,
+                                 os.path.join(output_dir, f'price_impact_{volume}_annotated.png'),
+                                 current_volume=volume, responsive=responsive)
+            for volume in IMPACT_SNAPSHOTS]
+
+def governance_snapshot_jobs(responsive=()):
+    """Render jobs for the annotated governance weight snapshots"""
+    return [render_farm.make_job(render_governance_snapshot,
+                                 os.path.join(output_dir, f'governance_weight_{time}_annotated.png'),
+                                 time=time, responsive=responsive)
+            for time in GOVERNANCE_SNAPSHOTS]
+
+def transaction_rate_snapshot_jobs(responsive=()):
+    """Render jobs for the annotated transaction rate snapshots"""
+    return [render_farm.make_job(render_transaction_rate_snapshot,
+                                 os.path.join(output_dir, f'transaction_rate_{hour}_annotated.png'),
+                                 current_hour=hour, responsive=responsive)
+            for hour in RATE_SNAPSHOTS]
+
+def create_supply_snapshots(workers=1, template=False, num_snapshots=None):
     """Create annotated snapshots of supply dynamics"""
-    initial_supply = 314159265359
-    burn_rate = 0.02
-    
-    snapshots = [0, 250, 500, 750, 1000]
-    for frame in snapshots:
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 14))
-        
-        transactions = np.linspace(0, 1000, 100)
-        supply = initial_supply * (1 - burn_rate) ** (transactions * frame/1000)
-        burned = initial_supply - supply
-        
-        # Plot supply curve
-        ax1.plot(transactions, supply, 'b-', linewidth=2)
-        ax1.set_title(f'MemePi Supply Dynamics (Transaction Period: {frame})')
-        ax1.set_xlabel('Number of Transactions (thousands)')
-        ax1.set_ylabel('Total Supply')
-        ax1.yaxis.set_major_formatter(FuncFormatter(format_billions))
-        ax1.grid(True, alpha=0.3)
-        
-        # Add mathematical annotations
-        supply_formula = (
-            r"Supply Formula:"
-            "\n"
-            r"$S(t) = S_0 \times (1-b)^{n(t)}$"
-            "\n"
-            r"where:"
-            "\n"
-            r"$S_0 = \pi \times 10^{11}$"
-            "\n"
-            r"$b = 0.02$ (burn rate)"
-            "\n"
-            r"$n(t)$ = transaction count"
-        )
-        add_math_box(ax1, supply_formula, 'right')
-        
-        # Plot distribution
-        ax2.stackplot(transactions, [supply, burned],
-                     labels=['Remaining Supply', 'Burned Tokens'],
-                     colors=['#2ecc71', '#e74c3c'])
-        ax2.set_title('Token Distribution')
-        ax2.set_xlabel('Number of Transactions (thousands)')
-        ax2.set_ylabel('Token Amount')
-        ax2.yaxis.set_major_formatter(FuncFormatter(format_billions))
-        ax2.grid(True, alpha=0.3)
-        ax2.legend()
-        
-        # Add burn formula
-        burn_formula = (
-            r"Burn Amount per Transaction:"
-            "\n"
-            r"$B(t_i) = 0.02 \times V(t_i)$"
-            "\n"
-            r"Total Burned:"
-            "\n"
-            r"$B_{total}(t) = S_0 - S(t)$"
-        )
-        add_math_box(ax2, burn_formula, 'right')
-        
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, f'supply_snapshot_{frame}_annotated.png'),
-                   dpi=300, bbox_inches='tight')
-        plt.close()
-
-def create_price_impact_snapshots():
+    if template:
+        return render_farm.render([template_job('supply', num_snapshots)], workers)
+    return render_farm.render(supply_snapshot_jobs(), workers)
+
+def create_price_impact_snapshots(workers=1, template=False, num_snapshots=None):
     """Create annotated snapshots of price impact"""
-    snapshots = [0, 1, 2, 3, 4]
-    volume_to_liquidity = np.linspace(0, 5, 1000)
-    k = np.pi/2
-    impact = k * np.arctan(volume_to_liquidity)
-    
-    for current_volume in snapshots:
-        fig, ax = plt.subplots(figsize=(12, 8))
-        
-        # Plot full curve
-        ax.plot(volume_to_liquidity, impact, 'r-', linewidth=2, alpha=0.3)
-        
-        # Plot current point
-        current_impact = k * np.arctan(current_volume)
-        ax.plot(current_volume, current_impact, 'bo', markersize=10)
-        
-        # Add reference line
-        ax.axhline(y=np.pi/2, color='g', linestyle='--', alpha=0.5,
-                  label='Maximum Impact (π/2)')
-        
-        ax.set_title(f'MemePi Price Impact Model (Volume/Liquidity: {current_volume})')
-        ax.set_xlabel('Transaction Volume / Liquidity Pool Size')
-        ax.set_ylabel('Price Impact')
-        ax.grid(True, alpha=0.3)
-        ax.legend()
-        
-        # Add mathematical annotations
-        impact_formula = (
-            r"Price Impact Formula:"
-            "\n"
-            r"$I(v) = \frac{\pi}{2} \arctan(\frac{v}{L})$"
-            "\n"
-            r"where:"
-            "\n"
-            r"$v$ = transaction volume"
-            "\n"
-            r"$L$ = liquidity pool size"
-            "\n"
-            r"Maximum Impact: $\lim_{v \to \infty} I(v) = \frac{\pi}{2}$"
-        )
-        add_math_box(ax, impact_formula, 'right')
-        
-        plt.savefig(os.path.join(output_dir, f'price_impact_{current_volume}_annotated.png'),
-                   dpi=300, bbox_inches='tight')
-        plt.close()
-
-def create_governance_snapshots():
+    if template:
+        return render_farm.render([template_job('price_impact', num_snapshots)], workers)
+    return render_farm.render(price_impact_snapshot_jobs(), workers)
+
+def create_governance_snapshots(workers=1, template=False, num_snapshots=None):
     """Create annotated snapshots of governance weight"""
-    balances = np.linspace(0, 1000000, 1000)
-    holding_times = [30, 90, 180, 365]  # days
-    
-    for time in holding_times:
-        fig, ax = plt.subplots(figsize=(12, 8))
-        weight = balances * np.sqrt(time/np.pi)
-        
-        ax.plot(balances, weight, 'b-', linewidth=2)
-        ax.set_title(f'MemePi Governance Weight (Holding Time: {time} days)')
-        ax.set_xlabel('Token Balance')
-        ax.set_ylabel('Voting Power')
-        ax.grid(True, alpha=0.3)
-        
-        # Add mathematical annotations
-        governance_formula = (
-            r"Voting Power Formula:"
-            "\n"
-            r"$VP(a,t) = Balance(a) \times \sqrt{\frac{HoldingTime(a)}{\pi}}$"
-            "\n"
-            r"Properties:"
-            "\n"
-            r"1. Linear with balance"
-            "\n"
-            r"2. Square root of holding time"
-            "\n"
-            r"3. π-normalized time factor"
-        )
-        add_math_box(ax, governance_formula, 'right')
-        
-        plt.savefig(os.path.join(output_dir, f'governance_weight_{time}_annotated.png'),
-                   dpi=300, bbox_inches='tight')
-        plt.close()
-
-def create_transaction_rate_snapshots():
+    if template:
+        return render_farm.render([template_job('governance', num_snapshots)], workers)
+    return render_farm.render(governance_snapshot_jobs(), workers)
+
+def create_transaction_rate_snapshots(workers=1, template=False, num_snapshots=None):
     """Create annotated snapshots of transaction rate limits"""
-    hours = np.linspace(0, 24, 1000)
-    max_tx_per_hour = 11.46  # derived from π
-    snapshots = [6, 12, 18, 24]  # hours
-    
-    for current_hour in snapshots:
-        fig, ax = plt.subplots(figsize=(12, 8))
-        
-        # Calculate limits
-        tx_limit = np.minimum(hours * max_tx_per_hour,
-                            hours * 0 + 24 * max_tx_per_hour)
-        current_limit = min(current_hour * max_tx_per_hour,
-                          24 * max_tx_per_hour)
-        
-        # Plot full curve and current point
-        ax.plot(hours, tx_limit, 'b-', linewidth=2, alpha=0.3)
-        ax.plot(current_hour, current_limit, 'ro', markersize=10)
-        
-        ax.set_title(f'MemePi Transaction Rate (Hour: {current_hour})')
-        ax.set_xlabel('Time (hours)')
-        ax.set_ylabel('Cumulative Transactions Allowed')
-        ax.grid(True, alpha=0.3)
-        
-        # Add mathematical annotations
-        rate_formula = (
-            r"Transaction Rate Limits:"
-            "\n"
-            r"$Rate = \frac{1}{\pi \times 100}$ tx/s"
-            "\n"
-            r"$Cooldown = \pi \times 100$ seconds"
-            "\n"
-            r"Daily Limit:"
-            "\n"
-            r"$Max_{daily} = \frac{86400}{\pi \times 100} \approx 275$ tx"
-        )
-        add_math_box(ax, rate_formula, 'right')
-        
-        plt.savefig(os.path.join(output_dir, f'transaction_rate_{current_hour}_annotated.png'),
-                   dpi=300, bbox_inches='tight')
-        plt.close()
+    if template:
+        return render_farm.render([template_job('transaction_rate', num_snapshots)], workers)
+    return render_farm.render(transaction_rate_snapshot_jobs(), workers)
+
+def all_jobs(responsive=()):
+    """Every annotated snapshot of every chart, as one list of independent jobs"""
+    return (supply_snapshot_jobs(responsive) + price_impact_snapshot_jobs(responsive) +
+            governance_snapshot_jobs(responsive) +
+            transaction_rate_snapshot_jobs(responsive))
+
+def template_jobs(num_snapshots=None, responsive=()):
+    """One annotated template job per chart type"""
+    return [template_job(chart, num_snapshots, responsive) for chart in TEMPLATE_RENDERERS]
 
 if __name__ == "__main__":
+    parser = render_farm.make_parser("Generate annotated MemePi visualization snapshots")
+    render_farm.add_template_arguments(parser)
+    responsive_images.add_arguments(parser)
+    args = parser.parse_args()
     print("Generating annotated visualization snapshots...")
-    
-    print("1/4: Creating annotated supply snapshots...")
-    create_supply_snapshots()
-    
-    print("2/4: Creating annotated price impact snapshots...")
-    create_price_impact_snapshots()
-    
-    print("3/4: Creating annotated governance weight snapshots...")
-    create_governance_snapshots()
-    
-    print("4/4: Creating annotated transaction rate snapshots...")
-    create_transaction_rate_snapshots()
-    
+    report = instrumentation.from_args(args, 'annotated_visualizer', output_dir)
+
+    if args.template:
+        # One process per chart type; the manifest tracks one file per job, so
+        # template series are always rendered
+        jobs = template_jobs(args.snapshots, args.responsive)
+        print(f"Rendering {len(jobs)} annotated snapshot series from templates...")
+        render_farm.render(jobs, args.workers, None, report)
+    else:
+        # All four charts share one pool so no core idles between charts
+        jobs = all_jobs(args.responsive)
+        cache = artifact_cache.ArtifactCache(output_dir, force=args.force)
+        print(f"Rendering {len(jobs)} annotated snapshots...")
+        render_farm.render(jobs, args.workers, cache, report)
+        print(cache.summary())
+    print(formula_cache.summary(render_farm.COUNTERS))
+    if args.responsive:
+        print(f"{responsive_images.write_manifest(output_dir)} charts in the responsive manifest")
+    report.finish()
+
     print("All annotated snapshots have been generated in the visualizations directory!")
@@ -0,0 +1,190 @@
+import ast
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sys
+import types
+
+import matplotlib
+import numpy as np
+
+import responsive_images
+import tokenomics_model as model
+
+MANIFEST_NAME = '.build_manifest.json'
+
+
+def _plain(value):
+    """Reduce a value to something json can hash deterministically"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _plain(v) for k, v in sorted(value.items())}
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return repr(value)
+
+
+def _source(obj):
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        return repr(obj)
+
+
+def _model_fingerprint():
+    """Model constants plus the model source, shared by every figure"""
+    constants = {name: _plain(getattr(model, name))
+                 for name in dir(model) if name.isupper()}
+    return {'constants': constants, 'source': _source(model)}
+
+
+def _code_names(code):
+    """Global names used by a code object, including nested comprehensions"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _code_names(const)
+    return names
+
+
+def _function_inputs(func):
+    """Source of func plus the constants and helpers it refers to.
+
+    Annotation text, snapshot lists and helpers such as add_math_box live at
+    module level, so they are resolved through the function's globals.
+    """
+    referenced = {}
+    for name in sorted(_code_names(func.__code__)):
+        value = func.__globals__.get(name)
+        if isinstance(value, types.FunctionType):
+            referenced[name] = _source(value)
+        elif isinstance(value, (str, int, float, tuple, list, np.ndarray)):
+            referenced[name] = _plain(value)
+    return {'source': _source(func), 'globals': referenced}
+
+
+@functools.lru_cache(maxsize=None)
+def _imports(path):
+    """Top-level module names imported anywhere in a source file"""
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.partition('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.partition('.')[0])
+    return names
+
+
+@functools.lru_cache(maxsize=None)
+def _file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _helper_modules(func):
+    """{module: source hash} of every local module func's module imports, transitively.
+
+    Renderers reach helpers such as formula_cache, responsive_images and
+    downsample through several calls, which _function_inputs cannot follow,
+    so their whole source counts. Imports inside functions count too.
+    """
+    path = os.path.abspath(sys.modules[func.__module__].__file__)
+    directory = os.path.dirname(path)
+    found, pending = {}, [path]
+    while pending:
+        for name in _imports(pending.pop()):
+            local = os.path.join(directory, name + '.py')
+            if name not in found and local != path and os.path.isfile(local):
+                found[name] = _file_hash(local)
+                pending.append(local)
+    return found
+
+
+def job_key(job):
+    """Content hash of everything that determines a job's artifact"""
+    payload = {
+        'function': f'{job.func.__module__}.{job.func.__qualname__}',
+        'inputs': _function_inputs(job.func),
+        'helpers': _helper_modules(job.func),
+        'kwargs': _plain(job.kwargs),
+        'model': _model_fingerprint(),
+        'matplotlib': matplotlib.__version__,
+        'output': os.path.basename(job.output),
+    }
+    blob = json.dumps(payload, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(blob).hexdigest()
+
+
+class ArtifactCache:
+    """Build manifest mapping each artifact to the hash of its inputs"""
+
+    def __init__(self, directory, force=False):
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self.force = force
+        self.hits = 0
+        self.misses = 0
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _name(self, output):
+        return os.path.relpath(output, os.path.dirname(self.path))
+
+    def _sizes(self, job):
+        """{file: size} of the artifact's srcset variants on disk"""
+        return {self._name(path): os.path.getsize(path)
+                for path in responsive_images.variants(job.output)}
+
+    def is_current(self, job, key):
+        """True if the artifact and its variants exist and were built from the same inputs"""
+        if self.force:
+            return False
+        entry = self.entries.get(self._name(job.output))
+        if entry is None or entry.get('key') != key:
+            return False
+        try:
+            return (os.path.getsize(job.output) == entry.get('size') and
+                    self._sizes(job) == entry.get('variants', {}))
+        except OSError:
+            return False
+
+    def partition(self, jobs):
+        """Split jobs into (stale jobs with their keys, current jobs)"""
+        stale, current = [], []
+        for job in jobs:
+            key = job_key(job)
+            if self.is_current(job, key):
+                current.append(job)
+            else:
+                stale.append((job, key))
+        self.hits += len(current)
+        self.misses += len(stale)
+        return stale, current
+
+    def record(self, job, key):
+        """Remember that job's artifact is now built from key"""
+        self.entries[self._name(job.output)] = {
+            'key': key,
+            'size': os.path.getsize(job.output),
+            'variants': self._sizes(job),
+        }
+
+    def save(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def summary(self):
+        return f'artifact cache: {self.hits} hit(s), {self.misses} miss(es)'
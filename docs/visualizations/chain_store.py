@@ -0,0 +1,513 @@
+import argparse
+import contextlib
+import csv
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+import downsample
+from governance_engine import decode_addresses
+
+# On-disk columnar store for chain exports (Transfer events, holder balances).
+#
+# A store is a directory holding one raw little-endian file per column, an
+# index.npy of per-block (BLOCK_ROWS rows) min/max values for the block and
+# timestamp columns, and header.json, which is written last. Columns are
+# opened with np.memmap, so slicing a multi-GB history is a view and pages
+# are only read when touched. Amounts are split into whole tokens and a wei
+# remainder (< 10**18), matching supply_simulator.tokens_to_limbs, so they
+# stay exact in int64. Transfers stores also get flows.npy: the exact minted
+# and burned totals before every index block, so running supply from any row
+# needs one lookup and at most one partial block.
+
+FORMAT = 'memepi-columnar'
+VERSION = 1
+BLOCK_ROWS = 65536
+HEADER_NAME = 'header.json'
+INDEX_NAME = 'index.npy'
+FLOWS_NAME = 'flows.npy'
+WEI_PER_TOKEN = 10**18
+HALF_WEI = 10**9  # wei remainders are summed as two int64 halves
+ZERO_ADDRESS = bytes(20)
+
+SCHEMAS = {
+    'transfers': {
+        'columns': [('block', '<i8'), ('timestamp', '<i8'), ('log_index', '<i4'),
+                    ('sender', 'S20'), ('recipient', 'S20'),
+                    ('amount_tokens', '<i8'), ('amount_wei', '<i8')],
+        'index': ['block', 'timestamp'],
+    },
+    'holders': {
+        'columns': [('address', 'S20'), ('balance_tokens', '<i8'), ('balance_wei', '<i8'),
+                    ('first_held_block', '<i8'), ('first_held', '<i8')],
+        'index': ['first_held_block', 'first_held'],
+    },
+}
+
+# Field names accepted from common explorer and warehouse exports
+ALIASES = {
+    'transfers': {
+        'block': ['block', 'block_number', 'blockNumber', 'Blockno'],
+        'timestamp': ['timestamp', 'block_timestamp', 'timeStamp', 'UnixTimestamp'],
+        'log_index': ['log_index', 'logIndex'],
+        'sender': ['sender', 'from', 'from_address', 'From'],
+        'recipient': ['recipient', 'to', 'to_address', 'To'],
+        'amount': ['amount', 'value', 'Quantity'],
+    },
+    'holders': {
+        'address': ['address', 'holder', 'HolderAddress'],
+        'balance': ['balance', 'Balance'],
+        'first_held_block': ['first_held_block'],
+        'first_held': ['first_held', 'first_held_time'],
+    },
+}
+OPTIONAL = {'log_index', 'first_held_block'}
+
+
+class StoreWriter:
+    """Append column batches to a new store; the index is built as rows arrive"""
+
+    def __init__(self, path, kind):
+        self.path = path
+        self.kind = kind
+        self.schema = SCHEMAS[kind]
+        os.makedirs(path, exist_ok=True)
+        stale = os.path.join(path, HEADER_NAME)
+        if os.path.exists(stale):
+            os.remove(stale)
+        self.files = {name: open(os.path.join(path, f'{name}.bin'), 'wb')
+                      for name, _ in self.schema['columns']}
+        self.rows = 0
+        self.sorted = {name: True for name in self.schema['index']}
+        self._last = {}
+        self._pending = np.empty((len(self.schema['index']), 0), dtype=np.int64)
+        self._mins = []
+        self._maxs = []
+        # Exact minted/burned wei so far, and their values where each block starts
+        self._minted = self._burned = 0
+        self._flows = []
+
+    def append(self, columns):
+        """Write one batch given as {column name: array}, all the same length"""
+        n = len(columns[self.schema['columns'][0][0]])
+        for name, dtype in self.schema['columns']:
+            values = np.ascontiguousarray(columns[name], dtype=dtype)
+            if len(values) != n:
+                raise ValueError(f'column {name} has {len(values)} rows, expected {n}')
+            values.tofile(self.files[name])
+
+        keys = np.array([columns[name] for name in self.schema['index']], dtype=np.int64)
+        for name, key in zip(self.schema['index'], keys):
+            if n and self.sorted[name]:
+                previous = self._last.get(name, key[0])
+                self.sorted[name] = key[0] >= previous and bool(np.all(key[1:] >= key[:-1]))
+                self._last[name] = key[-1]
+        self._index(keys)
+        if self.kind == 'transfers':
+            self._add_flows(columns, n)
+        self.rows += n
+
+    def _index(self, keys):
+        pending = np.concatenate([self._pending, keys], axis=1)
+        full = pending.shape[1] // BLOCK_ROWS * BLOCK_ROWS
+        if full:
+            blocks = pending[:, :full].reshape(len(keys), -1, BLOCK_ROWS)
+            self._mins.append(blocks.min(axis=2))
+            self._maxs.append(blocks.max(axis=2))
+        self._pending = pending[:, full:]
+
+    def _add_flows(self, columns, n):
+        whole = np.asarray(columns['amount_tokens'], dtype=np.int64)
+        wei = np.asarray(columns['amount_wei'], dtype=np.int64)
+        mint = np.asarray(columns['sender']) == ZERO_ADDRESS
+        burn = np.asarray(columns['recipient']) == ZERO_ADDRESS
+        # Batches need not line up with blocks: total the rows up to each block start
+        lo = 0
+        for cut in [*range(-self.rows % BLOCK_ROWS, n, BLOCK_ROWS), n]:
+            part, m, b = slice(lo, cut), mint[lo:cut], burn[lo:cut]
+            self._minted += wei_sum(whole[part][m], wei[part][m])
+            self._burned += wei_sum(whole[part][b], wei[part][b])
+            if cut < n:
+                self._flows.append(_split_wei(self._minted) + _split_wei(self._burned))
+            lo = cut
+
+    def close(self):
+        """Flush columns, write index.npy and flows.npy, then the header marking the store done"""
+        if self._pending.shape[1]:
+            self._mins.append(self._pending.min(axis=1, keepdims=True))
+            self._maxs.append(self._pending.max(axis=1, keepdims=True))
+        for handle in self.files.values():
+            handle.close()
+        k = len(self.schema['index'])
+        mins = np.concatenate(self._mins, axis=1) if self._mins else np.empty((k, 0), np.int64)
+        maxs = np.concatenate(self._maxs, axis=1) if self._maxs else np.empty((k, 0), np.int64)
+        np.save(os.path.join(self.path, INDEX_NAME), np.stack([mins, maxs], axis=1))
+        if self.kind == 'transfers':
+            # (minted tokens, minted wei, burned tokens, burned wei) before each block, then in all
+            flows = self._flows + [_split_wei(self._minted) + _split_wei(self._burned)]
+            np.save(os.path.join(self.path, FLOWS_NAME), np.array(flows, dtype=np.int64).T)
+
+        header = {'format': FORMAT, 'version': VERSION, 'kind': self.kind, 'rows': self.rows,
+                  'block_rows': BLOCK_ROWS, 'columns': dict(self.schema['columns']),
+                  'index': self.schema['index'], 'sorted': self.sorted}
+        partial = os.path.join(self.path, HEADER_NAME + '.tmp')
+        with open(partial, 'w') as f:
+            json.dump(header, f, indent=2)
+        os.replace(partial, os.path.join(self.path, HEADER_NAME))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            for handle in self.files.values():
+                handle.close()
+
+
+class ColumnStore:
+    """Read-only, memory-mapped view of a store directory"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, HEADER_NAME)) as f:
+            self.header = json.load(f)
+        if self.header.get('format') != FORMAT or self.header.get('version') != VERSION:
+            raise ValueError(f'{path} is not a {FORMAT} v{VERSION} store')
+        self.kind = self.header['kind']
+        self.rows = self.header['rows']
+        self.block_rows = self.header['block_rows']
+        self.columns = {}
+        for name, dtype in self.header['columns'].items():
+            file = os.path.join(path, f'{name}.bin')
+            if self.rows:
+                self.columns[name] = np.memmap(file, dtype=dtype, mode='r', shape=(self.rows,))
+            else:
+                self.columns[name] = np.empty(0, dtype=dtype)
+        # (index column, min/max, block)
+        self.index = np.load(os.path.join(path, INDEX_NAME))
+        # Stores written before flows.npy existed fall back to a scan
+        flows = os.path.join(path, FLOWS_NAME)
+        self.flows = np.load(flows) if self.kind == 'transfers' and os.path.exists(flows) else None
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def _candidates(self, name, low, high):
+        """Row blocks whose [min, max] on an indexed column overlaps [low, high]"""
+        i = self.header['index'].index(name)
+        mins, maxs = self.index[i]
+        return (maxs >= low) & (mins <= high)
+
+    def select(self, **ranges):
+        """Rows with every given indexed column in an inclusive (low, high) range.
+
+        e.g. select(block=(17_000_000, 18_000_000), timestamp=(t0, None)).
+        Blocks are pruned with the min/max index. When every filtered column
+        is sorted the result is a slice, so column[rows] is a zero-copy view;
+        otherwise it is an array of row numbers.
+        """
+        ranges = {name: (-2**63 if low is None else low, 2**63 - 1 if high is None else high)
+                  for name, (low, high) in ranges.items()}
+        blocks = np.ones(self.index.shape[2], dtype=bool)
+        for name, (low, high) in ranges.items():
+            blocks &= self._candidates(name, low, high)
+        hits = np.flatnonzero(blocks)
+        if len(hits) == 0:
+            return slice(0, 0)
+
+        if all(self.header['sorted'][name] for name in ranges):
+            start = int(hits[0]) * self.block_rows
+            stop = min((int(hits[-1]) + 1) * self.block_rows, self.rows)
+            # Binary search inside the candidate span only touches O(log n) pages
+            for name, (low, high) in ranges.items():
+                column = self.columns[name][start:stop]
+                first, last = np.searchsorted(column, [low, high + 1])
+                start, stop = start + int(first), start + int(max(first, last))
+            return slice(start, stop)
+
+        rows = []
+        for block in hits:
+            start = block * self.block_rows
+            stop = min(start + self.block_rows, self.rows)
+            keep = np.ones(stop - start, dtype=bool)
+            for name, (low, high) in ranges.items():
+                values = self.columns[name][start:stop]
+                keep &= (values >= low) & (values <= high)
+            rows.append(start + np.flatnonzero(keep))
+        return np.concatenate(rows)
+
+    def chunks(self, rows=slice(None), names=None, chunk_rows=16 * BLOCK_ROWS):
+        """Yield {column: array} batches over the selected rows, bounded in size"""
+        names = list(self.columns) if names is None else names
+        if isinstance(rows, slice):
+            start, stop, _ = rows.indices(self.rows)
+            for lo in range(start, stop, chunk_rows):
+                hi = min(lo + chunk_rows, stop)
+                yield {name: self.columns[name][lo:hi] for name in names}
+        else:
+            for lo in range(0, len(rows), chunk_rows):
+                part = rows[lo:lo + chunk_rows]
+                yield {name: self.columns[name][part] for name in names}
+
+    def count(self, rows):
+        """Number of rows in a selection returned by select()"""
+        return len(range(*rows.indices(self.rows))) if isinstance(rows, slice) else len(rows)
+
+
+def tokens(whole, wei):
+    """Float token amounts from the whole/wei column pair"""
+    return np.asarray(whole, dtype=np.float64) + np.asarray(wei) / WEI_PER_TOKEN
+
+
+def wei_sum(whole, wei):
+    """Exact Python-int wei total of a whole/wei column pair"""
+    wei = np.asarray(wei, dtype=np.int64)
+    return (int(np.sum(whole, dtype=np.int64)) * WEI_PER_TOKEN
+            + int(np.sum(wei // HALF_WEI)) * HALF_WEI + int(np.sum(wei % HALF_WEI)))
+
+
+def _split_wei(amount):
+    """[whole tokens, wei remainder] of an exact wei amount"""
+    return list(divmod(amount, WEI_PER_TOKEN))
+
+
+SUPPLY_COLUMNS = ['timestamp', 'sender', 'recipient', 'amount_tokens', 'amount_wei']
+
+
+def _flows(chunk):
+    """Per-row minted and burned token amounts of a transfers batch"""
+    amount = tokens(chunk['amount_tokens'], chunk['amount_wei'])
+    return (np.where(chunk['sender'] == ZERO_ADDRESS, amount, 0),
+            np.where(chunk['recipient'] == ZERO_ADDRESS, amount, 0))
+
+
+def supply_series(store, rows=slice(None), buckets=1000):
+    """Supply and cumulative burn (tokens), M4-decimated to `buckets` time columns.
+
+    Mints are transfers from the zero address and burns transfers to it, as
+    emitted by ERC20 _mint/_burn. The totals before the selection come from
+    flows.npy plus the rows of its first block that precede it. Everything is
+    scanned in chunks through a downsample.Decimator, so memory does not
+    depend on the size of the history, and the first, last, lowest and
+    highest supply and burn of every column are kept exactly. Returns
+    (timestamps, supply, burned).
+    """
+    total = store.count(rows)
+    if total == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+
+    if isinstance(rows, slice):
+        first, stop, _ = rows.indices(store.rows)
+        last = stop - 1
+    else:
+        first, last = int(rows[0]), int(rows[-1])
+    minted_total = burned_total = 0.0
+    start = 0
+    if store.flows is not None:
+        block = first // store.block_rows
+        start = block * store.block_rows
+        minted_whole, minted_wei, burned_whole, burned_wei = store.flows[:, block]
+        minted_total = float(tokens(minted_whole, minted_wei))
+        burned_total = float(tokens(burned_whole, burned_wei))
+    for chunk in store.chunks(slice(start, first), SUPPLY_COLUMNS[1:]):
+        minted, burns = _flows(chunk)
+        minted_total += minted.sum()
+        burned_total += burns.sum()
+
+    # Rows are in block order, so the selection spans its first to its last timestamp
+    x_range = store['timestamp'][[first, last]]
+    decimator = downsample.Decimator(x_range, buckets, series=2)
+    for chunk in store.chunks(rows, SUPPLY_COLUMNS):
+        minted, burns = _flows(chunk)
+        minted = np.cumsum(minted, out=minted)
+        burns = np.cumsum(burns, out=burns)
+        minted += minted_total
+        burns += burned_total
+        decimator.add(chunk['timestamp'], [minted - burns, burns])
+        minted_total, burned_total = minted[-1], burns[-1]
+    times, (supply, burned) = decimator.result()
+    return times.astype(np.int64), supply, burned
+
+
+def holder_table(store, snapshot_time=None, rows=slice(None)):
+    """governance_engine.HolderTable over a holders store.
+
+    Addresses and first-held times are passed as memory-mapped views; only
+    the float balances and the power index are materialized.
+    """
+    from governance_engine import HolderTable
+    columns = store.columns
+    return HolderTable(columns['address'][rows],
+                       tokens(columns['balance_tokens'][rows], columns['balance_wei'][rows]),
+                       columns['first_held'][rows], snapshot_time)
+
+
+def _split_amounts(texts, units):
+    """Exact (whole tokens, wei) columns from decimal strings"""
+    whole = np.empty(len(texts), dtype=np.int64)
+    wei = np.empty(len(texts), dtype=np.int64)
+    for i, text in enumerate(texts):
+        text = text.strip().replace(',', '')
+        if units == 'tokens':
+            integer, _, fraction = text.partition('.')
+            whole[i] = int(integer or 0)
+            wei[i] = int(fraction[:18].ljust(18, '0'))
+        else:
+            whole[i] = int(text[:-18] or 0)
+            wei[i] = int(text[-18:])
+    return whole, wei
+
+
+def _parse_time(text):
+    text = str(text).strip()
+    if text.lstrip('-').isdigit():
+        return int(text)
+    moment = datetime.fromisoformat(text.replace(' UTC', '+00:00').replace('Z', '+00:00'))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def resolve_fields(kind, fields):
+    """Map schema fields to the export's column names"""
+    resolved = {}
+    for field, names in ALIASES[kind].items():
+        match = next((name for name in names if name in fields), None)
+        if match is None and field not in OPTIONAL:
+            raise ValueError(f'no column for {field!r}; expected one of {names}')
+        resolved[field] = match
+    return resolved
+
+
+def export_columns(kind, records, fields, units):
+    """Convert a list of export records (dicts) to schema columns"""
+    def get(field, default='0'):
+        name = fields[field]
+        return [str(r[name]) if name else default for r in records]
+
+    if kind == 'transfers':
+        whole, wei = _split_amounts(get('amount'), units)
+        return {'block': np.array(get('block'), dtype=np.int64),
+                'timestamp': np.array([_parse_time(t) for t in get('timestamp')], dtype=np.int64),
+                'log_index': np.array(get('log_index'), dtype=np.int32),
+                'sender': decode_addresses(get('sender')),
+                'recipient': decode_addresses(get('recipient')),
+                'amount_tokens': whole, 'amount_wei': wei}
+    whole, wei = _split_amounts(get('balance'), units)
+    return {'address': decode_addresses(get('address')),
+            'balance_tokens': whole, 'balance_wei': wei,
+            'first_held_block': np.array(get('first_held_block'), dtype=np.int64),
+            'first_held': np.array([_parse_time(t) for t in get('first_held')], dtype=np.int64)}
+
+
+def _records(path):
+    """Yield the field names, then every record, of a CSV or JSON-lines export"""
+    with open(path, newline='') as handle:
+        if path.endswith(('.jsonl', '.ndjson', '.json')):
+            records = (json.loads(line) for line in handle if line.strip())
+            first = next(records, None)
+            yield list(first or ())
+            if first is not None:
+                yield first
+                yield from records
+        else:
+            reader = csv.DictReader(handle)
+            yield reader.fieldnames or []
+            yield from reader
+
+
+def convert(source, destination, kind, units='wei', batch_rows=100_000):
+    """Stream a CSV/JSONL export into a store, holding one batch at a time"""
+    with contextlib.closing(_records(source)) as records:
+        fields = resolve_fields(kind, next(records))
+        with StoreWriter(destination, kind) as writer:
+            batch = []
+            for record in records:
+                batch.append(record)
+                if len(batch) == batch_rows:
+                    writer.append(export_columns(kind, batch, fields, units))
+                    batch = []
+            if batch:
+                writer.append(export_columns(kind, batch, fields, units))
+    return ColumnStore(destination)
+
+
+def synthetic_transfers(path, n, seed=0, start_block=17_000_000, start_time=1_680_000_000,
+                        batch_rows=1_000_000):
+    """Write n random fee-paying transfers, with their burns, to a new store"""
+    rng = np.random.default_rng(seed)
+    accounts = rng.integers(1, 256, (10_000, 20), dtype=np.uint8).view('S20').reshape(-1)
+    with StoreWriter(path, 'transfers') as writer:
+        writer.append({'block': [start_block], 'timestamp': [start_time], 'log_index': [0],
+                       'sender': [ZERO_ADDRESS], 'recipient': accounts[:1],
+                       'amount_tokens': [314_159_265], 'amount_wei': [0]})
+        block, written = start_block, 1
+        while written < n:
+            m = min(batch_rows, n - written) // 2
+            if m == 0:
+                break
+            blocks = block + np.cumsum(rng.integers(0, 2, m))
+            amount = np.minimum(rng.lognormal(3, 2, m), 10**7).astype(np.int64)
+            # Each transfer is followed by its 2% burn from the recipient
+            burn = amount * 2
+            rows = np.empty(2 * m, dtype=np.int64)
+            rows[0::2] = blocks
+            rows[1::2] = blocks
+            senders = accounts[rng.integers(0, len(accounts), m)]
+            recipients = accounts[rng.integers(0, len(accounts), m)]
+            writer.append({
+                'block': rows,
+                'timestamp': start_time + (rows - start_block) * 12,
+                'log_index': np.tile([0, 1], m),
+                'sender': np.stack([senders, recipients], 1).ravel(),
+                'recipient': np.stack([recipients, np.full(m, ZERO_ADDRESS, 'S20')], 1).ravel(),
+                'amount_tokens': np.stack([amount, burn // 100], 1).ravel(),
+                'amount_wei': np.stack([np.zeros(m, np.int64),
+                                        (burn % 100) * (WEI_PER_TOKEN // 100)], 1).ravel(),
+            })
+            block = int(blocks[-1]) + 1
+            written += 2 * m
+    return ColumnStore(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Columnar store for chain exports')
+    commands = parser.add_subparsers(dest='command', required=True)
+    to_store = commands.add_parser('convert', help='CSV/JSONL export -> store')
+    to_store.add_argument('kind', choices=sorted(SCHEMAS))
+    to_store.add_argument('source')
+    to_store.add_argument('destination')
+    to_store.add_argument('--units', choices=['wei', 'tokens'], default='wei',
+                          help='unit of the amount/balance column (default: wei)')
+    to_store.add_argument('--batch-rows', type=int, default=100_000)
+    info = commands.add_parser('info', help='print a store header and index summary')
+    info.add_argument('path')
+    fake = commands.add_parser('synthetic', help='write a synthetic transfers store')
+    fake.add_argument('path')
+    fake.add_argument('-n', '--transfers', type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == 'convert':
+        store = convert(args.source, args.destination, args.kind, args.units, args.batch_rows)
+    elif args.command == 'synthetic':
+        store = synthetic_transfers(args.path, args.transfers)
+    else:
+        store = ColumnStore(args.path)
+    elapsed = time.perf_counter() - start
+
+    print(f'{store.kind}: {len(store):,} rows, {store.index.shape[2]:,} index blocks '
+          f'({elapsed:.2f}s)')
+    for i, name in enumerate(store.header['index']):
+        if store.index.shape[2]:
+            low, high = store.index[i, 0].min(), store.index[i, 1].max()
+            order = 'sorted' if store.header['sorted'][name] else 'unsorted'
+            print(f'  {name:<18}{low:>14,} .. {high:<14,} {order}')
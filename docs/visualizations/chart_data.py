@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+
+import tokenomics_model as model
+
+# Compact binary export of the series behind the animations, for drawing and
+# animating them in the browser (docs/script.js) instead of shipping GIFs.
+#
+# chart_data.bin holds one block per series; chart_data.json indexes them and
+# describes the charts drawn from them. A series is a (frames, points) array:
+#
+#   q16  values quantized to uint16 over the series' [min, max], then delta
+#        coded: `order` times along each row (twice by default, since the
+#        curves are smooth), and each row's first value once against the
+#        previous row's. Deltas wrap modulo 2**16, so they always fit in
+#        uint16, and are stored as int8 when every one fits. Worst-case error
+#        is (max - min) / 131070.
+#   f16  (value - min) / (max - min) as float16, not delta coded.
+#
+# Blocks are deflated (zlib) unless compression is turned off; the browser
+# inflates them with DecompressionStream('deflate'). Integers are little
+# endian. Axes that are evenly spaced are described in the index, not stored.
+
+FORMAT_VERSION = 1
+DATA_NAME = 'chart_data.bin'
+INDEX_NAME = 'chart_data.json'
+ENCODINGS = ('q16', 'f16')
+NUM_FRAMES = 100
+DELTA_ORDER = 2
+_Q_MAX = 2**16 - 1
+
+output_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def _range(values):
+    low, high = float(values.min()), float(values.max())
+    return low, (high if high > low else low + 1.0)
+
+
+def encode(values, encoding='q16', compress=True, order=DELTA_ORDER):
+    """(block bytes, index entry) for a (frames, points) array"""
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    low, high = _range(values)
+    entry = {'shape': list(values.shape), 'encoding': encoding, 'min': low, 'max': high}
+    if encoding == 'q16':
+        q = np.rint((values - low) / (high - low) * _Q_MAX).astype(np.int64)
+        deltas = q
+        for _ in range(order):
+            deltas = np.diff(deltas, axis=1, prepend=0)
+        deltas[:, 0] = np.diff(q[:, 0], prepend=0)
+        entry['order'] = order
+        wrapped = (deltas + 2**15) % 2**16 - 2**15  # signed, modulo 2**16
+        if wrapped.min() >= -128 and wrapped.max() <= 127:
+            raw, entry['dtype'] = wrapped.astype('<i1').tobytes(), 'int8'
+        else:
+            raw, entry['dtype'] = (wrapped % 2**16).astype('<u2').tobytes(), 'uint16'
+        entry['max_error'] = (high - low) / (2 * _Q_MAX)
+    elif encoding == 'f16':
+        raw, entry['dtype'] = ((values - low) / (high - low)).astype('<f2').tobytes(), 'float16'
+    else:
+        raise ValueError(f'unknown encoding {encoding!r} (expected one of {ENCODINGS})')
+    entry['compression'] = 'deflate' if compress else None
+    return (zlib.compress(raw, 9) if compress else raw), entry
+
+
+def decode(block, entry):
+    """Inverse of encode(), as a float array"""
+    raw = zlib.decompress(block) if entry['compression'] == 'deflate' else block
+    shape = tuple(entry['shape'])
+    low, high = entry['min'], entry['max']
+    if entry['encoding'] == 'f16':
+        return np.frombuffer(raw, '<f2').astype(float).reshape(shape) * (high - low) + low
+    deltas = np.frombuffer(raw, '<i1' if entry['dtype'] == 'int8' else '<u2')
+    q = deltas.astype(np.int64).reshape(shape)
+    q[:, 0] = np.cumsum(q[:, 0])
+    for _ in range(entry['order']):
+        q = np.cumsum(q, axis=1)
+    return low + (q % 2**16) * (high - low) / _Q_MAX
+
+
+def _axis(start, stop, num):
+    """An evenly spaced axis, as stored in the index"""
+    return {'start': float(start), 'stop': float(stop), 'num': int(num)}
+
+
+def _steps(start, step, num, decimals=1):
+    """Per-frame values start + i * step, as stored in the index"""
+    return {'start': float(start), 'step': float(step), 'num': int(num), 'decimals': decimals}
+
+
+def chart_series(num_frames=NUM_FRAMES):
+    """{name: (values, extra index fields)}, the data behind tokenomics_animator"""
+    periods = np.arange(num_frames) / num_frames
+    transactions, supply = model.supply_curves(periods, num_points=100)
+    _, burned = model.burned_curves(periods, num_points=100)
+    ratio, impact = model.impact_curves()
+    holding_times = np.arange(num_frames) * 365 / num_frames
+    balances, weights = model.governance_curves(holding_times, num_points=100)
+    hours, tx_limit = model.rate_curves()
+    volumes = np.arange(num_frames) * 5 / num_frames
+    current_hours = np.arange(num_frames) * 24 / num_frames
+
+    transactions_axis = _axis(transactions[0], transactions[-1], len(transactions))
+    return {
+        'supply': (supply[0], {'x': transactions_axis}),
+        'burned': (burned[0], {'x': transactions_axis}),
+        'impact_curve': (impact, {'x': _axis(ratio[0], ratio[-1], len(ratio))}),
+        # One point per frame: x from the index, y stored
+        'impact_path': (model.price_impact(volumes)[:, None],
+                        {'x': _steps(0, 5 / num_frames, num_frames, 2)}),
+        'governance': (weights, {'x': _axis(balances[0], balances[-1], len(balances)),
+                                 'frames': _steps(0, 365 / num_frames, num_frames)}),
+        'rate_curve': (tx_limit, {'x': _axis(hours[0], hours[-1], len(hours))}),
+        'rate_path': (model.transaction_limit(current_hours)[:, None],
+                      {'x': _steps(0, 24 / num_frames, num_frames),
+                       'frames': _steps(0, 24 / num_frames, num_frames)}),
+    }
+
+
+def chart_layout():
+    """How the browser draws each chart, mirroring tokenomics_animator's scenes"""
+    s0 = float(model.INITIAL_SUPPLY)
+    rate_max = float(model.MAX_TX_PER_HOUR * 24 * 1.1)
+    return {
+        'supply': {'kind': 'line', 'series': ['supply'], 'color': '#0000ff',
+                   'title': 'MemePi Supply Dynamics', 'xlim': [0, 1000], 'ylim': [0, s0 * 1.1],
+                   'xlabel': 'Number of Transactions (thousands)', 'ylabel': 'Total Supply',
+                   'yformat': 'billions'},
+        'distribution': {'kind': 'bands', 'series': ['supply', 'burned'],
+                         'colors': ['#2ecc71', '#e74c3c'],
+                         'labels': ['Remaining Supply', 'Burned Tokens'],
+                         'title': 'Token Distribution', 'xlim': [0, 1000], 'ylim': [0, s0 * 1.1],
+                         'xlabel': 'Number of Transactions (thousands)',
+                         'ylabel': 'Token Amount', 'yformat': 'billions'},
+        'price_impact': {'kind': 'path', 'curve': 'impact_curve', 'path': 'impact_path',
+                         'colors': ['rgba(255, 0, 0, 0.3)', '#0000ff'],
+                         'hline': [float(np.pi / 2), 'Maximum Impact (π/2)'],
+                         'title': 'MemePi Price Impact Model', 'xlim': [0, 5], 'ylim': [0, 2],
+                         'xlabel': 'Transaction Volume / Liquidity Pool Size',
+                         'ylabel': 'Price Impact'},
+        'governance': {'kind': 'line', 'series': ['governance'], 'color': '#0000ff',
+                       'title': 'MemePi Governance Weight (Holding Time: {frame} days)',
+                       'xlim': [0, 1000000], 'ylim': [0, 1000000],
+                       'xlabel': 'Token Balance', 'ylabel': 'Voting Power'},
+        'transaction_rate': {'kind': 'path', 'curve': 'rate_curve', 'path': 'rate_path',
+                             'colors': ['rgba(0, 0, 255, 0.3)', '#ff0000'],
+                             'title': 'MemePi Transaction Rate (Hour: {frame})',
+                             'xlim': [0, 24], 'ylim': [0, rate_max],
+                             'xlabel': 'Time (hours)',
+                             'ylabel': 'Cumulative Transactions Allowed'},
+    }
+
+
+def export(directory=None, num_frames=NUM_FRAMES, encoding='q16', compress=True):
+    """Write chart_data.bin and chart_data.json; returns the index"""
+    directory = directory or output_dir
+    blocks, series = [], {}
+    offset = 0
+    for name, (values, extra) in chart_series(num_frames).items():
+        block, entry = encode(values, encoding, compress)
+        padding = -len(block) % 4  # keeps uncompressed typed-array views aligned
+        series[name] = {'offset': offset, 'bytes': len(block), **entry, **extra}
+        blocks.append(block + b'\0' * padding)
+        offset += len(block) + padding
+    index = {'version': FORMAT_VERSION, 'data': DATA_NAME, 'frames': num_frames, 'fps': 20,
+             'series': series, 'charts': chart_layout()}
+
+    for name, payload in ((DATA_NAME, b''.join(blocks)),
+                          (INDEX_NAME, json.dumps(index, separators=(',', ':')).encode())):
+        path = os.path.join(directory, name)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(payload)
+        os.replace(path + '.tmp', path)
+    return index
+
+
+def load(directory=None):
+    """(index, {name: decoded array}) from an export"""
+    directory = directory or output_dir
+    with open(os.path.join(directory, INDEX_NAME)) as f:
+        index = json.load(f)
+    with open(os.path.join(directory, index['data']), 'rb') as f:
+        data = f.read()
+    return index, {name: decode(data[entry['offset']:entry['offset'] + entry['bytes']], entry)
+                   for name, entry in index['series'].items()}
+
+
+def check(directory=None, num_frames=NUM_FRAMES):
+    """Largest decoding error of each series relative to its range"""
+    index, decoded = load(directory)
+    return {name: float(np.max(np.abs(decoded[name] - np.atleast_2d(values)))
+                        / (index['series'][name]['max'] - index['series'][name]['min']))
+            for name, (values, _) in chart_series(num_frames).items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Export the animation series as compact binary data')
+    parser.add_argument('--frames', type=int, default=NUM_FRAMES,
+                        help=f'frames per chart (default: {NUM_FRAMES})')
+    parser.add_argument('--encoding', choices=ENCODINGS, default='q16')
+    parser.add_argument('--no-compress', action='store_true', help='store blocks uncompressed')
+    parser.add_argument('--check', action='store_true',
+                        help='decode the export and report the error of every series')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = export(output_dir, args.frames, args.encoding, not args.no_compress)
+    elapsed = time.perf_counter() - start
+    for name, entry in index['series'].items():
+        print(f"{name:<14} {'x'.join(map(str, entry['shape'])):>9} {entry['dtype']:>8} "
+              f"{entry['bytes']:>8} bytes")
+    data_bytes = os.path.getsize(os.path.join(output_dir, DATA_NAME))
+    index_bytes = os.path.getsize(os.path.join(output_dir, INDEX_NAME))
+    print(f'{DATA_NAME}: {data_bytes} bytes, {INDEX_NAME}: {index_bytes} bytes '
+          f'({elapsed * 1000:.0f} ms)')
+    gifs = [name for name in os.listdir(output_dir) if name.endswith('_animation.gif')]
+    if gifs:
+        gif_bytes = sum(os.path.getsize(os.path.join(output_dir, name)) for name in gifs)
+        print(f'{len(gifs)} GIF animation(s): {gif_bytes} bytes '
+              f'({gif_bytes / (data_bytes + index_bytes):.0f}x larger)')
+    if args.check:
+        for name, error in check(output_dir, args.frames).items():
+            print(f'  {name:<14} max error {error:.2e} of range')
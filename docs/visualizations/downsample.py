@@ -0,0 +1,232 @@
+import argparse
+import math
+import time
+
+import numpy as np
+import matplotlib
+
+# Decimation between the data and the plotting calls, so a line drawn from
+# millions of samples costs what one drawn from a few thousand does.
+#
+# The default is M4: the x range is split into one bucket per output pixel
+# column, and each bucket keeps its first, last, minimum and maximum sample.
+# A line rasterized from those at most 4 points per column covers exactly the
+# pixels the full line does, so peaks and dips survive. Several series that
+# share x (stackplot layers, fill_between bounds) keep the union of each
+# one's extremes, evaluated for all of them. LTTB (largest triangle three
+# buckets) is available for a fixed point budget where shape, not exact
+# extremes, matters.
+#
+# Decimator consumes the data in chunks, e.g. from memory-mapped columns,
+# and keeps O(buckets) state, so input length only affects the scan. Inputs
+# with at most POINTS_PER_BUCKET points per pixel column are drawn unchanged.
+
+POINTS_PER_BUCKET = 4
+METHODS = ('m4', 'lttb')
+
+
+def _numeric(x):
+    """x as float64 for bucketing; datetime64 becomes its integer count"""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.view(np.int64)
+    return x.astype(np.float64, copy=False)
+
+
+def _runs(bucket):
+    """Start and end index of each run of equal bucket ids"""
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    return starts, np.r_[starts[1:], len(bucket)] - 1
+
+
+def _run_extremes(y, starts, ends):
+    """(argmin, argmax) of y within each run, first occurrence, in O(n)"""
+    lengths = ends - starts + 1
+    result = []
+    for reduce in (np.fmin, np.fmax):
+        values = reduce.reduceat(y, starts)
+        hit = np.flatnonzero(y == np.repeat(values, lengths))
+        run = np.searchsorted(starts, hit, side='right') - 1
+        first = np.r_[True, run[1:] != run[:-1]]
+        index = starts.copy()  # runs of NaN keep their first sample
+        index[run[first]] = hit[first]
+        result.append(index)
+    return result
+
+
+def pixel_columns(ax, dpi=None):
+    """Width of an axes in output pixels at dpi (default: the savefig dpi)"""
+    fig = ax.figure
+    if dpi is None:
+        dpi = matplotlib.rcParams['savefig.dpi']
+        dpi = fig.dpi if dpi == 'figure' else dpi
+    return max(1, math.ceil(ax.get_position().width * fig.get_figwidth() * dpi))
+
+
+class Decimator:
+    """Streaming M4 over chunks of (x, ys) with x ascending across chunks.
+
+    x_range is (low, high) of the whole input, e.g. the first and last
+    timestamp of a memory-mapped column; ys has one row per series sharing x.
+    State is a fixed (buckets, 2 + 2 * series) table of candidate samples.
+    """
+
+    def __init__(self, x_range, buckets, series=1):
+        self.low, self.high = (float(v) for v in x_range)
+        self.buckets = int(buckets)
+        self.series = series
+        kinds = 2 + 2 * series  # first, last, then min and max of each series
+        self.position = np.full((self.buckets, kinds), -1, dtype=np.int64)
+        self.x = np.zeros((self.buckets, kinds))
+        self.ys = np.zeros((self.buckets, kinds, series))
+        self.extreme = np.empty((self.buckets, 2 * series))
+        self.extreme[:, 0::2] = np.inf
+        self.extreme[:, 1::2] = -np.inf
+        self.seen = 0
+
+    def _bucket(self, x):
+        scale = self.buckets / (self.high - self.low) if self.high > self.low else 0.0
+        return np.clip(((x - self.low) * scale).astype(np.int64), 0, self.buckets - 1)
+
+    def add(self, x, ys):
+        """Fold one chunk in; ys is (series, n) or (n,) for a single series"""
+        x = _numeric(x)
+        ys = np.asarray(ys, dtype=np.float64).reshape(self.series, -1)
+        if len(x) == 0:
+            return
+        starts, ends = _runs(self._bucket(x))
+        ids = self._bucket(x[starts])
+        positions = self.seen + np.arange(len(x))
+
+        def keep(kind, rows, local):
+            self.position[rows, kind] = positions[local]
+            self.x[rows, kind] = x[local]
+            self.ys[rows, kind] = ys[:, local].T
+
+        fresh = self.position[ids, 0] < 0
+        keep(0, ids[fresh], starts[fresh])
+        keep(1, ids, ends)
+        for s in range(self.series):
+            for j, (local, better) in enumerate(zip(_run_extremes(ys[s], starts, ends),
+                                                    (np.less, np.greater))):
+                improved = better(ys[s, local], self.extreme[ids, 2 * s + j])
+                self.extreme[ids[improved], 2 * s + j] = ys[s, local[improved]]
+                keep(2 + 2 * s + j, ids[improved], local[improved])
+        self.seen += len(x)
+
+    def result(self):
+        """(x, ys) of the kept samples in input order; ys is (series, m)"""
+        taken = self.position >= 0
+        _, first = np.unique(self.position[taken], return_index=True)
+        x = self.x[taken][first]
+        ys = self.ys[taken][first].T
+        return x, ys
+
+
+def m4(x, ys, buckets):
+    """Indices of the samples M4 keeps for sorted x and (series, n) or (n,) ys"""
+    x = _numeric(x)
+    ys = np.asarray(ys, dtype=np.float64).reshape(-1, len(x))
+    n = len(x)
+    if n <= POINTS_PER_BUCKET * buckets:
+        return np.arange(n)
+    low, high = x[0], x[-1]
+    scale = buckets / (high - low) if high > low else 0.0
+    starts, ends = _runs(np.clip(((x - low) * scale).astype(np.int64), 0, buckets - 1))
+    keep = [starts, ends]
+    for y in ys:
+        keep.extend(_run_extremes(y, starts, ends))
+    return np.unique(np.concatenate(keep))
+
+
+def lttb(x, y, points):
+    """Indices of the samples largest-triangle-three-buckets keeps out of sorted x, y"""
+    x = _numeric(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    keep = np.empty(points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        nxt_lo, nxt_hi = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+        nxt_hi = max(nxt_hi, nxt_lo + 1)
+        cx, cy = x[nxt_lo:nxt_hi].mean(), y[nxt_lo:nxt_hi].mean()
+        ax, ay = x[previous], y[previous]
+        area = np.abs((ax - cx) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+        previous = lo + int(np.argmax(area))
+        keep[i + 1] = previous
+    return keep
+
+
+def reduce(x, ys, buckets, method='m4'):
+    """(x, ys) decimated to about `buckets` pixel columns; ys is one series or a list"""
+    ys = np.asarray(ys, dtype=np.float64)
+    stacked = np.atleast_2d(ys)
+    if method == 'm4':
+        keep = m4(x, stacked, buckets)
+    elif method == 'lttb':
+        keep = lttb(x, stacked[0], POINTS_PER_BUCKET * buckets)
+    else:
+        raise ValueError(f'unknown method {method!r} (expected one of {METHODS})')
+    x = np.asarray(x)[keep]
+    return (x, stacked[0, keep]) if ys.ndim == 1 else (x, stacked[:, keep])
+
+
+def plot(ax, x, y, *args, dpi=None, method='m4', **kwargs):
+    """ax.plot(x, y, ...) through M4 (or LTTB) at the axes' pixel width"""
+    x, y = reduce(x, y, pixel_columns(ax, dpi), method)
+    return ax.plot(x, y, *args, **kwargs)
+
+
+def step(ax, x, y, *args, dpi=None, **kwargs):
+    """ax.step(x, y, ...) through M4 at the axes' pixel width"""
+    x, y = reduce(x, y, pixel_columns(ax, dpi))
+    return ax.step(x, y, *args, **kwargs)
+
+
+def stackplot(ax, x, layers, dpi=None, **kwargs):
+    """ax.stackplot(x, layers, ...) keeping every band edge's extremes"""
+    layers = np.asarray(layers, dtype=np.float64)
+    keep = m4(x, np.cumsum(layers, axis=0), pixel_columns(ax, dpi))
+    return ax.stackplot(np.asarray(x)[keep], layers[:, keep], **kwargs)
+
+
+def fill_between(ax, x, y1, y2=0, dpi=None, **kwargs):
+    """ax.fill_between(x, y1, y2, ...) keeping both edges' extremes"""
+    y1, y2 = np.broadcast_arrays(np.asarray(y1, dtype=np.float64),
+                                 np.asarray(y2, dtype=np.float64))
+    keep = m4(x, np.stack([y1, y2]), pixel_columns(ax, dpi))
+    return ax.fill_between(np.asarray(x)[keep], y1[keep], y2[keep], **kwargs)
+
+
+def _benchmark(sizes, buckets):
+    """Decimation time and kept points for random walks of each size"""
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        x = np.arange(n, dtype=np.float64)
+        y = np.cumsum(rng.standard_normal(n))
+        start = time.perf_counter()
+        keep = m4(x, y, buckets)
+        batch = time.perf_counter() - start
+        decimator = Decimator((0, n - 1), buckets)
+        start = time.perf_counter()
+        for lo in range(0, n, 1 << 20):
+            decimator.add(x[lo:lo + (1 << 20)], y[lo:lo + (1 << 20)])
+        kept_x, kept_y = decimator.result()
+        streamed = time.perf_counter() - start
+        exact = (kept_y.max() == y.max()) and (kept_y.min() == y.min())
+        print(f'{n:>12,} points -> {len(keep):>5} (m4, {batch * 1000:7.1f} ms), '
+              f'{len(kept_x):>5} (streamed, {streamed * 1000:7.1f} ms), extremes kept: {exact}')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark M4 decimation on random walks')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10**4, 10**6, 10**7])
+    parser.add_argument('--buckets', type=int, default=1000,
+                        help='pixel columns (default: 1000, a 10 inch axes at 100 dpi)')
+    args = parser.parse_args()
+    _benchmark(args.sizes, args.buckets)
@@ -0,0 +1,382 @@
+import argparse
+import csv
+import json
+import os
+import time
+
+import numpy as np
+
+import chain_store
+from governance_engine import decode_addresses, encode_address
+
+# Incremental supply/burn aggregation over MemePiToken Transfer events.
+#
+# Events are consumed in (block, log_index) order and folded into exact
+# running totals (minted, burned, marketing fees) plus one row per hour:
+# the totals at the end of that hour and the number of transfers in it.
+# The state and the byte/row cursor of the source are checkpointed together
+# in one .npz file, so each run only reads and applies events appended
+# since the previous one. A local event file replays what a node would
+# stream: a CSV or JSON-lines export, or a chain_store transfers store.
+#
+# Burns are Transfer(holder -> 0x0) from _burn. The marketing fee is the
+# Transfer(holder -> marketingWallet) emitted right after that holder's
+# burn in the same transaction, with burn = 2 * fee (+1 from truncation).
+
+SECONDS_PER_HOUR = 3600
+
+
+class Aggregator:
+    """Running supply, burn, fee and hourly transfer-count totals with a disk checkpoint"""
+
+    def __init__(self, checkpoint, marketing_wallet=None):
+        self.checkpoint = checkpoint
+        self.source = None
+        self.cursor = 0
+        self.last = (-1, -1)  # (block, log_index) of the last applied event
+        self.minted = self.burned = self.fees = 0  # wei
+        self.events = 0
+        # The previous event, for matching a fee transfer to its burn
+        self.previous = (-1, b'', b'', 0, 0)  # (block, sender, recipient, whole, wei)
+        self.marketing_wallet = marketing_wallet
+        self.hours = np.empty(0, dtype=np.int64)
+        self.hour_minted = np.empty(0)
+        self.hour_burned = np.empty(0)
+        self.hour_fees = np.empty(0)
+        self.hour_counts = np.empty(0, dtype=np.int64)
+        if checkpoint is not None and os.path.exists(checkpoint):
+            self._load()
+
+    def _load(self):
+        with np.load(self.checkpoint) as data:
+            state = json.loads(str(data['state']))
+            self.hours = data['hours']
+            self.hour_minted = data['hour_minted']
+            self.hour_burned = data['hour_burned']
+            self.hour_fees = data['hour_fees']
+            self.hour_counts = data['hour_counts']
+        self.source = state['source']
+        self.cursor = state['cursor']
+        self.last = tuple(state['last'])
+        self.minted, self.burned, self.fees = (int(state[k]) for k in ('minted', 'burned', 'fees'))
+        self.events = state['events']
+        block, sender, recipient, whole, wei = state['previous']
+        self.previous = (block, bytes.fromhex(sender), bytes.fromhex(recipient), whole, wei)
+        if state['marketing_wallet'] is not None:
+            wallet = bytes.fromhex(state['marketing_wallet'])
+            if self.marketing_wallet not in (None, wallet):
+                raise ValueError('checkpoint was built for a different marketing wallet')
+            self.marketing_wallet = wallet
+
+    def save(self):
+        """Write the checkpoint atomically (temp file, then rename)"""
+        block, sender, recipient, whole, wei = self.previous
+        state = {'source': self.source, 'cursor': self.cursor, 'last': list(self.last),
+                 'minted': str(self.minted), 'burned': str(self.burned), 'fees': str(self.fees),
+                 'events': self.events,
+                 'previous': [block, sender.hex(), recipient.hex(), whole, wei],
+                 'marketing_wallet': self.marketing_wallet.hex() if self.marketing_wallet else None}
+        partial = self.checkpoint + '.tmp.npz'
+        np.savez(partial, state=json.dumps(state), hours=self.hours,
+                 hour_minted=self.hour_minted, hour_burned=self.hour_burned,
+                 hour_fees=self.hour_fees, hour_counts=self.hour_counts)
+        os.replace(partial, self.checkpoint)
+
+    @property
+    def supply(self):
+        """Current supply in wei"""
+        return self.minted - self.burned
+
+    def apply(self, columns):
+        """Fold one batch of transfer columns (chain_store schema) into the totals.
+
+        Events at or before the last applied (block, log_index), or repeating
+        one earlier in the batch, are skipped, so overlapping replays are
+        harmless wherever the batches split; a batch that goes backwards
+        otherwise is an error.
+        """
+        block = np.asarray(columns['block'], dtype=np.int64)
+        log_index = np.asarray(columns['log_index'], dtype=np.int64)
+        # One sortable key per event (log_index < 2**31, so it fits below bit 32)
+        key = block * 2**32 + log_index
+        last = self.last[0] * 2**32 + self.last[1]
+        seen = np.maximum.accumulate(np.concatenate([[last], key[:-1]])) if len(key) else key
+        fresh = key > seen
+        if not fresh.all():
+            behind = ~fresh & (key > last)
+            if not np.isin(key[behind], key[fresh]).all():
+                raise ValueError('events must be in (block, log_index) order')
+            columns = {name: np.asarray(values)[fresh] for name, values in columns.items()}
+            block, log_index = block[fresh], log_index[fresh]
+        n = len(block)
+        if n == 0:
+            return 0
+
+        sender = np.asarray(columns['sender'])
+        recipient = np.asarray(columns['recipient'])
+        whole = np.asarray(columns['amount_tokens'], dtype=np.int64)
+        wei = np.asarray(columns['amount_wei'], dtype=np.int64)
+        mint = sender == chain_store.ZERO_ADDRESS
+        burn = recipient == chain_store.ZERO_ADDRESS
+        fee = self._fee_mask(block, sender, recipient, whole, wei, burn)
+
+        self.minted += chain_store.wei_sum(whole[mint], wei[mint])
+        self.burned += chain_store.wei_sum(whole[burn], wei[burn])
+        self.fees += chain_store.wei_sum(whole[fee], wei[fee])
+        self._add_hours(np.asarray(columns['timestamp'], dtype=np.int64),
+                        chain_store.tokens(whole, wei), mint, burn, fee)
+
+        self.last = (int(block[-1]), int(log_index[-1]))
+        self.previous = (int(block[-1]), bytes(sender[-1]).ljust(20, b'\0'),
+                         bytes(recipient[-1]).ljust(20, b'\0'), int(whole[-1]), int(wei[-1]))
+        self.events += n
+        return n
+
+    def _fee_mask(self, block, sender, recipient, whole, wei, burn):
+        """Transfers to the marketing wallet that directly follow the sender's burn"""
+        if self.marketing_wallet is None:
+            return np.zeros(len(block), dtype=bool)
+        prev_block = np.concatenate([[self.previous[0]], block[:-1]])
+        prev_sender = np.concatenate([np.array([self.previous[1]], dtype='S20'), sender[:-1]])
+        prev_burn = np.concatenate([[self.previous[2] == chain_store.ZERO_ADDRESS], burn[:-1]])
+        prev_whole = np.concatenate([[self.previous[3]], whole[:-1]])
+        prev_wei = np.concatenate([[self.previous[4]], wei[:-1]])
+        # burn = amount // 50 and fee = amount // 100, so burn - 2 * fee is 0 or 1 wei;
+        # the whole-token difference is bounded first so the wei difference fits in int64
+        whole_diff = prev_whole - 2 * whole
+        near = np.abs(whole_diff) <= 2
+        diff = np.where(near, whole_diff, 0) * chain_store.WEI_PER_TOKEN + (prev_wei - 2 * wei)
+        ratio = near & ((diff == 0) | (diff == 1))
+        candidate = ((recipient == self.marketing_wallet) & prev_burn &
+                     (prev_block == block) & (prev_sender == sender))
+        return candidate & ratio
+
+    def _add_hours(self, timestamps, amount, mint, burn, fee):
+        """Extend the hourly series with a batch (timestamps non-decreasing)"""
+        minted = np.cumsum(np.where(mint, amount, 0))
+        burned = np.cumsum(np.where(burn, amount, 0))
+        fees = np.cumsum(np.where(fee, amount, 0))
+        if len(self.hours):
+            minted += self.hour_minted[-1]
+            burned += self.hour_burned[-1]
+            fees += self.hour_fees[-1]
+
+        hours = timestamps // SECONDS_PER_HOUR
+        starts = np.flatnonzero(np.concatenate([[True], hours[1:] != hours[:-1]]))
+        ends = np.append(starts[1:], len(hours)) - 1
+        counts = np.diff(np.append(starts, len(hours)))
+        unique = hours[starts]
+
+        # The first hour of the batch may continue the last checkpointed hour
+        if len(self.hours) and unique[0] == self.hours[-1]:
+            self.hour_counts[-1] += counts[0]
+            self.hour_minted[-1] = minted[ends[0]]
+            self.hour_burned[-1] = burned[ends[0]]
+            self.hour_fees[-1] = fees[ends[0]]
+            unique, ends, counts = unique[1:], ends[1:], counts[1:]
+        self.hours = np.concatenate([self.hours, unique])
+        self.hour_minted = np.concatenate([self.hour_minted, minted[ends]])
+        self.hour_burned = np.concatenate([self.hour_burned, burned[ends]])
+        self.hour_fees = np.concatenate([self.hour_fees, fees[ends]])
+        self.hour_counts = np.concatenate([self.hour_counts, counts])
+
+    def update(self, source, units='wei', batch_rows=100_000, on_batch=None, on_error=None):
+        """Apply every event added to `source` since the last checkpoint, then save.
+
+        `source` is a CSV/JSON-lines event file (read from the saved byte
+        offset, ignoring a trailing partial line) or a chain_store
+        transfers directory (read from the saved row). on_batch(columns) is
+        called after each batch is applied. A line of the file that does not
+        parse or decode raises ValueError; with on_error it is skipped and its
+        message passed to on_error(message) instead. Returns the number of events
+        applied; with checkpoint=None nothing is saved.
+        """
+        source = os.path.abspath(source)
+        if self.source not in (None, source):
+            raise ValueError(f'checkpoint belongs to {self.source}')
+        self.source = source
+        applied = 0
+        if os.path.isdir(source):
+            store = chain_store.ColumnStore(source)
+            batches = ((chunk, self.cursor + len(chunk['block'])) for chunk in
+                       store.chunks(slice(self.cursor, None), chunk_rows=batch_rows))
+        else:
+            batches = _read_events(source, self.cursor, units, batch_rows, on_error)
+        for columns, cursor in batches:
+            if columns is not None:
+                applied += self.apply(columns)
+            self.cursor = cursor
+            if columns is not None and on_batch is not None:
+                on_batch(columns)
+        if self.checkpoint is not None:
+            self.save()
+        return applied
+
+    def series(self, points=1000):
+        """Downsampled hourly series for plotting.
+
+        Returns (hour start timestamps, supply, burned, fees, transfers per
+        hour). Totals are in tokens, sampled at the end of each kept hour;
+        counts are averaged over the hours each point stands for.
+        """
+        n = len(self.hours)
+        if n <= points:
+            keep = np.arange(n)
+        else:
+            keep = np.unique(np.linspace(0, n - 1, points).astype(np.int64))
+        supply = self.hour_minted[keep] - self.hour_burned[keep]
+        starts = np.concatenate([[0], keep[:-1] + 1]) if n else keep
+        spans = np.maximum(keep - starts + 1, 1)
+        counts = np.add.reduceat(self.hour_counts, starts) / spans if n else np.empty(0)
+        return (self.hours[keep] * SECONDS_PER_HOUR, supply, self.hour_burned[keep],
+                self.hour_fees[keep], counts)
+
+
+def _read_events(path, offset, units, batch_rows, on_error=None):
+    """Yield (columns, byte offset after the batch) for complete lines past `offset`.
+
+    A line that is not a record with every transfer field, or whose fields do
+    not decode, raises ValueError or is passed to on_error and skipped. The
+    file's first line always raises: it decides the format, so skipping it
+    would skip them all.
+    """
+    jsonl = path.endswith(('.jsonl', '.ndjson', '.json'))
+    errors = (ValueError, TypeError, OverflowError, csv.Error)
+
+    def reject(start, error):
+        message = f'{path}: line at byte {start}: {error}'
+        if on_error is None or start == first:
+            raise ValueError(message) from error
+        on_error(message)
+
+    def export(batch):
+        # One pass for the whole batch; only when that fails, find the bad lines
+        try:
+            return chain_store.export_columns('transfers', [r for _, r in batch], fields, units)
+        except errors:
+            pass
+        good = []
+        for start, record in batch:
+            try:
+                chain_store.export_columns('transfers', [record], fields, units)
+            except errors as error:
+                reject(start, error)
+            else:
+                good.append(record)
+        return chain_store.export_columns('transfers', good, fields, units) if good else None
+
+    with open(path, 'rb') as handle:
+        header = None
+        if not jsonl:
+            header = next(csv.reader([handle.readline().decode()]))
+        first = handle.tell()
+        offset = begin = max(offset, first)
+        handle.seek(offset)
+        fields = None
+        batch = []
+        while True:
+            line = handle.readline()
+            if not line.endswith(b'\n'):
+                break  # end of file, or a line still being written
+            start, offset = offset, offset + len(line)
+            try:
+                text = line.decode()
+                if not text.strip():
+                    continue
+                record = json.loads(text) if jsonl else dict(zip(header, next(csv.reader([text]))))
+                if fields is None:
+                    fields = chain_store.resolve_fields('transfers', list(record))
+                missing = [name for name in fields.values() if name and name not in record]
+                if missing:
+                    raise ValueError(f'no {", ".join(missing)}')
+            except errors as error:
+                reject(start, error)
+                continue
+            batch.append((start, record))
+            if len(batch) == batch_rows:
+                yield export(batch), offset
+                batch = []
+        if batch:
+            yield export(batch), offset
+        elif offset != begin:
+            yield None, offset  # only skipped or blank lines: just move past them
+
+
+def append_synthetic_events(path, n, seed=None, marketing_wallet=None):
+    """Append n transfers (each with its burn and marketing fee) to a JSON-lines file.
+
+    Stands in for a node: the first call mints the initial supply and later
+    calls continue from the last block in the file.
+    """
+    rng = np.random.default_rng(seed)
+    # The same account set on every call, so the marketing wallet stays put
+    accounts = [encode_address(a) for a in np.random.default_rng(0).integers(
+        1, 256, (1000, 20), dtype=np.uint8).view('S20').reshape(-1)]
+    zero = encode_address(chain_store.ZERO_ADDRESS)
+    wallet = encode_address(marketing_wallet) if marketing_wallet else accounts[0]
+
+    block, timestamp = 17_000_000, 1_680_000_000
+    lines = []
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, 'rb') as handle:
+            handle.seek(max(0, os.path.getsize(path) - 4096))
+            last = json.loads(handle.read().splitlines()[-1])
+        block, timestamp = last['block'] + 1, last['timestamp'] + 12
+    else:
+        lines.append({'block': block, 'timestamp': timestamp, 'log_index': 0, 'from': zero,
+                      'to': accounts[1], 'value': str(314_159_265 * 10**18)})
+        block, timestamp = block + 1, timestamp + 12
+
+    micro_tokens = (np.minimum(rng.lognormal(3, 2, n), 10**7) * 10**6).astype(np.int64)
+    for amount in (m * 10**12 for m in micro_tokens.tolist()):
+        sender, recipient = rng.choice(len(accounts) - 1, 2, replace=False) + 1
+        sender, recipient = accounts[sender], accounts[recipient]
+        burn, fee = amount * 200 // 10000, amount * 100 // 10000
+        for log_index, (a, b, value) in enumerate([(sender, recipient, amount),
+                                                   (recipient, zero, burn),
+                                                   (recipient, wallet, fee)]):
+            lines.append({'block': block, 'timestamp': timestamp, 'log_index': log_index,
+                          'from': a, 'to': b, 'value': str(value)})
+        block += 1
+        timestamp += int(rng.integers(1, 120))
+    with open(path, 'a') as handle:
+        handle.writelines(json.dumps(line) + '\n' for line in lines)
+    return wallet
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Incrementally aggregate supply, burn and fee totals from transfer events')
+    parser.add_argument('events', help='CSV/JSONL event file or chain_store transfers directory')
+    parser.add_argument('--checkpoint', default=None,
+                        help='checkpoint file (default: EVENTS.aggregate.npz)')
+    parser.add_argument('--marketing-wallet', default=None, help='0x address of marketingWallet')
+    parser.add_argument('--units', choices=['wei', 'tokens'], default='wei')
+    parser.add_argument('--append-synthetic', type=int, default=0, metavar='N',
+                        help='first append N synthetic transfers to the event file')
+    parser.add_argument('--plot', action='store_true',
+                        help='redraw supply_dynamics.svg and burn_distribution.svg')
+    args = parser.parse_args()
+
+    wallet = None
+    if args.marketing_wallet:
+        wallet = bytes(decode_addresses([args.marketing_wallet])[0]).ljust(20, b'\0')
+    if args.append_synthetic:
+        wallet = bytes(decode_addresses([append_synthetic_events(
+            args.events, args.append_synthetic, marketing_wallet=wallet)])[0]).ljust(20, b'\0')
+
+    aggregator = Aggregator(args.checkpoint or args.events.rstrip('/') + '.aggregate.npz', wallet)
+    start = time.perf_counter()
+    applied = aggregator.update(args.events, args.units)
+    elapsed = time.perf_counter() - start
+    print(f'applied {applied:,} new events in {elapsed:.2f}s '
+          f'({aggregator.events:,} total, {len(aggregator.hours):,} hours)')
+    print(f'supply    {aggregator.supply:>40,} wei')
+    print(f'burned    {aggregator.burned:>40,} wei')
+    print(f'marketing {aggregator.fees:>40,} wei')
+
+    if args.plot:
+        import tokenomics_visualizer
+        series = aggregator.series()[:3]
+        tokenomics_visualizer.plot_supply_dynamics(series)
+        tokenomics_visualizer.plot_burn_distribution(series)
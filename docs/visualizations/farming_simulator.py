@@ -0,0 +1,405 @@
+import argparse
+import time
+
+import numpy as np
+
+# Event-driven replay of MemePiFarming.
+#
+# Each pool keeps accRewardPerShare (scaled by 1e12) and lastRewardTime.
+# updatePool credits timeElapsed * rewardPerSecond * allocPoint /
+# totalAllocPoint, spread over the pool's LP balance, and runs only on
+# deposit and withdraw in that pool. So the cost is O(events), never
+# O(users x time). As in the contract, setPool and setRewardPerSecond
+# do not update the pools. A new allocPoint or rate therefore applies to
+# every pool's unsettled window; pass mass_update=True to settle all pools
+# first, as MasterChef's massUpdatePools would. emergencyWithdraw drops
+# LP without settling the pool. The contract is assumed to hold enough
+# rewards to pay every harvest.
+#
+# exact=True replays events one by one with uint256 integer arithmetic.
+# The default float mode computes every accumulator, LP balance and harvest
+# for the whole stream with grouped prefix sums over float64.
+
+DEPOSIT, WITHDRAW, EMERGENCY, SET_POOL, SET_RATE, TOUCH = range(6)
+REWARD_PER_SECOND = 1057000000000000000  # wei, ~1.057 MEPI/sec
+ACC_PRECISION = 10**12
+WEI_PER_TOKEN = 10**18
+SECONDS_PER_YEAR = 365 * 86400
+
+
+class PoolLog:
+    """State of one pool after each event that touched it"""
+
+    def __init__(self, times, lp, emitted, last_reward):
+        self.times = np.asarray(times, dtype=np.int64)
+        self.lp = np.asarray(lp, dtype=float)
+        self.emitted = np.asarray(emitted, dtype=float)  # cumulative reward credited, wei
+        self.last_reward = np.asarray(last_reward, dtype=np.int64)
+
+
+class FarmTrace:
+    """Per-pool emission, LP and APR series plus harvest totals"""
+
+    def __init__(self, times, emitted, lp, rate, apr, harvested, user_rewards, reverts, logs):
+        self.times = times
+        self.emitted = emitted  # (pools, points) cumulative emission, tokens
+        self.lp = lp  # (pools, points) LP staked, tokens
+        self.rate = rate  # (pools, points) emission, tokens per second
+        self.apr = apr  # (pools, points) yearly reward per unit of LP value
+        self.harvested = harvested  # per pool, tokens
+        self.user_rewards = user_rewards  # per user across pools, tokens
+        self.reverts = reverts
+        self.logs = logs
+
+
+class _Schedule:
+    """rewardPerSecond and allocPoints as set by the admin events"""
+
+    def __init__(self, seq, times, kinds, pools, values, alloc_points, reward_per_second):
+        rate = kinds == SET_RATE
+        self.rate_seq, self.rate_times = seq[rate], times[rate]
+        self.rates = np.concatenate([[reward_per_second], values[rate]]).astype(float)
+
+        setting = kinds == SET_POOL
+        self.initial = np.asarray(alloc_points, dtype=float)
+        self.set_seq, self.set_times = seq[setting], times[setting]
+        self.set_pools, self.set_values = pools[setting], values[setting].astype(float)
+        self.stride = int(seq.max(initial=0)) + 2
+        keys = self.set_pools * self.stride + self.set_seq
+        self._order = np.argsort(keys, kind='stable')
+        self._keys = keys[self._order]
+        previous = self._lookup(self.set_pools, self.set_seq)
+        self.totals = self.initial.sum() + np.concatenate(
+            [[0.0], np.cumsum(self.set_values - previous)])
+
+    def _lookup(self, pools, seq):
+        """allocPoint of `pools` just before sequence positions `seq`"""
+        pos = np.searchsorted(self._keys, pools * self.stride + seq, side='left') - 1
+        found = pos >= 0
+        found[found] = self.set_pools[self._order[pos[found]]] == pools[found]
+        values = self.initial[pools].copy()
+        values[found] = self.set_values[self._order[pos[found]]]
+        return values
+
+    def at_seq(self, pools, seq):
+        """(rewardPerSecond, allocPoint, totalAllocPoint) in force before each event"""
+        rps = self.rates[np.searchsorted(self.rate_seq, seq, side='left')]
+        alloc = self._lookup(pools, seq)
+        total = self.totals[np.searchsorted(self.set_seq, seq, side='left')]
+        return rps, alloc, total
+
+    def at_time(self, pool, times):
+        """The same, after every admin event up to and including each time"""
+        rps = self.rates[np.searchsorted(self.rate_times, times, side='right')]
+        mine = self.set_pools == pool
+        values = np.concatenate([[self.initial[pool]], self.set_values[mine]])
+        alloc = values[np.searchsorted(self.set_times[mine], times, side='right')]
+        total = self.totals[np.searchsorted(self.set_times, times, side='right')]
+        return rps, alloc, total
+
+
+def _group_starts(keys):
+    return np.concatenate([[True], keys[1:] != keys[:-1]]) if len(keys) else np.empty(0, bool)
+
+
+def _exclusive_cumsum(values, starts):
+    """Cumulative sum of the preceding values, restarting at every start flag"""
+    running = np.cumsum(values) - values
+    return running - running[np.flatnonzero(starts)][np.cumsum(starts) - 1]
+
+
+def _with_touches(times, kinds, pools, users, amounts, num_pools):
+    """Insert an update of every pool just before each admin event"""
+    admin = np.flatnonzero((kinds == SET_POOL) | (kinds == SET_RATE))
+    if len(admin) == 0:
+        return times, kinds, pools, users, amounts
+    at = np.repeat(admin, num_pools)
+    return (np.insert(times, at, times[at]), np.insert(kinds, at, TOUCH),
+            np.insert(pools, at, np.tile(np.arange(num_pools), len(admin))),
+            np.insert(users, at, -1), np.insert(amounts, at, 0.0))
+
+
+def _simulate_float(times, kinds, pools, users, amounts, alloc_points, start_time,
+                    reward_per_second, mass_update, num_users):
+    num_pools = len(alloc_points)
+    if mass_update:
+        times, kinds, pools, users, amounts = _with_touches(times, kinds, pools, users,
+                                                            amounts, num_pools)
+    seq = np.arange(len(times))
+    schedule = _Schedule(seq, times, kinds, pools, amounts, alloc_points, reward_per_second)
+
+    # Per (pool, user): balances before each event and which withdrawals revert
+    member = np.flatnonzero(kinds <= EMERGENCY)
+    order = member[np.argsort(pools[member] * (num_users + 1) + users[member], kind='stable')]
+    kind, amount = kinds[order], amounts[order]
+    starts = _group_starts(pools[order] * (num_users + 1) + users[order])
+    # emergencyWithdraw zeroes the balance, so it also opens a new segment
+    segment = starts | np.concatenate([[False], kind[:-1] == EMERGENCY])
+    group = np.cumsum(starts) - 1
+    withdraw = kind == WITHDRAW
+    reverted = np.zeros(len(order), dtype=bool)
+    delta, balance = np.empty(len(order)), np.empty(len(order))
+    active = np.arange(len(order))  # events of groups that may still change
+    while len(active):
+        k, a, w = kind[active], amount[active], withdraw[active] & ~reverted[active]
+        delta[active] = d = np.where(k == DEPOSIT, a, np.where(w, -a, 0.0))
+        balance[active] = b = _exclusive_cumsum(d, segment[active])
+        # Relative slack so "withdraw everything" survives prefix-sum rounding
+        bad = np.flatnonzero(w & (b < a * (1 - 1e-12)))
+        if len(bad) == 0:
+            break
+        # The first failing withdrawal of each group is certain to revert;
+        # only groups that had one need another pass
+        first = active[bad[_group_starts(group[active][bad])]]
+        reverted[first] = True
+        retry = np.zeros(group[-1] + 1, dtype=bool)
+        retry[group[first]] = True
+        active = active[retry[group[active]]]
+    balance = np.maximum(balance, 0.0)
+    valid = ~reverted
+
+    # Per pool: LP balance and accumulator over deposit/withdraw/touch updates
+    lp_delta = np.zeros(len(times))
+    lp_delta[order] = np.where(kind == EMERGENCY, -balance, np.where(valid, delta, 0.0))
+    touching = np.zeros(len(times), dtype=bool)
+    touching[order[valid | (kind == EMERGENCY)]] = True
+    touching |= kinds == TOUCH
+    updates = np.zeros(len(times), dtype=bool)
+    updates[order[valid & (kind != EMERGENCY)]] = True
+    updates |= kinds == TOUCH
+
+    events = np.flatnonzero(touching)
+    events = events[np.argsort(pools[events], kind='stable')]
+    p, t = pools[events], times[events]
+    pool_starts = _group_starts(p)
+    lp = _exclusive_cumsum(lp_delta[events], pool_starts)
+    is_update = updates[events]
+
+    # lastRewardTime before each update: the pool start or the previous update.
+    # Offsetting each pool by a large constant keeps the running maximum per pool.
+    offset = p * (2 * int(t.max(initial=0)) + 2)
+    update_times = np.where(is_update, t, -1) + offset
+    previous = np.maximum.accumulate(np.where(pool_starts, offset - 1, np.roll(update_times, 1)))
+    previous -= offset
+    start = np.full(len(events), start_time, dtype=np.int64)
+    last = np.maximum(start, previous)
+    elapsed = np.where(is_update, np.maximum(t - last, 0), 0)
+    rps, alloc, total = schedule.at_seq(p, events)
+    live = is_update & (lp > 0) & (alloc > 0) & (elapsed > 0)
+    reward = np.where(live, elapsed * rps * alloc / np.where(total > 0, total, 1), 0.0)
+    increment = np.where(live, reward * ACC_PRECISION / np.where(lp > 0, lp, 1), 0.0)
+    acc = _exclusive_cumsum(increment, pool_starts) + increment
+    emitted = _exclusive_cumsum(reward, pool_starts) + reward
+    last_after = np.where(is_update, np.maximum(last, t), last)
+
+    logs = []
+    for pid in range(num_pools):
+        lo, hi = (np.searchsorted(p, pid), np.searchsorted(p, pid, side='right'))
+        logs.append(PoolLog(t[lo:hi], lp[lo:hi] + lp_delta[events[lo:hi]],
+                            emitted[lo:hi], last_after[lo:hi]))
+
+    # Harvests: balance * (acc now - acc at the user's previous settlement)
+    acc_at = np.zeros(len(times))
+    acc_at[events] = acc
+    settle = valid & (kind != EMERGENCY)
+    s_order, s_segment = order[settle], np.cumsum(segment)[settle]
+    s_acc = acc_at[s_order]
+    same = np.concatenate([[False], s_segment[1:] == s_segment[:-1]])
+    previous_acc = np.where(same, np.roll(s_acc, 1), 0.0)
+    harvest = np.where(same, balance[settle] * (s_acc - previous_acc) / ACC_PRECISION, 0.0)
+
+    harvested = np.bincount(pools[s_order], harvest, minlength=num_pools)
+    user_rewards = np.bincount(users[s_order], harvest, minlength=num_users)
+    reverts = {'withdraw': int(reverted.sum())}
+    return logs, harvested, user_rewards, reverts, schedule
+
+
+def _simulate_exact(times, kinds, pools, users, amounts, alloc_points, start_time,
+                    reward_per_second, mass_update, num_users):
+    num_pools = len(alloc_points)
+    alloc = [int(a) for a in alloc_points]
+    total = sum(alloc)
+    rps = int(reward_per_second)
+    last = [int(start_time)] * num_pools
+    acc = [0] * num_pools
+    lp = [0] * num_pools
+    emitted = [0] * num_pools
+    logs = [([], [], [], []) for _ in range(num_pools)]
+    accounts = {}
+    harvested = [0] * num_pools
+    user_rewards = [0] * num_users
+    reverts = 0
+
+    def update(pid, now):
+        if now <= last[pid]:
+            return
+        if lp[pid] == 0 or alloc[pid] == 0:
+            last[pid] = now
+            return
+        reward = (now - last[pid]) * rps * alloc[pid] // total
+        acc[pid] += reward * ACC_PRECISION // lp[pid]
+        emitted[pid] += reward
+        last[pid] = now
+
+    def log(pid, now):
+        for column, value in zip(logs[pid], (now, lp[pid], emitted[pid], last[pid])):
+            column.append(value)
+
+    for now, kind, pid, user, amount in zip(times.tolist(), kinds.tolist(), pools.tolist(),
+                                            users.tolist(), amounts):
+        amount = int(amount)
+        if kind in (SET_POOL, SET_RATE):
+            if mass_update:
+                for other in range(num_pools):
+                    update(other, now)
+                    log(other, now)
+            if kind == SET_POOL:
+                total = total - alloc[pid] + amount
+                alloc[pid] = amount
+            else:
+                rps = amount
+            continue
+
+        info = accounts.setdefault((pid, user), [0, 0])
+        if kind == EMERGENCY:
+            lp[pid] -= info[0]
+            info[0] = info[1] = 0
+            log(pid, now)
+            continue
+        if kind == WITHDRAW and info[0] < amount:
+            reverts += 1
+            continue
+        update(pid, now)
+        pending = info[0] * acc[pid] // ACC_PRECISION - info[1]
+        if info[0] > 0 and pending > 0:
+            harvested[pid] += pending
+            user_rewards[user] += pending
+        change = amount if kind == DEPOSIT else -amount
+        info[0] += change
+        lp[pid] += change
+        info[1] = info[0] * acc[pid] // ACC_PRECISION
+        log(pid, now)
+
+    logs = [PoolLog(*(np.array(column, dtype=float if i in (1, 2) else np.int64)
+                      for i, column in enumerate(columns))) for columns in logs]
+    return (logs, np.array(harvested, dtype=float), np.array(user_rewards, dtype=float),
+            {'withdraw': reverts})
+
+
+def simulate(times, kinds, pools, users, amounts, alloc_points, start_time=None,
+             reward_per_second=REWARD_PER_SECOND, mass_update=False, exact=False,
+             num_users=None, points=500, lp_prices=1.0):
+    """Replay a time-ordered MemePiFarming event stream.
+
+    kinds are DEPOSIT/WITHDRAW/EMERGENCY (pool, user, LP amount in wei) or
+    SET_POOL (pool, new allocPoint) and SET_RATE (new rewardPerSecond in
+    wei); users is ignored for the admin events. alloc_points holds each
+    pool's allocPoint when it is added at start_time. lp_prices is the
+    value of one LP token in MEPI, per pool, for the APR series.
+    """
+    times = np.asarray(times, dtype=np.int64)
+    kinds = np.asarray(kinds, dtype=np.int8)
+    pools = np.asarray(pools, dtype=np.int64)
+    users = np.asarray(users, dtype=np.int64)
+    if start_time is None:
+        start_time = int(times[0]) if len(times) else 0
+    if num_users is None:
+        num_users = int(users.max(initial=-1)) + 1
+    args = (alloc_points, start_time, reward_per_second, mass_update, num_users)
+    seq_args = (np.arange(len(times)), times, kinds, pools)
+    if exact:
+        amounts = list(amounts)
+        logs, harvested, user_rewards, reverts = _simulate_exact(
+            times, kinds, pools, users, amounts, *args)
+        values = np.array([float(a) for a in amounts])
+        schedule = _Schedule(*seq_args, values, alloc_points, reward_per_second)
+    else:
+        logs, harvested, user_rewards, reverts, schedule = _simulate_float(
+            times, kinds, pools, users, np.asarray(amounts, dtype=float), *args)
+
+    samples = np.linspace(start_time, times[-1] if len(times) else start_time,
+                          points).astype(np.int64)
+    series = [_pool_series(log, schedule, pid, samples, start_time)
+              for pid, log in enumerate(logs)]
+    emitted, lp, rate = (np.array([s[i] for s in series]) / WEI_PER_TOKEN for i in range(3))
+    prices = np.broadcast_to(np.asarray(lp_prices, dtype=float), (len(logs),))[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        apr = np.where(lp > 0, rate * SECONDS_PER_YEAR / (lp * prices), np.nan)
+    reverts = {'deposit': 0, **reverts, 'emergencyWithdraw': 0}
+    return FarmTrace(samples, emitted, lp, rate, apr, harvested / WEI_PER_TOKEN,
+                     user_rewards / WEI_PER_TOKEN, reverts, logs)
+
+
+def _pool_series(log, schedule, pid, samples, start_time):
+    """(cumulative emission, LP, emission rate) of one pool at each sample time, in wei"""
+    k = np.searchsorted(log.times, samples, side='right') - 1
+    seen = k >= 0
+    k = np.maximum(k, 0)
+    lp = np.where(seen, log.lp[k] if len(log.lp) else 0.0, 0.0)
+    emitted = np.where(seen, log.emitted[k] if len(log.emitted) else 0.0, 0.0)
+    last = np.where(seen, log.last_reward[k] if len(log.last_reward) else start_time, start_time)
+    rps, alloc, total = schedule.at_time(pid, samples)
+    rate = np.where((lp > 0) & (total > 0), rps * alloc / np.where(total > 0, total, 1), 0.0)
+    # Rewards pending since the last update, as pendingReward() would report them
+    emitted = emitted + rate * np.maximum(samples - last, 0)
+    return emitted, lp, rate
+
+
+def synthetic_events(n, num_users=200_000, alloc_points=(40, 30, 20, 10), seed=0,
+                     start_time=1_700_000_000, duration=3 * SECONDS_PER_YEAR):
+    """Random deposits and withdrawals over the three-year program with a few admin changes"""
+    rng = np.random.default_rng(seed)
+    num_pools = len(alloc_points)
+    times = start_time + np.sort(rng.integers(0, duration, n))
+    kinds = rng.choice(3, n, p=[0.6, 0.39, 0.01]).astype(np.int8)
+    pools = rng.choice(num_pools, n, p=np.asarray(alloc_points) / sum(alloc_points))
+    users = np.minimum(rng.pareto(1.2, n) * num_users / 40, num_users - 1).astype(np.int64)
+    tokens = np.where(kinds == DEPOSIT, rng.lognormal(4, 1.5, n), rng.lognormal(3, 1.5, n))
+    amounts = np.round(tokens * 1e6) * 1e12  # whole multiples of 1e12 wei
+
+    # Rebalance toward the last pool after a year, halve emissions after two
+    admin_times = start_time + np.array([SECONDS_PER_YEAR, 2 * SECONDS_PER_YEAR])
+    at = np.searchsorted(times, admin_times)
+    times = np.insert(times, at, admin_times)
+    kinds = np.insert(kinds, at, [SET_POOL, SET_RATE])
+    pools = np.insert(pools, at, [num_pools - 1, 0])
+    users = np.insert(users, at, -1)
+    amounts = np.insert(amounts, at, [float(alloc_points[0]), REWARD_PER_SECOND // 2])
+    return times, kinds, pools, users, amounts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='MemePiFarming emission and APR replay')
+    parser.add_argument('-n', '--events', type=int, default=5_000_000)
+    parser.add_argument('--users', type=int, default=200_000)
+    parser.add_argument('--exact', action='store_true', help='uint256 integer replay')
+    parser.add_argument('--mass-update', action='store_true',
+                        help='settle every pool before setPool / setRewardPerSecond')
+    parser.add_argument('--check', type=int, default=50_000,
+                        help='events to compare between float and exact modes')
+    args = parser.parse_args()
+
+    alloc_points = (40, 30, 20, 10)
+    events = synthetic_events(args.events, args.users, alloc_points)
+    m = min(args.check, args.events)
+    prefix = tuple(column[:m] for column in events)
+    options = dict(mass_update=args.mass_update, num_users=args.users)
+    fast = simulate(*prefix, alloc_points, **options)
+    exact = simulate(*prefix, alloc_points, exact=True, **options)
+    assert fast.reverts == exact.reverts, 'reverted withdrawals differ between modes'
+    assert np.allclose(fast.harvested, exact.harvested, rtol=1e-6), 'harvests differ'
+    assert np.allclose(fast.emitted, exact.emitted, rtol=1e-6), 'emissions differ'
+    assert np.allclose(fast.user_rewards, exact.user_rewards, rtol=1e-6, atol=1e-6), \
+        'per-user rewards differ'
+
+    start = time.perf_counter()
+    trace = simulate(*events, alloc_points, exact=args.exact, **options)
+    elapsed = time.perf_counter() - start
+    mode = 'exact' if args.exact else 'float'
+    print(f'{args.events:,} events, {args.users:,} users, {len(alloc_points)} pools '
+          f'({mode}) in {elapsed:.2f}s ({args.events / elapsed:,.0f} events/s)')
+    print(f'reverted {trace.reverts}')
+    for pid, (emitted, harvested, apr) in enumerate(zip(trace.emitted[:, -1], trace.harvested,
+                                                        trace.apr[:, -1])):
+        print(f'  pool {pid}: emitted {emitted:>14,.0f}  harvested {harvested:>14,.0f}  '
+              f'APR {apr:8.2%}')
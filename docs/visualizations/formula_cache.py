@@ -0,0 +1,161 @@
+import hashlib
+import json
+import math
+import os
+
+import numpy as np
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.offsetbox import AnnotationBbox, OffsetImage
+from matplotlib.transforms import IdentityTransform
+from PIL import Image, PngImagePlugin
+
+# Rasterized annotation boxes, keyed on everything that changes their pixels.
+#
+# Laying out and drawing multi-line mathtext at 300 dpi costs about as much as
+# the rest of an annotated snapshot. The same five formulas appear on every
+# snapshot, so each box (text plus its rounded background) is rendered once
+# at the output dpi and then placed as an image wherever it is needed. The
+# image is snapped to whole output pixels, so a box can sit 1-2 px from where
+# ax.text would have drawn it. Boxes are kept in memory for the process and as
+# PNG files in a directory shared by runs and render workers; the directory is
+# trimmed to max_bytes, least recently used first.
+
+CACHE_DIR_NAME = '.formula_cache'
+MAX_BYTES = 32 * 2**20
+MARGIN = 2  # pixels around the box, for its edge stroke
+_RC_PREFIXES = ('font.', 'mathtext.', 'text.', 'patch.')
+
+
+def formula_key(text, dpi, fontsize, box, ha):
+    """Hash of the text, box style, line alignment, dpi and every font/mathtext rcParam"""
+    rc = {name: repr(value) for name, value in matplotlib.rcParams.items()
+          if name.startswith(_RC_PREFIXES)}
+    payload = [text, dpi, fontsize, sorted(box.items()), ha, rc, matplotlib.__version__]
+    return hashlib.sha256(json.dumps(payload, default=repr).encode('utf-8')).hexdigest()
+
+
+def rasterize(text, dpi, fontsize, box, ha):
+    """RGBA pixels of a text box and the text's own extent inside them.
+
+    ha aligns the lines of multi-line text. The extent (x0, y0, x1, y1, in
+    pixels from the bottom left) is what ha/va align in ax.text, so placing
+    the image against it reproduces ax.text(..., ha=ha, va=va, bbox=box).
+    """
+    fig = Figure(figsize=(8, 8), dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    fig.patch.set_alpha(0)
+    label = fig.text(0, 0, text, fontsize=fontsize, bbox=box, ha='left', va='bottom',
+                     multialignment=ha, transform=IdentityTransform())
+    renderer = canvas.get_renderer()
+    label.update_bbox_position_size(renderer)
+    text_extent = label.get_window_extent(renderer)
+    patch_extent = label.get_bbox_patch().get_window_extent(renderer)
+
+    # Resize the canvas to the box and move the text so the box starts at MARGIN
+    width = math.ceil(patch_extent.width) + 2 * MARGIN
+    height = math.ceil(patch_extent.height) + 2 * MARGIN
+    fig.set_size_inches((width + 0.5) / dpi, (height + 0.5) / dpi)  # Agg truncates to pixels
+    dx, dy = MARGIN - patch_extent.x0, MARGIN - patch_extent.y0
+    label.set_position((dx, dy))
+    canvas.draw()
+    rgba = np.array(canvas.buffer_rgba())
+    extent = (text_extent.x0 + dx, text_extent.y0 + dy, text_extent.x1 + dx, text_extent.y1 + dy)
+    return rgba, extent
+
+
+class FormulaCache:
+    """Memory plus size-bounded on-disk cache of rasterized text boxes"""
+
+    def __init__(self, directory, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory = {}
+        self.hits = 0
+        self.misses = 0
+        self._taken = (0, 0)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.png')
+
+    def _load(self, key):
+        path = self._path(key)
+        try:
+            with Image.open(path) as image:
+                rgba = np.asarray(image.convert('RGBA'))
+                extent = tuple(json.loads(image.text['extent']))
+        except (OSError, KeyError, ValueError):
+            return None
+        os.utime(path)  # most recently used
+        return rgba, extent
+
+    def _store(self, key, rgba, extent):
+        os.makedirs(self.directory, exist_ok=True)
+        info = PngImagePlugin.PngInfo()
+        info.add_text('extent', json.dumps(extent))
+        tmp = f'{self._path(key)}.{os.getpid()}.tmp'
+        Image.fromarray(rgba).save(tmp, format='png', pnginfo=info)
+        os.replace(tmp, self._path(key))
+        self.trim()
+
+    def trim(self):
+        """Delete least recently used boxes until the directory fits max_bytes"""
+        try:
+            entries = [entry for entry in os.scandir(self.directory)
+                       if entry.name.endswith('.png')]
+        except OSError:
+            return
+        entries = sorted(((entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                          for entry in entries), reverse=True)
+        total = 0
+        for _, size, path in entries:
+            total += size
+            if total > self.max_bytes:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def take_counts(self):
+        """Hits and misses since the last call, for render_farm.register_counters"""
+        hits, misses = self._taken
+        self._taken = (self.hits, self.misses)
+        return {'formula_hits': self.hits - hits, 'formula_misses': self.misses - misses}
+
+    def get(self, text, dpi, fontsize, box, ha):
+        """(rgba, extent) for a box, rendering it on a miss"""
+        key = formula_key(text, dpi, fontsize, box, ha)
+        cached = self.memory.get(key)
+        if cached is None:
+            cached = self._load(key)
+            if cached is None:
+                self.misses += 1
+                cached = rasterize(text, dpi, fontsize, box, ha)
+                self._store(key, *cached)
+            else:
+                self.hits += 1
+            self.memory[key] = cached
+        else:
+            self.hits += 1
+        return cached
+
+    def place(self, ax, x, y, text, dpi, fontsize=10, box=None, ha='center', va='center'):
+        """Draw the cached box where ax.text(x, y, text, ha=ha, va=va, bbox=box) would be"""
+        rgba, (x0, y0, x1, y1) = self.get(text, dpi, fontsize, box or {}, ha)
+        height, width = rgba.shape[:2]
+        anchor_x = {'left': x0, 'center': (x0 + x1) / 2, 'right': x1}[ha] / width
+        anchor_y = {'bottom': y0, 'center': (y0 + y1) / 2, 'top': y1}[va] / height
+        # 1 image pixel = 1 output pixel when saved at dpi
+        image = OffsetImage(rgba, zoom=72 / dpi, interpolation='nearest')
+        artist = AnnotationBbox(image, (x, y), xycoords='axes fraction', frameon=False, pad=0,
+                                box_alignment=(anchor_x, anchor_y), annotation_clip=False,
+                                zorder=3)
+        ax.add_artist(artist)
+        return artist
+
+
+def summary(counts):
+    """One line of formula box hits and misses from take_counts() totals"""
+    return (f"formula cache: {counts.get('formula_hits', 0)} hit(s), "
+            f"{counts.get('formula_misses', 0)} miss(es)")
@@ -0,0 +1,165 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+# Voting power for a full holder snapshot, VP(a) = Balance(a) * sqrt(HoldingTime(a) / pi)
+# with holding time in days. Holders live in flat column arrays (20-byte
+# addresses, float64 balances, int64 timestamps), power is computed in one
+# vectorized pass and a descending sort index backs every ranking query.
+
+SECONDS_PER_DAY = 86400
+
+# ASCII -> nibble lookup for vectorized hex decoding
+_HEX = np.full(256, 255, dtype=np.uint8)
+_HEX[np.frombuffer(b'0123456789', dtype=np.uint8)] = np.arange(10)
+_HEX[np.frombuffer(b'abcdef', dtype=np.uint8)] = np.arange(10, 16)
+_HEX[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10, 16)
+_PREFIX = np.frombuffer(b'0x', dtype=np.uint8)
+
+
+def decode_addresses(hex_addresses):
+    """Decode '0x'-prefixed hex strings into an (n,) array of 20-byte addresses"""
+    # Cast to bytes wide enough for the longest entry, so the length check sees
+    # what an S42 cast would silently cut off
+    try:
+        text = np.asarray(hex_addresses, dtype='S')
+        if (np.char.str_len(text) != 42).any():
+            raise ValueError
+        chars = np.ascontiguousarray(text, dtype='S42').view(np.uint8).reshape(len(text), 42)
+        nibbles = _HEX[chars[:, 2:]]
+        if (chars[:, :2] != _PREFIX).any() or (nibbles == 255).any():
+            raise ValueError
+    except ValueError:  # also a non-ASCII character failing the bytes cast
+        raise ValueError('addresses must be 0x followed by 40 hex digits') from None
+    raw = (nibbles[:, 0::2] << 4) | nibbles[:, 1::2]
+    return np.ascontiguousarray(raw).view('S20').reshape(-1)
+
+
+def encode_address(raw):
+    """Hex string for one 20-byte address"""
+    return '0x' + bytes(raw).ljust(20, b'\0').hex()
+
+
+def voting_power(balances, first_held, snapshot_time):
+    """Balance * sqrt(days held / pi); holders not yet holding at the snapshot get 0"""
+    days = np.maximum(snapshot_time - np.asarray(first_held), 0) / SECONDS_PER_DAY
+    return np.asarray(balances, dtype=float) * np.sqrt(days / np.pi)
+
+
+class HolderTable:
+    """Columnar holder snapshot with voting power and a descending power index"""
+
+    def __init__(self, addresses, balances, first_held, snapshot_time=None):
+        self.addresses = np.asarray(addresses)
+        self.balances = np.asarray(balances, dtype=np.float64)
+        self.first_held = np.asarray(first_held, dtype=np.int64)
+        if snapshot_time is None:
+            snapshot_time = int(self.first_held.max(initial=0))
+        self.snapshot_time = snapshot_time
+        self.power = voting_power(self.balances, self.first_held, snapshot_time)
+        # Descending by power; cumulative power along that order
+        self.order = np.argsort(-self.power, kind='stable')
+        self.cumulative = np.cumsum(self.power[self.order])
+        self.total = self.cumulative[-1] if len(self.cumulative) else 0.0
+
+    def __len__(self):
+        return len(self.power)
+
+    @classmethod
+    def from_csv(cls, path, snapshot_time=None, balance_scale=1e-18):
+        """Load an address,balance,first_held CSV (balance in wei by default)"""
+        rows = np.loadtxt(path, delimiter=',', skiprows=1, ndmin=1,
+                          dtype=[('address', 'S42'), ('balance', 'f8'), ('first_held', 'i8')])
+        return cls(decode_addresses(rows['address']), rows['balance'] * balance_scale,
+                   rows['first_held'], snapshot_time)
+
+    def top_k(self, k):
+        """(addresses, voting power) of the k most powerful holders"""
+        index = self.order[:k]
+        return self.addresses[index], self.power[index]
+
+    def holders_needed(self, threshold):
+        """Fewest holders whose combined power reaches threshold (None if unreachable)"""
+        count = int(np.searchsorted(self.cumulative, threshold, side='left')) + 1
+        return count if count <= len(self) else None
+
+    def quorum_share(self, quorum):
+        """Fraction of total voting power an absolute quorum represents"""
+        return quorum / self.total if self.total else np.inf
+
+    def top_k_share(self, k):
+        """Fraction of total voting power held by the k most powerful holders"""
+        if not len(self) or not self.total:
+            return 0.0
+        return self.cumulative[min(k, len(self)) - 1] / self.total
+
+    def nakamoto(self, fraction=0.5):
+        """Nakamoto coefficient: fewest holders controlling more than `fraction` of power"""
+        count = int(np.searchsorted(self.cumulative, fraction * self.total, side='right')) + 1
+        return min(count, len(self))
+
+    def gini(self):
+        """Gini coefficient of voting power"""
+        n = len(self)
+        if n == 0 or not self.total:
+            return 0.0
+        ascending = self.power[self.order[::-1]]
+        ranks = np.arange(1, n + 1)
+        return float(2 * np.dot(ranks, ascending) / (n * self.total) - (n + 1) / n)
+
+    def lorenz(self, points=1000):
+        """(population share, power share) for plotting a Lorenz curve"""
+        n = len(self)
+        ascending_cumulative = np.concatenate(
+            [[0.0], np.cumsum(self.power[self.order[::-1]])]) / max(self.total, 1e-300)
+        population = np.linspace(0, 1, points)
+        return population, ascending_cumulative[np.round(population * n).astype(np.int64)]
+
+
+def synthetic_holders(n, seed=0, snapshot_time=1_700_000_000):
+    """Random snapshot: Pareto balances, uniform first-held times over two years"""
+    rng = np.random.default_rng(seed)
+    addresses = rng.integers(0, 256, (n, 20), dtype=np.uint8).view('S20').reshape(-1)
+    balances = (rng.pareto(1.2, n) + 1) * 100
+    first_held = snapshot_time - rng.integers(0, 2 * 365 * SECONDS_PER_DAY, n)
+    return HolderTable(addresses, balances, first_held, snapshot_time)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Voting power analysis for a holder snapshot')
+    parser.add_argument('csv', nargs='?', help='address,balance,first_held CSV (balance in wei) '
+                                               'or a chain_store holders directory')
+    parser.add_argument('--holders', type=int, default=5_000_000,
+                        help='synthetic holders when no CSV is given')
+    parser.add_argument('--snapshot-time', type=int, default=None)
+    parser.add_argument('--quorum', type=float, default=None,
+                        help='absolute quorum in voting power units')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--plot', action='store_true',
+                        help='also write governance_concentration.svg')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.csv and os.path.isdir(args.csv):
+        import chain_store
+        table = chain_store.holder_table(chain_store.ColumnStore(args.csv), args.snapshot_time)
+    elif args.csv:
+        table = HolderTable.from_csv(args.csv, args.snapshot_time)
+    else:
+        table = synthetic_holders(args.holders)
+    elapsed = time.perf_counter() - start
+
+    print(f'{len(table):,} holders indexed in {elapsed:.2f}s, total power {table.total:,.0f}')
+    print(f'Gini {table.gini():.4f}, Nakamoto coefficient {table.nakamoto():,}')
+    print(f'Top {args.top} hold {table.top_k_share(args.top):.2%} of voting power')
+    for address, power in zip(*table.top_k(args.top)):
+        print(f'  {encode_address(address)}  {power:,.0f}')
+    if args.quorum is not None:
+        needed = table.holders_needed(args.quorum)
+        print(f'Quorum {args.quorum:,.0f} = {table.quorum_share(args.quorum):.2%} of power, '
+              f'reachable by {needed if needed else "no"} top holders')
+    if args.plot:
+        import tokenomics_visualizer
+        tokenomics_visualizer.plot_governance_concentration(table)
@@ -0,0 +1,292 @@
+import cProfile
+import datetime
+import functools
+import inspect
+import io
+import json
+import os
+import pstats
+import resource
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Opt-in timing of each rendered artifact, shared by the four scripts.
+#
+# Hooks on matplotlib and on the model/simulator modules split an artifact's
+# wall time into exclusive stages:
+#
+#   compute  model and simulator calls
+#   layout   tight_layout, text and mathtext layout (wherever it happens)
+#   draw     Figure.draw and per-frame draw_artist, i.e. rasterizing
+#   encode   savefig and animation writers, minus the draws they trigger
+#   other    the rest of the plotting function (building artists)
+#
+# The hooks are installed in a process the first time an artifact is
+# recorded and do nothing outside a record, so a run without --report never
+# touches matplotlib.
+
+STAGES = ('compute', 'layout', 'draw', 'encode', 'other')
+COMPUTE_MODULES = ('tokenomics_model', 'monte_carlo', 'staking_simulator', 'farming_simulator',
+                   'rate_limit_engine', 'governance_engine', 'chain_store', 'event_aggregator',
+                   'supply_simulator')
+REPORT_SUFFIX = '_report.json'
+PROFILE_TOP = 15
+
+
+class Stages:
+    """Exclusive wall time per stage; a nested stage pauses the one around it"""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self.stack = []
+        self.mark = time.perf_counter()
+
+    def _switch(self):
+        now = time.perf_counter()
+        if self.stack:
+            self.totals[self.stack[-1]] += now - self.mark
+        self.mark = now
+
+    @contextmanager
+    def stage(self, name):
+        self._switch()
+        self.stack.append(name)
+        try:
+            yield
+        finally:
+            self._switch()
+            self.stack.pop()
+
+
+_active = None  # (Stages, list of written paths) while an artifact is recorded
+_installed = False
+
+
+def _hook(owner, name, stage, path_arg=None):
+    """Time owner.name as a stage; path_arg names the argument holding an output path"""
+    original = getattr(owner, name)
+
+    @functools.wraps(original)
+    def timed(*args, **kwargs):
+        if _active is None:
+            return original(*args, **kwargs)
+        stages, paths = _active
+        if path_arg is not None and len(args) > path_arg and isinstance(args[path_arg],
+                                                                        (str, os.PathLike)):
+            paths.append(os.fspath(args[path_arg]))
+        with stages.stage(stage):
+            return original(*args, **kwargs)
+    setattr(owner, name, timed)
+
+
+def time_compute(modules=None):
+    """Route the public functions of the loaded model/simulator modules through 'compute'"""
+    for module in modules or [sys.modules[name] for name in COMPUTE_MODULES
+                              if name in sys.modules]:
+        for name, func in list(vars(module).items()):
+            if (not name.startswith('_') and inspect.isfunction(func)
+                    and func.__module__ == module.__name__):
+                _hook(module, name, 'compute')
+
+
+def install():
+    """Install the matplotlib, writer and compute hooks in this process (idempotent)"""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    from matplotlib.figure import Figure
+    from matplotlib.mathtext import MathTextParser
+    from matplotlib.text import Text
+    import animation_engine
+    import responsive_images
+    import streaming_writer
+
+    _hook(Figure, 'savefig', 'encode', path_arg=1)
+    _hook(animation_engine, 'write_png', 'encode', path_arg=1)
+    _hook(responsive_images, 'write_variants', 'encode')
+    _hook(Figure, 'draw', 'draw')
+    _hook(Figure, 'draw_artist', 'draw')
+    _hook(Figure, 'tight_layout', 'layout')
+    _hook(Text, '_get_layout', 'layout')
+    _hook(MathTextParser, 'parse', 'layout')
+    for writer in (streaming_writer.GifStreamWriter, streaming_writer.ApngStreamWriter,
+                   streaming_writer.FFmpegStreamWriter):
+        _hook(writer, '__init__', 'encode', path_arg=1)
+        _hook(writer, 'write', 'encode')
+        _hook(writer, 'close', 'encode')
+    time_compute()
+
+
+def _reset_peak_rss():
+    """Restart the kernel's RSS high-water mark (Linux); False where unsupported"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss():
+    """Peak RSS in bytes: VmHWM where available, else this process's ru_maxrss"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def record(name, func, *args, **kwargs):
+    """Call func and return (result, timing record for the artifact it wrote)"""
+    global _active
+    install()
+    peak_is_own = _reset_peak_rss()
+    stages, paths = Stages(), []
+    _active = (stages, paths)
+    start = time.perf_counter()
+    try:
+        with stages.stage('other'):
+            result = func(*args, **kwargs)
+    finally:
+        _active = None
+    wall = time.perf_counter() - start
+    files = sorted({path for path in paths if os.path.exists(path)})
+    return result, {
+        'name': name,
+        'files': files,
+        'bytes': sum(os.path.getsize(path) for path in files),
+        'wall': wall,
+        'stages': {stage: stages.totals[stage] for stage in STAGES},
+        'peak_rss': _peak_rss(),
+        # Without a resettable high-water mark this is the process peak so far
+        'peak_rss_is_per_artifact': peak_is_own,
+        'pid': os.getpid(),
+    }
+
+
+class Report:
+    """Records for one script run; every method is a no-op when disabled"""
+
+    def __init__(self, script, path=None, profile=0):
+        self.script = script
+        self.path = path
+        self.profile = profile
+        self.records = []
+        self._callables = {}
+        self.start = time.perf_counter()
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def run(self, func, *args, name=None, **kwargs):
+        """Call func, recording it as one artifact when enabled"""
+        if not self.enabled:
+            return func(*args, **kwargs)
+        name = name or func.__name__
+        self._callables[name] = functools.partial(func, *args, **kwargs)
+        result, entry = record(name, func, *args, **kwargs)
+        self.records.append(entry)
+        return result
+
+    def add(self, entry, rerun=None):
+        """Add a record made elsewhere, e.g. in a render worker"""
+        self.records.append(entry)
+        if rerun is not None:
+            self._callables[entry['name']] = rerun
+
+    def _profile_slowest(self, directory):
+        """Re-render the slowest artifacts under cProfile; {name: summary}"""
+        profiles = {}
+        slowest = sorted(self.records, key=lambda entry: -entry['wall'])[:self.profile]
+        for entry in slowest:
+            rerun = self._callables.get(entry['name'])
+            if rerun is None:
+                continue
+            profiler = cProfile.Profile()
+            profiler.runcall(rerun)
+            stem = os.path.splitext(entry['name'])[0]
+            path = os.path.join(directory, f'{self.script}.{stem}.prof')
+            profiler.dump_stats(path)
+            stats = pstats.Stats(profiler, stream=io.StringIO()).sort_stats('cumulative')
+            top = []
+            for (filename, line, function), (_, calls, _, cumulative, _) in \
+                    sorted(stats.stats.items(), key=lambda item: -item[1][3])[:PROFILE_TOP]:
+                top.append([f'{os.path.basename(filename)}:{line}({function})', calls,
+                            round(cumulative, 6)])
+            profiles[entry['name']] = {'file': path, 'top_cumulative': top}
+        return profiles
+
+    def summary(self):
+        """One line per artifact, slowest first, then the totals"""
+        lines = [f"{'artifact':<40}" + ''.join(f'{stage:>9}' for stage in STAGES) +
+                 f"{'wall':>9}{'KiB':>9}{'RSS MiB':>9}"]
+        for entry in sorted(self.records, key=lambda entry: -entry['wall']):
+            lines.append(f"{entry['name'][:39]:<40}" +
+                         ''.join(f"{entry['stages'][stage]:>9.3f}" for stage in STAGES) +
+                         f"{entry['wall']:>9.3f}{entry['bytes'] / 1024:>9.0f}"
+                         f"{entry['peak_rss'] / 2**20:>9.0f}")
+        totals = self.totals()
+        lines.append(f"{f'total ({len(self.records)} artifacts)':<40}" +
+                     ''.join(f"{totals['stages'][stage]:>9.3f}" for stage in STAGES) +
+                     f"{totals['wall']:>9.3f}{totals['bytes'] / 1024:>9.0f}"
+                     f"{totals['peak_rss'] / 2**20:>9.0f}")
+        return '\n'.join(lines) + '\n(seconds; stage times summed across workers)'
+
+    def totals(self):
+        return {
+            'stages': {stage: sum(entry['stages'][stage] for entry in self.records)
+                       for stage in STAGES},
+            'wall': sum(entry['wall'] for entry in self.records),
+            'bytes': sum(entry['bytes'] for entry in self.records),
+            'peak_rss': max((entry['peak_rss'] for entry in self.records), default=0),
+        }
+
+    def finish(self):
+        """Profile the slowest artifacts, write the JSON report and print the summary"""
+        if not self.enabled:
+            return
+        elapsed = time.perf_counter() - self.start
+        directory = os.path.dirname(os.path.abspath(self.path))
+        profiles = self._profile_slowest(directory) if self.profile else {}
+        report = {
+            'script': self.script,
+            'time': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'elapsed': elapsed,
+            'artifacts': self.records,
+            'totals': self.totals(),
+            'profiles': profiles,
+        }
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp, self.path)
+        print(self.summary())
+        print(f'{len(self.records)} artifact(s) in {elapsed:.2f}s; report written to {self.path}')
+        for name, profile in profiles.items():
+            print(f'  profile of {name}: {profile["file"]}')
+
+
+def add_arguments(parser):
+    """--report and --profile, shared by the visualizer scripts"""
+    parser.add_argument('--report', nargs='?', const='', default=None, metavar='PATH',
+                        help='time every artifact and write a JSON report '
+                             '(default path: .<script>_report.json next to the artifacts)')
+    parser.add_argument('--profile', type=int, default=0, metavar='N',
+                        help='with --report, re-render the N slowest artifacts under cProfile')
+    return parser
+
+
+def from_args(args, script, output_dir):
+    """The Report asked for on the command line, disabled unless --report was given"""
+    path = getattr(args, 'report', None)
+    if path == '':
+        path = os.path.join(output_dir, f'.{script}{REPORT_SUFFIX}')
+    return Report(script, path, getattr(args, 'profile', 0))
@@ -0,0 +1,363 @@
+import argparse
+import asyncio
+import json
+import mimetypes
+import os
+import sys
+import time
+import traceback
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+import event_aggregator
+import rate_limit_engine
+from governance_engine import decode_addresses
+
+# Live dashboard: tails a transfer-event file and streams the hourly supply,
+# burn, fee, transfer and rate-limit rejection series to browsers over
+# Server-Sent Events, without a rebuild of the docs site.
+#
+# One compute task polls the file on a worker thread and folds new events
+# into an in-memory event_aggregator.Aggregator and rate_limit_engine.
+# LiveReplay. Each poll that applied events publishes a new version of the
+# series together with the first hour it changed (usually the last one).
+#
+# Clients do not get a queue. Each one remembers the version it was last
+# sent and, when woken, is sent everything that changed since then as one
+# message. That message is encoded once and shared by every client at the
+# same version, so thousands of clients cost one encode per update. A slow
+# client waits on its own socket (a WRITE_BUFFER high-water mark), then gets
+# one coalesced delta when it catches up; it never holds back the compute
+# task or other clients, and is dropped after CLIENT_TIMEOUT seconds stalled.
+# A client more than HISTORY versions behind, or new, gets a full snapshot.
+#
+# A line of the file that does not parse is logged and skipped. Any other
+# failure of the compute, render or replay task is logged and stops the
+# server rather than leaving it serving stale series; /stats carries the
+# last error either way.
+#
+# Everything is local: the server also serves docs/ (open /index.html?live),
+# and --replay copies an existing event file into the tailed one at a fixed
+# rate, standing in for a node.
+#
+#   GET /events      text/event-stream of 'snapshot' and 'delta' events
+#   GET /snapshot    the current series as JSON
+#   GET /stats       clients, versions, bytes sent, drops, skipped lines, last error
+#   GET /<file>      docs/ static files
+
+DEFAULT_PORT = 8766
+POLL_SECONDS = 0.5
+HEARTBEAT_SECONDS = 15
+HISTORY = 256
+WRITE_BUFFER = 256 * 2**10
+CLIENT_TIMEOUT = 30
+SERIES = ('hours', 'supply', 'burned', 'fees', 'transfers') + rate_limit_engine.RULES
+
+output_dir = os.path.dirname(os.path.abspath(__file__))
+docs_dir = os.path.dirname(output_dir)
+
+
+class LiveSeries:
+    """Hourly series over a growing event file; poll() folds in what was appended"""
+
+    def __init__(self, events, marketing_wallet=None, units='wei'):
+        self.events = events
+        self.units = units
+        self.aggregator = event_aggregator.Aggregator(None, marketing_wallet)
+        self.limits = rate_limit_engine.LiveReplay()
+        self.rejected = np.zeros((len(rate_limit_engine.RULES), 0), dtype=np.int64)
+        self.first_changed = None
+        self.skipped = 0
+        self.last_error = None
+
+    def _skip(self, message):
+        self.skipped += 1
+        self.last_error = message
+        print(f'skipped {message}', file=sys.stderr, flush=True)
+
+    def _limit(self, columns):
+        hours = self.aggregator.hours
+        self.rejected = np.pad(self.rejected, ((0, 0), (0, len(hours) - self.rejected.shape[1])))
+        starts, per_hour = self.limits.add(columns)
+        index = np.searchsorted(hours, starts // event_aggregator.SECONDS_PER_HOUR)
+        for rule in range(len(rate_limit_engine.RULES)):
+            np.add.at(self.rejected[rule], index, per_hour[rule])
+        if len(index):
+            self.first_changed = min(self.first_changed, int(index[0]))
+
+    def poll(self):
+        """(first changed hour, {name: values from that hour on}), or None if nothing was appended"""
+        if not os.path.exists(self.events):
+            return None
+        self.first_changed = max(len(self.aggregator.hours) - 1, 0)
+        if not self.aggregator.update(self.events, self.units, on_batch=self._limit,
+                                      on_error=self._skip):
+            return None
+        return self.first_changed, self.columns(self.first_changed)
+
+    def columns(self, start=0):
+        """{name: list} of every series from hour index `start` on"""
+        a = self.aggregator
+        tokens = {'supply': a.hour_minted - a.hour_burned, 'burned': a.hour_burned,
+                  'fees': a.hour_fees}
+        columns = {'hours': (a.hours[start:] * event_aggregator.SECONDS_PER_HOUR).tolist()}
+        columns.update({name: np.round(values[start:], 2).tolist()
+                        for name, values in tokens.items()})
+        columns['transfers'] = a.hour_counts[start:].tolist()
+        columns.update(zip(rate_limit_engine.RULES, self.rejected[:, start:].tolist()))
+        return columns
+
+    def plot_series(self):
+        """(timestamps, supply, burned) as tokenomics_visualizer takes them"""
+        return self.aggregator.series()[:3]
+
+
+def _render(series):
+    """Redraw the supply and burn SVGs from live series (runs in a worker process)"""
+    import tokenomics_visualizer
+    tokenomics_visualizer.plot_supply_dynamics(series)
+    tokenomics_visualizer.plot_burn_distribution(series)
+
+
+class Broadcast:
+    """The current series, its version and, per recent version, the first index it changed"""
+
+    def __init__(self, history=HISTORY):
+        self.history = history
+        self.version = 0
+        self.columns = {name: [] for name in SERIES}
+        self.changes = {}  # version -> first changed index
+        self.updated = asyncio.Condition()
+        self.messages = {}  # version a client has -> encoded update, for the current version
+        self.stats = {'clients': 0, 'connections': 0, 'dropped': 0, 'messages': 0,
+                      'encodes': 0, 'bytes': 0}
+
+    async def publish(self, start, tail):
+        """Replace every series from index `start` on and wake the clients"""
+        for name, values in tail.items():
+            self.columns[name][start:] = values
+        self.version += 1
+        self.changes[self.version] = start
+        self.changes.pop(self.version - self.history, None)
+        self.messages = {}
+        async with self.updated:
+            self.updated.notify_all()
+
+    def message(self, since):
+        """SSE bytes bringing a client at version `since` (None: nothing yet) up to date"""
+        if since not in self.messages:
+            versions = range(since + 1, self.version + 1) if since is not None else ()
+            if since is None or since > self.version or any(v not in self.changes
+                                                             for v in versions):
+                event, start = 'snapshot', 0
+            else:
+                event, start = 'delta', min(self.changes[v] for v in versions)
+            payload = {'version': self.version, 'start': start,
+                       **{name: values[start:] for name, values in self.columns.items()}}
+            self.messages[since] = (f'id: {self.version}\nevent: {event}\n'
+                                    f'data: {json.dumps(payload, separators=(",", ":"))}\n\n'
+                                    ).encode()
+            self.stats['encodes'] += 1
+        return self.messages[since]
+
+    async def stream(self, writer, since=None):
+        """Send updates to one SSE client until it disconnects or stalls"""
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER)
+        self.stats['clients'] += 1
+        self.stats['connections'] += 1
+        try:
+            writer.write(b'retry: 2000\n\n')
+            while True:
+                if since == self.version:
+                    try:
+                        async with self.updated:
+                            await asyncio.wait_for(
+                                self.updated.wait_for(lambda: since != self.version),
+                                HEARTBEAT_SECONDS)
+                    except asyncio.TimeoutError:
+                        writer.write(b': ping\n\n')
+                if since != self.version:
+                    data = self.message(since)
+                    since = self.version
+                    writer.write(data)
+                    self.stats['messages'] += 1
+                    self.stats['bytes'] += len(data)
+                await asyncio.wait_for(writer.drain(), CLIENT_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.stats['dropped'] += 1
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.stats['clients'] -= 1
+            writer.close()
+
+
+class Dashboard:
+    """Compute loop, optional renderer and HTTP/SSE front end around one LiveSeries"""
+
+    def __init__(self, series, poll=POLL_SECONDS, render_every=None):
+        self.series = series
+        self.poll = poll
+        self.render_every = render_every
+        self.broadcast = Broadcast()
+        self.compute_pool = ThreadPoolExecutor(1)  # the series is only touched here
+        self.render_pool = ProcessPoolExecutor(1) if render_every else None
+        self.polls = 0
+        self.error = None
+        self.stopped = None
+
+    def _stop_on_error(self, task):
+        """Done callback: a compute, render or replay task that raised stops the server"""
+        if task.cancelled() or task.exception() is None:
+            return
+        error = task.exception()
+        self.error = f'{task.get_name()}: {type(error).__name__}: {error}'
+        print(f'{task.get_name()} failed, stopping', file=sys.stderr, flush=True)
+        traceback.print_exception(error)
+        self.stopped.set()
+
+    async def compute(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            result = await loop.run_in_executor(self.compute_pool, self.series.poll)
+            self.polls += 1
+            if result is not None:
+                await self.broadcast.publish(*result)
+            await asyncio.sleep(self.poll)
+
+    async def render(self):
+        """Redraw the SVGs every render_every seconds when the data moved, off the event loop"""
+        loop = asyncio.get_running_loop()
+        rendered = 0
+        while True:
+            await asyncio.sleep(self.render_every)
+            if self.broadcast.version != rendered:
+                rendered = self.broadcast.version
+                series = await loop.run_in_executor(self.compute_pool, self.series.plot_series)
+                await loop.run_in_executor(self.render_pool, _render, series)
+
+    async def handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 10)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                ConnectionError):
+            writer.close()
+            return
+        lines = request.decode('latin-1').split('\r\n')
+        method, target = (lines[0].split() + ['', ''])[:2]
+        headers = dict(line.lower().split(': ', 1) for line in lines[1:] if ': ' in line)
+        path = urllib.parse.urlsplit(target).path
+        if method != 'GET':
+            return await self._send(writer, 405, b'GET only', 'text/plain')
+        if path == '/events':
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n'
+                         b'Cache-Control: no-cache\r\nConnection: keep-alive\r\n'
+                         b'Access-Control-Allow-Origin: *\r\n\r\n')
+            last = headers.get('last-event-id', '')
+            return await self.broadcast.stream(writer, int(last) if last.isdigit() else None)
+        if path == '/snapshot':
+            body = self.broadcast.message(None).split(b'data: ', 1)[1].strip()
+            return await self._send(writer, 200, body)
+        if path == '/stats':
+            stats = dict(self.broadcast.stats, version=self.broadcast.version, polls=self.polls,
+                         events=self.series.aggregator.events, skipped=self.series.skipped,
+                         last_error=self.error or self.series.last_error)
+            return await self._send(writer, 200, json.dumps(stats).encode())
+        return await self._static(writer, path)
+
+    async def _static(self, writer, path):
+        file = os.path.realpath(os.path.join(docs_dir, urllib.parse.unquote(path).lstrip('/')))
+        if os.path.isdir(file):
+            file = os.path.join(file, 'index.html')
+        if os.path.commonpath([file, docs_dir]) != docs_dir or not os.path.isfile(file):
+            return await self._send(writer, 404, b'not found', 'text/plain')
+        with open(file, 'rb') as f:
+            body = f.read()
+        await self._send(writer, 200, body, mimetypes.guess_type(file)[0] or 'application/octet-stream')
+
+    async def _send(self, writer, status, body, content_type='application/json'):
+        reason = {200: 'OK', 404: 'Not Found', 405: 'Method Not Allowed'}[status]
+        writer.write(f'HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n'
+                     f'Content-Length: {len(body)}\r\nAccess-Control-Allow-Origin: *\r\n'
+                     f'Connection: close\r\n\r\n'.encode() + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def serve(self, host='127.0.0.1', port=DEFAULT_PORT, replay=None):
+        server = await asyncio.start_server(self.handle, host, port, backlog=4096)
+        print(f'live dashboard on http://{host}:{server.sockets[0].getsockname()[1]}'
+              f'/index.html?live, tailing {self.series.events}', flush=True)
+        self.stopped = asyncio.Event()
+        tasks = [asyncio.create_task(self.compute(), name='compute')]
+        if self.render_every:
+            tasks.append(asyncio.create_task(self.render(), name='render'))
+        if replay:
+            tasks.append(asyncio.create_task(replay_events(*replay, self.series.events),
+                                             name='replay'))
+        for task in tasks:
+            task.add_done_callback(self._stop_on_error)
+        try:
+            async with server:
+                await self.stopped.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.compute_pool.shutdown(cancel_futures=True)
+            if self.render_pool:
+                self.render_pool.shutdown(cancel_futures=True)
+
+
+async def replay_events(source, lines_per_second, target, interval=0.25):
+    """Append source's lines to target at a steady rate, standing in for a node"""
+    batch = max(1, round(lines_per_second * interval))
+    with open(source, 'rb') as src:
+        if not source.endswith(('.jsonl', '.ndjson', '.json')) and not os.path.exists(target):
+            with open(target, 'wb') as dst:
+                dst.write(src.readline())  # the CSV header
+        while True:
+            lines = [line for line in (src.readline() for _ in range(batch)) if line]
+            if not lines:
+                return
+            with open(target, 'ab') as dst:
+                dst.writelines(lines)
+            await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Stream live supply, burn and rate-limit series from an event file')
+    parser.add_argument('events', help='CSV/JSON-lines transfer-event file to tail')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--marketing-wallet', default=None, help='0x address of marketingWallet')
+    parser.add_argument('--units', choices=['wei', 'tokens'], default='wei')
+    parser.add_argument('--poll', type=float, default=POLL_SECONDS,
+                        help=f'seconds between reads of the event file (default: {POLL_SECONDS})')
+    parser.add_argument('--replay', metavar='SOURCE',
+                        help='append SOURCE to the event file over time instead of waiting for one')
+    parser.add_argument('--rate', type=float, default=100,
+                        help='lines per second for --replay (default: 100)')
+    parser.add_argument('--render', type=float, default=None, metavar='SECONDS',
+                        help='also redraw supply_dynamics.svg and burn_distribution.svg this often')
+    args = parser.parse_args()
+
+    wallet = None
+    if args.marketing_wallet:
+        wallet = bytes(decode_addresses([args.marketing_wallet])[0]).ljust(20, b'\0')
+    dashboard = Dashboard(LiveSeries(os.path.abspath(args.events), wallet, args.units),
+                          args.poll, args.render)
+    start = time.perf_counter()
+    try:
+        asyncio.run(dashboard.serve(args.host, args.port,
+                                    (args.replay, args.rate) if args.replay else None))
+    except KeyboardInterrupt:
+        pass
+    print(f'served {dashboard.broadcast.stats["connections"]:,} connections, '
+          f'{dashboard.broadcast.version:,} versions in {time.perf_counter() - start:.0f}s')
+    if dashboard.error:
+        sys.exit(dashboard.error)
@@ -0,0 +1,222 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import render_farm
+import tokenomics_model as model
+
+# Monte Carlo supply and price-impact paths under random transfer volumes.
+#
+# Each step draws a transfer volume V(t_i) and burns B(t_i) = b * V(t_i)
+# until supply is exhausted; the price impact of that step is
+# I = k * arctan(V / L) with the pool size L a fixed fraction of the
+# supply before the step. Paths are simulated in fixed-size chunks and
+# each chunk is reduced to per-step histograms straight away, so memory is
+# bounded by the chunk size no matter how many paths are requested.
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+class LogNormal:
+    """Lognormal volumes with the given mean (tokens) and log-space sigma"""
+
+    def __init__(self, mean, sigma=1.0):
+        self.mean = mean
+        self.sigma = sigma
+
+    def __call__(self, rng, size):
+        mu = np.log(self.mean) - self.sigma ** 2 / 2
+        return rng.lognormal(mu, self.sigma, size)
+
+
+class Pareto:
+    """Pareto (type I) volumes with tail index alpha > 1 and the given mean"""
+
+    def __init__(self, mean, alpha=1.5):
+        self.mean = mean
+        self.alpha = alpha
+
+    def __call__(self, rng, size):
+        scale = self.mean * (self.alpha - 1) / self.alpha
+        return scale * (1 + rng.pareto(self.alpha, size))
+
+
+class Empirical:
+    """Volumes resampled with replacement from observed values"""
+
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=float)
+
+    def __call__(self, rng, size):
+        return rng.choice(self.values, size)
+
+
+def supply_paths(volumes, burn_rate=model.BURN_RATE, initial_supply=model.INITIAL_SUPPLY):
+    """Supply after every step for a (paths, steps) array of volumes"""
+    supply = np.cumsum(volumes, axis=1)
+    supply *= -burn_rate
+    supply += initial_supply
+    return np.maximum(supply, 0, out=supply)
+
+
+def impact_paths(volumes, supply, liquidity_fraction=0.05, k=model.IMPACT_SCALE,
+                 initial_supply=model.INITIAL_SUPPLY):
+    """Price impact of every step, with the pool sized off the prior supply"""
+    prior = np.empty_like(supply)
+    prior[:, 0] = initial_supply
+    prior[:, 1:] = supply[:, :-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = volumes / (liquidity_fraction * prior)
+    ratio[prior == 0] = np.inf
+    return model.price_impact(ratio, k)
+
+
+class StepHistogram:
+    """Per-step histogram on fixed bins; mergeable, so percentiles stay bounded in memory"""
+
+    def __init__(self, steps, low, high, bins=2000):
+        self.low = low
+        self.high = high
+        self.bins = bins
+        self.counts = np.zeros((steps, bins), dtype=np.int64)
+
+    def add(self, values):
+        """Accumulate a (paths, steps) array"""
+        steps = self.counts.shape[0]
+        index = ((values - self.low) * (self.bins / (self.high - self.low))).astype(np.int64)
+        np.clip(index, 0, self.bins - 1, out=index)
+        index += np.arange(steps, dtype=np.int64) * self.bins
+        self.counts += np.bincount(index.ravel(), minlength=steps * self.bins).reshape(steps, -1)
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    def percentiles(self, qs=PERCENTILES):
+        """Interpolated percentiles per step, shaped (len(qs), steps)"""
+        cumulative = np.cumsum(self.counts, axis=1)
+        total = cumulative[:, -1:]
+        width = (self.high - self.low) / self.bins
+        out = np.empty((len(qs), self.counts.shape[0]))
+        for i, q in enumerate(qs):
+            target = total[:, 0] * q / 100
+            b = np.argmax(cumulative >= target[:, None], axis=1)
+            before = np.where(b > 0, cumulative[np.arange(len(b)), b - 1], 0)
+            inside = self.counts[np.arange(len(b)), b]
+            fraction = np.where(inside > 0, (target - before) / np.maximum(inside, 1), 0)
+            out[i] = self.low + (b + fraction) * width
+        return out
+
+
+def _simulate_chunk(sampler, paths, steps, seed, burn_rate, initial_supply,
+                    liquidity_fraction, bins):
+    rng = np.random.default_rng(seed)
+    volumes = sampler(rng, (paths, steps))
+    supply = supply_paths(volumes, burn_rate, initial_supply)
+    impact = impact_paths(volumes, supply, liquidity_fraction,
+                          initial_supply=initial_supply)
+
+    supply_hist = StepHistogram(steps, 0, initial_supply, bins)
+    supply_hist.add(supply)
+    impact_hist = StepHistogram(steps, 0, model.IMPACT_SCALE * np.pi / 2, bins)
+    impact_hist.add(impact)
+    return supply_hist, impact_hist, supply.sum(axis=0), impact.sum(axis=0)
+
+
+class MonteCarloResult:
+    """Percentile bands and means per step for supply, burned and price impact"""
+
+    def __init__(self, steps, paths, supply_hist, impact_hist, supply_sum, impact_sum,
+                 initial_supply):
+        self.steps = np.arange(1, steps + 1)
+        self.paths = paths
+        self.initial_supply = initial_supply
+        self.supply_hist = supply_hist
+        self.impact_hist = impact_hist
+        self.supply_mean = supply_sum / paths
+        self.impact_mean = impact_sum / paths
+
+    def supply_bands(self, qs=PERCENTILES):
+        """{percentile: supply per step}"""
+        return dict(zip(qs, self.supply_hist.percentiles(qs)))
+
+    def burned_bands(self, qs=PERCENTILES):
+        """{percentile: cumulative burned per step}; low supply means high burn"""
+        supply = self.supply_hist.percentiles([100 - q for q in qs])
+        return dict(zip(qs, self.initial_supply - supply))
+
+    def impact_bands(self, qs=PERCENTILES):
+        """{percentile: price impact per step}"""
+        return dict(zip(qs, self.impact_hist.percentiles(qs)))
+
+
+def run(sampler, paths=100_000, steps=1000, seed=0, chunk_paths=2000, workers=None,
+        burn_rate=model.BURN_RATE, initial_supply=model.INITIAL_SUPPLY,
+        liquidity_fraction=0.05, bins=2000):
+    """Simulate `paths` paths of `steps` steps and reduce them to percentile bands.
+
+    Chunk i is always seeded from child i of SeedSequence(seed), so results
+    are identical for any worker count. workers=None uses every core.
+    """
+    chunk_sizes = [min(chunk_paths, paths - start) for start in range(0, paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    args = [(sampler, size, steps, child, burn_rate, initial_supply, liquidity_fraction, bins)
+            for size, child in zip(chunk_sizes, seeds)]
+
+    if workers is None:
+        workers = render_farm.default_workers()
+    workers = max(1, min(workers, len(args)))
+    if workers == 1:
+        results = (_simulate_chunk(*a) for a in args)
+        return _reduce(results, steps, paths, initial_supply)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_simulate_chunk, *zip(*args))
+        return _reduce(results, steps, paths, initial_supply)
+
+
+def _reduce(results, steps, paths, initial_supply):
+    supply_hist = impact_hist = None
+    supply_sum = np.zeros(steps)
+    impact_sum = np.zeros(steps)
+    for chunk_supply, chunk_impact, chunk_supply_sum, chunk_impact_sum in results:
+        supply_hist = chunk_supply if supply_hist is None else supply_hist.merge(chunk_supply)
+        impact_hist = chunk_impact if impact_hist is None else impact_hist.merge(chunk_impact)
+        supply_sum += chunk_supply_sum
+        impact_sum += chunk_impact_sum
+    return MonteCarloResult(steps, paths, supply_hist, impact_hist, supply_sum, impact_sum,
+                            initial_supply)
+
+
+def sampler_from_name(name, mean=model.INITIAL_SUPPLY / 50, empirical_file=None):
+    """Build a volume sampler from a command-line name"""
+    if name == 'lognormal':
+        return LogNormal(mean)
+    if name == 'pareto':
+        return Pareto(mean)
+    if name == 'empirical':
+        if empirical_file is None:
+            raise ValueError('the empirical sampler needs --volumes FILE')
+        return Empirical(np.loadtxt(empirical_file, ndmin=1))
+    raise ValueError(f'unknown volume distribution: {name}')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Monte Carlo supply and price impact bands')
+    parser.add_argument('--distribution', choices=['lognormal', 'pareto', 'empirical'],
+                        default='lognormal')
+    parser.add_argument('--volumes', help='one volume per line, for --distribution empirical')
+    parser.add_argument('--paths', type=int, default=100_000)
+    parser.add_argument('--steps', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    sampler = sampler_from_name(args.distribution, empirical_file=args.volumes)
+    start = time.perf_counter()
+    result = run(sampler, args.paths, args.steps, args.seed, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(f'{args.paths:,} paths x {args.steps:,} steps in {elapsed:.2f}s')
+    for q, band in result.supply_bands().items():
+        print(f'supply p{q:<3} at final step: {band[-1] / 1e9:10.2f}B')
@@ -0,0 +1,343 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+import tokenomics_model as model
+
+# Parameter sweeps over the tokenomics model, with variance-based sensitivity.
+#
+# A sweep is the Cartesian grid of one value list per parameter; parameters
+# left out stay at their tokenomics_model default. The grid is walked in
+# flat chunks of at most chunk_points points: each chunk's parameter vectors
+# are gathered with np.unravel_index and every metric is evaluated on them
+# at once, so temporaries are bounded by the chunk, not the grid.
+#
+# Every evaluated grid is memoized on disk (see SweepCache), with parameter
+# values rounded to 12 significant digits so 0.01 from np.linspace(0, 0.02, 3)
+# and from np.linspace(0, 0.02, 5) match. Refining a sweep only evaluates the
+# points that no earlier sweep covered.
+#
+# Sensitivity treats each swept parameter as uniform over its values. The
+# first-order Sobol index S_i = Var(E[Y | X_i]) / Var(Y) and the total index
+# S_Ti = E[Var(Y | X_~i)] / Var(Y) are then exact means over grid axes, not
+# Monte Carlo estimates.
+
+PARAMETERS = {
+    'burn_rate': model.BURN_RATE,
+    'marketing_rate': model.MARKETING_RATE,
+    'impact_scale': model.IMPACT_SCALE,
+    'max_tx_per_hour': model.MAX_TX_PER_HOUR,
+}
+LABELS = {
+    'burn_rate': 'Burn Rate',
+    'marketing_rate': 'Marketing Rate',
+    'impact_scale': 'Impact Scale k',
+    'max_tx_per_hour': 'Max Transactions per Hour',
+}
+TRANSACTIONS = 100  # transfers, each of the whole supply
+VOLUME_RATIO = 0.5  # trade size relative to the liquidity pool
+CHUNK_POINTS = 2**20
+CACHE_DIR_NAME = '.sweep_cache'
+CACHE_VERSION = 1  # bump when a metric definition changes
+
+output_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def _burned_fraction(p):
+    return -np.expm1(np.log1p(-p['burn_rate']) * TRANSACTIONS)
+
+
+def _daily_fees(p):
+    return p['burn_rate'] + p['marketing_rate'], 24 * p['max_tx_per_hour']
+
+
+def _holder_retained(p):
+    fee, transfers = _daily_fees(p)
+    return np.exp(np.log1p(-fee) * transfers)
+
+
+def _holder_burned(p):
+    # Geometric sum of b * (1 - b - m)**i over a day of transfers at the cap
+    fee, transfers = _daily_fees(p)
+    spent = -np.expm1(np.log1p(-fee) * transfers)
+    # spent / fee tends to the number of transfers as the fee goes to 0
+    return p['burn_rate'] * np.divide(spent, fee, out=transfers * 1.0, where=fee > 0)
+
+
+def _trade_cost(p):
+    fees = p['burn_rate'] + p['marketing_rate']
+    return fees + model.price_impact(VOLUME_RATIO, p['impact_scale'])
+
+
+# name: (function of {parameter: values}, description)
+METRICS = {
+    'burned_fraction': (_burned_fraction,
+                        f'Share of supply burned after {TRANSACTIONS} transactions'),
+    'holder_retained': (_holder_retained,
+                        'Balance kept after a day of whole-balance transfers at the cap'),
+    'holder_burned': (_holder_burned,
+                      'Balance burned over a day of whole-balance transfers at the cap'),
+    'trade_cost': (_trade_cost,
+                   f'Fees plus price impact of a trade {VOLUME_RATIO:g}x the pool'),
+}
+
+
+def _canonical(values):
+    """Values rounded to 12 significant digits, so refined grids share cache keys"""
+    return np.array([float(f'{v:.12g}') for v in np.atleast_1d(values)]) + 0.0  # no -0.0
+
+
+def parse_range(text):
+    """'start:stop:num' (inclusive, like np.linspace) or 'a,b,c' -> value array"""
+    try:
+        if ':' in text:
+            start, stop, num = text.split(':')
+            return np.linspace(float(start), float(stop), int(num))
+        return np.array([float(v) for v in text.split(',')])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected start:stop:num or a,b,c (got {text!r})')
+
+
+class SweepCache:
+    """Metric values of earlier sweeps, kept on disk as grid blocks.
+
+    Each block is one sweep's full grid over every parameter (fixed ones as
+    axes of length one), stored as a (metrics, *axes) .npy file next to an
+    index.json of its axes. A point is cached when each of its coordinates is
+    on the matching axis of some block, so finding every cached point of a
+    new grid is one searchsorted per axis. Blocks are memory-mapped, and a
+    block whose axes all lie within a newer one's is deleted.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.blocks = []  # [(file name, {parameter: axis})]
+        path = os.path.join(directory, 'index.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                index = json.load(f)
+            if (index['version'] == CACHE_VERSION and index['parameters'] == list(PARAMETERS)
+                    and index['metrics'] == list(METRICS)):
+                self.blocks = [(block['file'], {name: np.array(axis)
+                                                for name, axis in block['axes'].items()})
+                               for block in index['blocks']]
+
+    def __len__(self):
+        return sum(int(np.prod([len(axis) for axis in axes.values()])) for _, axes in self.blocks)
+
+    def matches(self, axes):
+        """[(values memmap, {parameter: block position of each value or -1})] overlapping axes"""
+        found = []
+        for name, block_axes in self.blocks:
+            positions = {}
+            for parameter, axis in axes.items():
+                known = block_axes[parameter]
+                at = np.minimum(np.searchsorted(known, axis), len(known) - 1)
+                positions[parameter] = np.where(known[at] == axis, at, -1)
+            if all((pos >= 0).any() for pos in positions.values()):
+                values = np.load(os.path.join(self.directory, name), mmap_mode='r')
+                found.append((values, positions))
+        return found
+
+    def save(self, axes, values):
+        """Store a grid ({parameter: sorted axis}, (metrics, *axes)) as a new block"""
+        os.makedirs(self.directory, exist_ok=True)
+        name = f'{time.time_ns():x}.npy'
+        np.save(os.path.join(self.directory, name), values)
+        kept = []
+        for old, old_axes in self.blocks:
+            if all(np.isin(old_axes[p], axes[p]).all() for p in PARAMETERS):
+                os.remove(os.path.join(self.directory, old))
+            else:
+                kept.append((old, old_axes))
+        self.blocks = kept + [(name, axes)]
+        index = {'version': CACHE_VERSION, 'parameters': list(PARAMETERS),
+                 'metrics': list(METRICS),
+                 'blocks': [{'file': name,
+                             'axes': {p: axis.tolist() for p, axis in block_axes.items()}}
+                            for name, block_axes in self.blocks]}
+        path = os.path.join(self.directory, 'index.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(index, f)
+        os.replace(path + '.tmp', path)
+
+
+class SweepResult:
+    """Metric grids of a sweep, shaped by its swept axes in order"""
+
+    def __init__(self, axes, fixed, metrics, computed, elapsed):
+        self.axes = axes  # {parameter: values}, the swept ones
+        self.fixed = fixed  # {parameter: value}, everything else
+        self.metrics = metrics  # {metric: array shaped by axes}
+        self.computed = computed
+        self.elapsed = elapsed
+
+    @property
+    def points(self):
+        return int(np.prod([len(values) for values in self.axes.values()]))
+
+    def sobol(self, metric):
+        """{parameter: (first-order, total)} Sobol indices of a metric over the grid"""
+        y = self.metrics[metric]
+        variance = y.var()
+        names = list(self.axes)
+        indices = {}
+        for i, name in enumerate(names):
+            others = tuple(j for j in range(y.ndim) if j != i)
+            if variance == 0:
+                indices[name] = (0.0, 0.0)
+                continue
+            first = y.mean(axis=others).var() / variance
+            total = y.var(axis=i).mean() / variance
+            indices[name] = (float(first), float(total))
+        return indices
+
+    def baseline(self):
+        """Grid index of the point nearest every parameter's default"""
+        return tuple(int(np.argmin(np.abs(values - PARAMETERS[name])))
+                     for name, values in self.axes.items())
+
+
+def sweep(ranges, chunk_points=CHUNK_POINTS, cache=None):
+    """Evaluate every metric on the grid of ranges ({parameter: values}).
+
+    Values are sorted and deduplicated. cache is a SweepCache or None.
+    Returns a SweepResult.
+    """
+    unknown = set(ranges) - set(PARAMETERS)
+    if unknown:
+        raise ValueError(f'unknown parameters {sorted(unknown)} (expected {list(PARAMETERS)})')
+    axes = {name: np.unique(_canonical(ranges[name])) for name in PARAMETERS if name in ranges}
+    fixed = {name: float(_canonical(value)[0]) for name, value in PARAMETERS.items()
+             if name not in ranges}
+    full = {name: axes[name] if name in axes else np.array([fixed[name]]) for name in PARAMETERS}
+    shape = tuple(len(axis) for axis in full.values())
+    total = int(np.prod(shape))
+    out = np.empty((len(METRICS), total))
+    computed = 0
+
+    start = time.perf_counter()
+    blocks = cache.matches(full) if cache is not None else []
+    for lo in range(0, total, chunk_points):
+        flat = np.arange(lo, min(lo + chunk_points, total))
+        coords = dict(zip(PARAMETERS, np.unravel_index(flat, shape)))
+        hit = np.zeros(len(flat), dtype=bool)
+        for values, positions in blocks:
+            at = [positions[name][coords[name]] for name in PARAMETERS]
+            inside = ~hit & np.logical_and.reduce([a >= 0 for a in at])
+            if inside.any():
+                out[:, flat[inside]] = values[(slice(None), *(a[inside] for a in at))]
+                hit |= inside
+        if not hit.all():
+            todo = ~hit
+            params = {name: full[name][coords[name][todo]] for name in PARAMETERS}
+            out[:, flat[todo]] = np.stack([np.broadcast_to(func(params), int(todo.sum()))
+                                           for func, _ in METRICS.values()])
+            computed += int(todo.sum())
+    if cache is not None and computed:
+        cache.save(full, out.reshape((len(METRICS), *shape)))
+    swept_shape = tuple(len(axis) for axis in axes.values())
+    metrics = {name: out[i].reshape(swept_shape) for i, name in enumerate(METRICS)}
+    return SweepResult(axes, fixed, metrics, computed, time.perf_counter() - start)
+
+
+def plot_heatmap(result, metric, x, y, path=None):
+    """Metric over two swept parameters, the others at the grid point nearest their default"""
+    names = list(result.axes)
+    base = list(result.baseline())
+    index = tuple(slice(None) if name in (x, y) else base[i] for i, name in enumerate(names))
+    grid = result.metrics[metric][index]
+    if names.index(x) < names.index(y):
+        grid = grid.T  # rows follow y
+
+    fig, ax = plt.subplots(figsize=(10, 7))
+    mesh = ax.pcolormesh(result.axes[x], result.axes[y], grid, shading='nearest',
+                         cmap='viridis')
+    fig.colorbar(mesh, ax=ax, label=METRICS[metric][1])
+    ax.plot(result.axes[x][base[names.index(x)]], result.axes[y][base[names.index(y)]],
+            'w+', markersize=12, markeredgewidth=2)
+    held = [f'{LABELS[name]} = {result.axes[name][base[i]]:g}'
+            for i, name in enumerate(names) if name not in (x, y)]
+    ax.set_title(f'MemePi {metric}' + (f'\n({", ".join(held)})' if held else ''))
+    ax.set_xlabel(LABELS[x])
+    ax.set_ylabel(LABELS[y])
+    path = path or os.path.join(output_dir, f'sweep_heatmap_{metric}.svg')
+    fig.savefig(path, format='svg', bbox_inches='tight')
+    plt.close(fig)
+    return path
+
+
+def plot_tornado(result, metric, path=None):
+    """One-at-a-time swing of a metric over each parameter's range, with Sobol indices"""
+    names = list(result.axes)
+    base = result.baseline()
+    grid = result.metrics[metric]
+    baseline = grid[base]
+    sobol = result.sobol(metric)
+    bars = []
+    for i, name in enumerate(names):
+        index = list(base)
+        index[i] = slice(None)
+        line = grid[tuple(index)]
+        bars.append((name, line[0], line[-1]))
+    bars.sort(key=lambda bar: abs(bar[2] - bar[1]))
+
+    fig, ax = plt.subplots(figsize=(10, 1.2 + 0.8 * len(bars)))
+    for row, (name, low, high) in enumerate(bars):
+        ax.barh(row, low - baseline, left=baseline, color='#3498db', height=0.6,
+                label='Lowest value' if row == 0 else None)
+        ax.barh(row, high - baseline, left=baseline, color='#e74c3c', height=0.6,
+                label='Highest value' if row == 0 else None)
+    ax.set_yticks(range(len(bars)))
+    ax.set_yticklabels([f'{LABELS[name]} ({result.axes[name][0]:g}–{result.axes[name][-1]:g})\n'
+                        f'S1 {sobol[name][0]:.2f}, ST {sobol[name][1]:.2f}'
+                        for name, _, _ in bars])
+    ax.axvline(baseline, color='k', linewidth=1)
+    ax.set_title(f'MemePi {metric} Sensitivity')
+    ax.set_xlabel(METRICS[metric][1])
+    ax.grid(True, axis='x', alpha=0.3)
+    ax.legend(loc='lower right')
+    path = path or os.path.join(output_dir, f'sweep_tornado_{metric}.svg')
+    fig.savefig(path, format='svg', bbox_inches='tight')
+    plt.close(fig)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Sweep model parameters and rank their influence')
+    for name, default in PARAMETERS.items():
+        parser.add_argument('--' + name.replace('_', '-'), type=parse_range, default=None,
+                            metavar='RANGE', help=f'start:stop:num or a,b,c (default: {default:g})')
+    parser.add_argument('--metric', choices=list(METRICS), nargs='+', default=list(METRICS))
+    parser.add_argument('--heatmap', nargs=2, metavar=('X', 'Y'), choices=list(PARAMETERS),
+                        help='two swept parameters to plot each metric over')
+    parser.add_argument('--plot', action='store_true', help='write the tornado chart of each metric')
+    parser.add_argument('--chunk-points', type=int, default=CHUNK_POINTS,
+                        help=f'grid points evaluated at once (default: {CHUNK_POINTS})')
+    parser.add_argument('--cache', default=os.path.join(output_dir, CACHE_DIR_NAME),
+                        help=f'directory memoizing evaluated points (default: {CACHE_DIR_NAME})')
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args()
+
+    ranges = {name: getattr(args, name) for name in PARAMETERS if getattr(args, name) is not None}
+    if not ranges:
+        parser.error('give at least one parameter range, e.g. --burn-rate 0.005:0.05:10')
+    if args.heatmap and not set(args.heatmap) <= set(ranges):
+        parser.error('--heatmap parameters must both be swept')
+    cache = None if args.no_cache else SweepCache(args.cache)
+    result = sweep(ranges, args.chunk_points, cache)
+    print(f'{result.points:,} points, {result.computed:,} evaluated, '
+          f'{result.points - result.computed:,} from cache ({result.elapsed:.2f}s)')
+    for metric in args.metric:
+        values = result.metrics[metric]
+        print(f'\n{metric}: {METRICS[metric][1]} (min {values.min():.4g}, max {values.max():.4g})')
+        for name, (first, total) in sorted(result.sobol(metric).items(), key=lambda item: -item[1][1]):
+            print(f'  {name:<16} S1 {first:6.3f}  ST {total:6.3f}')
+        if args.plot:
+            print(f'  wrote {os.path.basename(plot_tornado(result, metric))}')
+        if args.heatmap:
+            print(f'  wrote {os.path.basename(plot_heatmap(result, metric, *args.heatmap))}')
@@ -0,0 +1,364 @@
+import argparse
+import math
+import time
+
+import numpy as np
+
+import chain_store
+
+# Replay of the per-address transaction rate policy against a transfer log.
+#
+# Cooldown: a sender must wait pi * 100 seconds after their last accepted
+# transfer. Daily limit: at most 86400 / (pi * 100) ~ 275 accepted transfers
+# per sender per UTC day. A rejected transfer changes nothing, so the rules
+# are replayed alone and combined, and rejections are counted for each.
+#
+# Per-address state (last accepted time, current day, accepted count) lives
+# in flat arrays indexed by a dense sender id. The time-sorted log is
+# processed one UTC hour at a time. Inside an hour each sender's accepted
+# cooldown chain is found by pointer jumping: every transfer points at the
+# sender's first transfer a full cooldown later. A chain is at most
+# 3600 / 314 + 1 = 12 steps, so every step is one array operation over all
+# senders.
+
+COOLDOWN = math.pi * 100  # seconds
+COOLDOWN_SECONDS = math.ceil(COOLDOWN)  # integer timestamps: t - last >= 314.16 <=> >= 315
+DAILY_LIMIT = int(86400 / COOLDOWN)  # 275
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 86400
+RULES = ('cooldown', 'daily', 'combined')
+_SPAN = 1 << 13  # > SECONDS_PER_HOUR + COOLDOWN_SECONDS, for (sender, time) sort keys
+NEVER = -(1 << 40)
+
+
+class AddressIndex:
+    """Sorted table of distinct 20-byte senders; an address's id is its position"""
+
+    def __init__(self, addresses):
+        self.addresses = addresses
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Build from an iterable of S20 arrays, merging per-chunk distinct values"""
+        distinct = [np.unique(np.asarray(chunk)) for chunk in chunks]
+        if not distinct:
+            return cls(np.empty(0, dtype='S20'))
+        return cls(np.unique(np.concatenate(distinct)))
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def ids(self, addresses):
+        return np.searchsorted(self.addresses, addresses)
+
+
+class RateLimitState:
+    """Array-backed per-address table for one rule"""
+
+    def __init__(self, num_addresses):
+        self.last = np.full(num_addresses, NEVER, dtype=np.int64)  # last accepted time
+        self.day = np.full(num_addresses, -1, dtype=np.int32)
+        self.count = np.zeros(num_addresses, dtype=np.int32)  # accepted on self.day
+        self.rejected = np.zeros(num_addresses, dtype=np.int32)
+
+    def grow(self, num_addresses):
+        """Extend the table to num_addresses, new addresses starting fresh"""
+        extra = num_addresses - len(self.last)
+        if extra > 0:
+            self.last = np.append(self.last, np.full(extra, NEVER, dtype=np.int64))
+            self.day = np.append(self.day, np.full(extra, -1, dtype=np.int32))
+            self.count = np.append(self.count, np.zeros(extra, dtype=np.int32))
+            self.rejected = np.append(self.rejected, np.zeros(extra, dtype=np.int32))
+
+    def remaining(self, senders, day):
+        """Transfers each sender may still make today"""
+        used = np.where(self.day[senders] == day, self.count[senders], 0)
+        return DAILY_LIMIT - used
+
+    def accept(self, senders, times, accepted, starts, day):
+        """Record one hour's accepted transfers, grouped by sender"""
+        counts = np.add.reduceat(accepted.astype(np.int32), starts)
+        group_senders = senders[starts]
+        today = self.day[group_senders] == day
+        self.count[group_senders] = np.where(today, self.count[group_senders], 0) + counts
+        self.day[group_senders] = day
+        latest = np.maximum.reduceat(np.where(accepted, times, NEVER), starts)
+        self.last[group_senders] = np.maximum(self.last[group_senders], latest)
+        np.add.at(self.rejected, senders[~accepted], 1)
+
+
+class RateLimitReport:
+    """Rejection counts per rule, by hour of day and by hour of the log"""
+
+    def __init__(self, transfers, rejected, by_hour_of_day, hours, per_hour, states,
+                 addresses=None):
+        self.transfers = transfers
+        self.rejected = rejected  # {rule: rejected transfers}
+        self.by_hour_of_day = by_hour_of_day  # (len(RULES), 24)
+        self.hours = hours  # start of each hour in the log, unix seconds
+        self.per_hour = per_hour  # (len(RULES), len(hours))
+        self.states = states  # {rule: RateLimitState}
+        self.addresses = addresses  # AddressIndex, when replaying real addresses
+
+    def offenders(self, rule='combined', k=10):
+        """(sender ids, rejected transfers) of the k most rejected senders"""
+        rejected = self.states[rule].rejected
+        top = np.argsort(-rejected, kind='stable')[:k]
+        top = top[rejected[top] > 0]
+        return top, rejected[top]
+
+
+def _hour(senders, times, states, hour_start):
+    """Accept/reject one hour of transfers under each rule; returns rejections per rule"""
+    order = np.lexsort((times, senders))
+    senders, times = senders[order], times[order]
+    n = len(senders)
+    starts = np.flatnonzero(np.concatenate([[True], senders[1:] != senders[:-1]]))
+    ends = np.append(starts[1:], n)
+    group = np.repeat(np.arange(len(starts)), ends - starts)
+    group_senders = senders[starts]
+    day = int(hour_start // SECONDS_PER_DAY)
+
+    key = senders * _SPAN + (times - hour_start)
+    jump = np.searchsorted(key, key + COOLDOWN_SECONDS)
+    jump = np.where(jump < ends[group], jump, -1)  # -1: no later transfer from this sender
+
+    rejected = []
+    for rule in RULES:
+        state = states[rule]
+        accepted = np.zeros(n, dtype=bool)
+        if rule == 'daily':
+            rank = np.arange(n) - starts[group]
+            accepted = rank < state.remaining(senders, day)
+        else:
+            # Each sender's chain starts at their first transfer past the cooldown
+            ready = np.maximum(state.last[group_senders] + COOLDOWN_SECONDS - hour_start, 0)
+            first = np.searchsorted(key, group_senders * _SPAN + np.minimum(ready, _SPAN - 1))
+            live = first < ends
+            frontier, budget = first[live], None
+            if rule == 'combined':
+                budget = state.remaining(group_senders, day)[live]
+            step = 0
+            while len(frontier):
+                if budget is not None:
+                    keep = budget > step
+                    frontier, budget = frontier[keep], budget[keep]
+                accepted[frontier] = True
+                frontier = jump[frontier]
+                follow = frontier >= 0
+                frontier = frontier[follow]
+                if budget is not None:
+                    budget = budget[follow]
+                step += 1
+        state.accept(senders, times, accepted, starts, day)
+        rejected.append(n - int(accepted.sum()))
+    return rejected
+
+
+def _replay(read, hours, bounds, num_addresses, addresses=None):
+    """Run every rule over the hours of a log; read(lo, hi) returns (sender ids, times)"""
+    states = {rule: RateLimitState(num_addresses) for rule in RULES}
+    per_hour = np.zeros((len(RULES), len(hours)), dtype=np.int64)
+    for i, hour_start in enumerate(hours):
+        senders, times = read(bounds[i], bounds[i + 1])
+        if len(senders):
+            per_hour[:, i] = _hour(senders, times, states, hour_start)
+    by_hour_of_day = np.zeros((len(RULES), 24), dtype=np.int64)
+    for rule in range(len(RULES)):
+        np.add.at(by_hour_of_day[rule], (hours // SECONDS_PER_HOUR) % 24, per_hour[rule])
+    return RateLimitReport(int(bounds[-1] - bounds[0]),
+                           dict(zip(RULES, per_hour.sum(axis=1).tolist())),
+                           by_hour_of_day, hours, per_hour, states, addresses)
+
+
+def replay(senders, times, num_addresses=None):
+    """Replay a time-sorted log of integer sender ids under every rule.
+
+    senders and times may be memory-mapped; one hour is read at a time.
+    """
+    if num_addresses is None:
+        num_addresses = int(np.max(senders, initial=-1)) + 1
+    hours, bounds = _hour_bounds(times)
+    return _replay(lambda lo, hi: (np.asarray(senders[lo:hi], dtype=np.int64),
+                                   np.asarray(times[lo:hi], dtype=np.int64)),
+                   hours, bounds, num_addresses)
+
+
+def _hour_bounds(times, rows=None):
+    """UTC hour starts spanning a sorted time column and the row where each begins"""
+    lo, hi = (0, len(times)) if rows is None else rows
+    if hi <= lo:
+        return np.empty(0, dtype=np.int64), np.array([lo])
+    first = int(times[lo]) // SECONDS_PER_HOUR * SECONDS_PER_HOUR
+    hours = np.arange(first, int(times[hi - 1]) + 1, SECONDS_PER_HOUR, dtype=np.int64)
+    bounds = lo + np.searchsorted(times[lo:hi], np.append(hours[1:], hours[-1] + SECONDS_PER_HOUR))
+    return hours, np.concatenate([[lo], bounds])
+
+
+def _user_rows(sender, recipient, block):
+    """Rows that are user transfers: not mints, burns or the marketing fee leg.
+
+    The first row is context only (its mask entry is meaningless): a fee leg
+    at the start of a slice needs the burn before it.
+    """
+    burn = recipient == chain_store.ZERO_ADDRESS
+    # The marketing fee leg directly follows the same sender's burn in the same block
+    fee = np.concatenate([[False], burn[:-1] & (sender[1:] == sender[:-1]) &
+                          (block[1:] == block[:-1])])
+    return (sender != chain_store.ZERO_ADDRESS) & ~burn & ~fee
+
+
+def replay_store(store, rows=slice(None), chunk_rows=16 * chain_store.BLOCK_ROWS):
+    """Replay a chain_store transfers store; mints, burns and fee legs are not rate limited.
+
+    Senders are mapped to dense ids through an AddressIndex built in a first
+    streaming pass, so memory is bounded by the number of distinct senders.
+    """
+    if not store.header['sorted']['timestamp']:
+        raise ValueError('the rate limit replay needs a timestamp-sorted store')
+    start, stop, _ = rows.indices(len(store))
+    index = AddressIndex.from_chunks(
+        chunk['sender'] for chunk in store.chunks(slice(start, stop), ['sender'], chunk_rows))
+
+    def read(lo, hi):
+        # One row back, so a fee leg at the start of the hour sees its burn
+        back = min(lo, 1)
+        sender = store['sender'][lo - back:hi]
+        user = _user_rows(sender, store['recipient'][lo - back:hi],
+                          store['block'][lo - back:hi])[back:]
+        return (index.ids(sender[back:][user]),
+                np.asarray(store['timestamp'][lo:hi][user], dtype=np.int64))
+
+    hours, bounds = _hour_bounds(store['timestamp'], (start, stop))
+    return _replay(read, hours, bounds, len(index), index)
+
+
+class LiveReplay:
+    """replay_store() for a log that keeps growing, fed batches of transfer columns in order.
+
+    Sender ids are handed out in order of first appearance and the state
+    tables grow with them. A batch may end mid-hour: _hour() picks up from
+    the state the earlier part of the hour left, which is exactly what a
+    transfer-at-a-time replay would have.
+    """
+
+    def __init__(self):
+        self.ids = {}  # sender address -> dense id
+        self.states = {rule: RateLimitState(0) for rule in RULES}
+        self.previous = None  # (sender, recipient, block) of the last row seen
+        self.transfers = 0
+        self.rejected = dict.fromkeys(RULES, 0)
+
+    def _sender_ids(self, addresses):
+        distinct, inverse = np.unique(addresses, return_inverse=True)
+        ids = np.array([self.ids.setdefault(bytes(a), len(self.ids)) for a in distinct],
+                       dtype=np.int64)
+        for state in self.states.values():
+            state.grow(len(self.ids))
+        return ids[inverse]
+
+    def add(self, columns):
+        """Replay one batch; returns (hour starts, rejections of shape (len(RULES), hours))"""
+        sender = np.asarray(columns['sender'], dtype='S20')
+        recipient = np.asarray(columns['recipient'], dtype='S20')
+        block = np.asarray(columns['block'], dtype=np.int64)
+        times = np.asarray(columns['timestamp'], dtype=np.int64)
+        if not len(block):
+            return np.empty(0, dtype=np.int64), np.zeros((len(RULES), 0), dtype=np.int64)
+        context = self.previous or (chain_store.ZERO_ADDRESS, chain_store.ZERO_ADDRESS, -1)
+        user = _user_rows(np.append(np.array(context[0], dtype='S20'), sender),
+                          np.append(np.array(context[1], dtype='S20'), recipient),
+                          np.append(context[2], block))[1:]
+        self.previous = (sender[-1], recipient[-1], int(block[-1]))
+
+        senders, times = self._sender_ids(sender[user]), times[user]
+        hours, bounds = _hour_bounds(times)
+        per_hour = np.zeros((len(RULES), len(hours)), dtype=np.int64)
+        for i, hour_start in enumerate(hours):
+            if bounds[i + 1] > bounds[i]:
+                per_hour[:, i] = _hour(senders[bounds[i]:bounds[i + 1]],
+                                       times[bounds[i]:bounds[i + 1]], self.states, hour_start)
+        self.transfers += len(times)
+        for rule, rejected in zip(RULES, per_hour.sum(axis=1).tolist()):
+            self.rejected[rule] += rejected
+        return hours, per_hour
+
+
+def replay_reference(senders, times):
+    """Dict-per-address replay, used to check replay()"""
+    rejected = dict.fromkeys(RULES, 0)
+    last = {rule: {} for rule in RULES}
+    daily = {rule: {} for rule in RULES}
+    for sender, t in zip(senders, times):
+        day = t // SECONDS_PER_DAY
+        for rule in RULES:
+            cooling = (rule != 'daily' and
+                       t - last[rule].get(sender, NEVER) < COOLDOWN)
+            seen_day, count = daily[rule].get(sender, (day, 0))
+            count = count if seen_day == day else 0
+            capped = rule != 'cooldown' and count >= DAILY_LIMIT
+            if cooling or capped:
+                rejected[rule] += 1
+                continue
+            last[rule][sender] = t
+            daily[rule][sender] = (day, count + 1)
+    return rejected
+
+
+def synthetic_log(n, num_addresses=2_000_000, days=7, seed=0, start_time=1_700_006_400):
+    """Diurnal human traffic over many addresses plus bots sending every ~2 minutes"""
+    rng = np.random.default_rng(seed)
+    num_bot = n // 5
+    bots = max(1, num_bot * 120 // (days * SECONDS_PER_DAY))
+    # Humans: activity peaks mid-afternoon UTC
+    hour_weights = 1 + 0.8 * np.sin((np.arange(24) - 9) / 24 * 2 * np.pi)
+    hours = rng.choice(24 * days, n - num_bot, p=np.tile(hour_weights, days) /
+                       np.tile(hour_weights, days).sum())
+    human_times = start_time + hours * SECONDS_PER_HOUR + rng.integers(0, SECONDS_PER_HOUR,
+                                                                       n - num_bot)
+    humans = np.minimum(rng.pareto(1.0, n - num_bot) * num_addresses / 100,
+                        num_addresses - bots - 1).astype(np.int64) + bots
+    # Bots: ids 0..bots-1, uniformly spread so each averages one transfer per two minutes
+    bot_ids = rng.integers(0, bots, num_bot)
+    bot_times = start_time + rng.integers(0, days * SECONDS_PER_DAY, num_bot)
+    times = np.concatenate([human_times, bot_times])
+    senders = np.concatenate([humans, bot_ids])
+    order = np.argsort(times, kind='stable')
+    return senders[order], times[order]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Replay per-address cooldown and daily-limit rules over a transfer log')
+    parser.add_argument('--transfers', help='chain_store transfers directory (default: synthetic)')
+    parser.add_argument('-n', '--events', type=int, default=20_000_000)
+    parser.add_argument('--addresses', type=int, default=2_000_000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--check', type=int, default=200_000,
+                        help='synthetic transfers to verify against the dict-per-address loop')
+    parser.add_argument('--plot', action='store_true', help='write rate_limit_rejections.svg')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.transfers:
+        report = replay_store(chain_store.ColumnStore(args.transfers))
+    else:
+        senders, times = synthetic_log(args.events, args.addresses, days=args.days)
+        m = min(args.check, args.events)
+        expected = replay_reference(senders[:m].tolist(), times[:m].tolist())
+        assert replay(senders[:m], times[:m], args.addresses).rejected == expected, \
+            'mismatch against reference'
+        start = time.perf_counter()
+        report = replay(senders, times, args.addresses)
+    elapsed = time.perf_counter() - start
+
+    print(f'{report.transfers:,} transfers in {elapsed:.2f}s '
+          f'({report.transfers / elapsed:,.0f}/s)')
+    for rule in RULES:
+        rejected = report.rejected[rule]
+        senders_hit = int(np.count_nonzero(report.states[rule].rejected))
+        print(f'  {rule:<9} rejects {rejected:>12,} ({rejected / max(report.transfers, 1):6.2%}) '
+              f'from {senders_hit:,} senders')
+    if args.plot:
+        import tokenomics_visualizer
+        tokenomics_visualizer.plot_rate_limit_rejections(report)
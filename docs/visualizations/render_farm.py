@@ -0,0 +1,121 @@
+import argparse
+import functools
+import os
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import instrumentation
+
+# One figure to render: a module-level function, the file it writes and its kwargs.
+# Output paths are fixed when the job is created, so results never depend on
+# which worker picked the job up or in which order jobs finished.
+RenderJob = namedtuple('RenderJob', ['func', 'output', 'kwargs'])
+
+# Counts kept where jobs run (cache hits in a worker, say): each source is a
+# callable returning {name: count} since its last call, and every job's
+# counts are added to COUNTERS in the parent process.
+_COUNTER_SOURCES = []
+COUNTERS = Counter()
+
+
+def make_job(func, output, **kwargs):
+    """Create a render job that calls func(output=output, **kwargs)"""
+    return RenderJob(func, output, kwargs)
+
+
+def register_counters(source):
+    """Report source() after every job run in this process into COUNTERS"""
+    _COUNTER_SOURCES.append(source)
+
+
+def _take_counters():
+    counts = Counter()
+    for source in _COUNTER_SOURCES:
+        counts.update(source())
+    return counts
+
+
+def _init_worker():
+    """Workers render off-screen and never open a window"""
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _run(job):
+    job.func(output=job.output, **job.kwargs)
+    return job.output, _take_counters()
+
+
+def _run_recorded(job):
+    """Render a job and return its instrumentation record"""
+    _, entry = instrumentation.record(os.path.basename(job.output), job.func,
+                                      output=job.output, **job.kwargs)
+    return entry, _take_counters()
+
+
+def default_workers():
+    """Number of cores available to this process"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _dispatch(jobs, workers, report=None):
+    if not jobs:
+        return
+    if workers is None:
+        workers = default_workers()
+    workers = max(1, min(workers, len(jobs)))
+    run = _run_recorded if report is not None and report.enabled else _run
+    if workers == 1:
+        results = [run(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            results = list(pool.map(run, jobs))
+    for _, counts in results:
+        COUNTERS.update(counts)
+    if run is _run_recorded:
+        for job, (entry, _) in zip(jobs, results):
+            report.add(entry, functools.partial(job.func, output=job.output, **job.kwargs))
+
+
+def render(jobs, workers=None, cache=None, report=None):
+    """Render every job, spreading them over a process pool.
+
+    workers=None uses every available core; workers=1 renders in-process,
+    one figure after another. With an ArtifactCache only jobs whose inputs
+    changed since the last build are rendered. An enabled
+    instrumentation.Report gets one record per rendered job. Returns the
+    output paths in job order.
+    """
+    jobs = list(jobs)
+    if cache is None:
+        _dispatch(jobs, workers, report)
+    else:
+        stale, _ = cache.partition(jobs)
+        _dispatch([job for job, _ in stale], workers, report)
+        for job, key in stale:
+            cache.record(job, key)
+        cache.save()
+    return [job.output for job in jobs]
+
+
+def make_parser(description):
+    """Argument parser with the options shared by the visualizer scripts"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of render processes (default: all cores, 1 = serial)')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='re-render every artifact, even if it is up to date')
+    return instrumentation.add_arguments(parser)
+
+
+def add_template_arguments(parser):
+    """--template and --snapshots, for the snapshot scripts"""
+    parser.add_argument('--template', action='store_true',
+                        help='render each chart type from one template figure, redrawing '
+                             'only the data and title per snapshot')
+    parser.add_argument('--snapshots', type=int, default=None, metavar='N',
+                        help='with --template, N snapshots per chart spread over its range '
+                             '(default: the fixed snapshot lists)')
+    return parser
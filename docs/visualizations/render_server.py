@@ -0,0 +1,333 @@
+import argparse
+import importlib
+import io
+import json
+import os
+import socketserver
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import matplotlib
+
+import render_farm
+
+# Long-lived render service for single charts.
+#
+# A fixed pool of worker processes imports matplotlib and the model once,
+# then renders one warm-up snapshot of every chart so the font cache,
+# mathtext and the model's curve caches are hot. Requests are HTTP over
+# localhost TCP or a Unix socket:
+#
+#   GET /charts                              chart names and their parameters
+#   GET /render/<chart>?<param>=..&format=png&dpi=100
+#   GET /stats                               cache and pool counters
+#
+# Finished images are kept in a byte-bounded LRU, and identical requests that
+# arrive while one is rendering wait for that render instead of queueing
+# another. When every worker is busy and the queue is full, new requests get
+# 503 with Retry-After instead of piling up.
+
+DEFAULT_PORT = 8765
+CACHE_BYTES = 64 * 2**20
+FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml', 'pdf': 'application/pdf'}
+
+# A renderable chart: module and function names (resolved in the worker), the
+# single parameter it takes, its type and, for precomputed charts, the allowed
+# values. Snapshot functions take an output file object; plot_* functions
+# (svg=True) write an SVG into output_dir and take no parameter. dpi is False
+# for charts that fix their own resolution: the annotated snapshots save at
+# their DPI, which their cached formula boxes are rasterized for.
+Chart = namedtuple('Chart', ['module', 'func', 'param', 'type', 'choices', 'svg', 'dpi'])
+
+
+def _charts():
+    import annotated_visualizer
+    import static_visualizer
+    import tokenomics_visualizer
+
+    charts = {}
+    for suffix, module in (('', static_visualizer), ('_annotated', annotated_visualizer)):
+        name = module.__name__
+        dpi = module is static_visualizer
+        charts.update({
+            f'supply{suffix}': Chart(name, 'render_supply_snapshot', 'frame', int,
+                                     module.SUPPLY_SNAPSHOTS, False, dpi),
+            f'price_impact{suffix}': Chart(name, 'render_price_impact_snapshot',
+                                           'current_volume', float, None, False, dpi),
+            f'governance{suffix}': Chart(name, 'render_governance_snapshot', 'time', int,
+                                         module.GOVERNANCE_SNAPSHOTS, False, dpi),
+            f'transaction_rate{suffix}': Chart(name, 'render_transaction_rate_snapshot',
+                                               'current_hour', float, None, False, dpi),
+        })
+    for func in sorted(vars(tokenomics_visualizer)):
+        if func.startswith('plot_') and func != 'plot_governance_concentration':
+            charts[func] = Chart('tokenomics_visualizer', func, None, None, None, True, False)
+    return charts
+
+
+CHARTS = _charts()
+
+
+def parse_request(chart, query):
+    """Validate a render request; returns (chart, params, fmt, dpi) or raises ValueError"""
+    if chart not in CHARTS:
+        raise ValueError(f'unknown chart {chart!r}; GET /charts lists them')
+    spec = CHARTS[chart]
+    query = dict(query)
+    fmt = query.pop('format', 'svg' if spec.svg else 'png')
+    dpi = query.pop('dpi', None)
+    if fmt not in FORMATS:
+        raise ValueError(f'format must be one of {", ".join(FORMATS)}')
+    if spec.svg and fmt != 'svg':
+        raise ValueError(f'{chart} is only rendered as svg')
+    if dpi is not None:
+        if not spec.dpi:
+            raise ValueError(f'{chart} renders at a fixed resolution and takes no dpi')
+        dpi = int(dpi)
+        if not 10 <= dpi <= 600:
+            raise ValueError('dpi must be between 10 and 600')
+
+    params = {}
+    if spec.param is not None:
+        if spec.param not in query:
+            raise ValueError(f'{chart} needs ?{spec.param}=')
+        value = spec.type(query.pop(spec.param))
+        if spec.choices is not None and value not in spec.choices:
+            raise ValueError(f'{spec.param} must be one of {spec.choices}')
+        params[spec.param] = value
+    if query:
+        raise ValueError(f'unexpected parameters: {", ".join(sorted(query))}')
+    return chart, params, fmt, dpi
+
+
+def _warm():
+    """Worker initializer: headless backend, imports and one render of every snapshot chart"""
+    render_farm._init_worker()
+    for chart, spec in CHARTS.items():
+        if not spec.svg:
+            value = spec.choices[0] if spec.choices else spec.type(1)
+            render(chart, {spec.param: value}, 'png', 20 if spec.dpi else None)
+
+
+def render(chart, params, fmt, dpi):
+    """Render one chart in this process and return the image bytes"""
+    spec = CHARTS[chart]
+    module = importlib.import_module(spec.module)
+    func = getattr(module, spec.func)
+    if not spec.svg:
+        buffer = io.BytesIO()
+        # Snapshots save with plt.savefig(output); format and default dpi come from rc
+        with matplotlib.rc_context({'savefig.format': fmt, 'savefig.dpi': dpi or 'figure'}):
+            func(output=buffer, **params)
+        return buffer.getvalue()
+    # plot_* functions write into the module's output_dir; a worker renders one
+    # request at a time, so pointing it at a scratch directory is safe
+    with tempfile.TemporaryDirectory() as scratch:
+        previous, module.output_dir = module.output_dir, scratch
+        try:
+            func()
+        finally:
+            module.output_dir = previous
+        written, = os.listdir(scratch)
+        with open(os.path.join(scratch, written), 'rb') as f:
+            return f.read()
+
+
+class ResultCache:
+    """Thread-safe LRU of rendered images, bounded by total bytes"""
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            data = self.entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= len(self.entries.pop(key))
+            self.entries[key] = data
+            self.bytes += len(data)
+            while self.bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= len(evicted)
+
+
+class RenderService:
+    """Worker pool, result cache and in-flight de-duplication behind the HTTP handler"""
+
+    def __init__(self, workers=None, queue=None, cache_bytes=CACHE_BYTES):
+        self.workers = workers or render_farm.default_workers()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm)
+        # Requests rendering or waiting for a worker; beyond this, 503
+        self.slots = threading.BoundedSemaphore(self.workers + (queue if queue is not None
+                                                                 else 4 * self.workers))
+        self.cache = ResultCache(cache_bytes)
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.rendered = 0
+        self.rejected = 0
+
+    def warm(self):
+        """Block until every worker has started and finished its warm-up"""
+        list(self.pool.map(time.sleep, [0.1] * self.workers))
+
+    def get(self, chart, params, fmt, dpi):
+        """(image bytes, 'hit' | 'shared' | 'miss'), or None when the pool is saturated"""
+        key = (chart, tuple(sorted(params.items())), fmt, dpi)
+        data = self.cache.get(key)
+        if data is not None:
+            return data, 'hit'
+        with self.lock:
+            future = self.inflight.get(key)
+            shared = future is not None
+            if not shared:
+                if not self.slots.acquire(blocking=False):
+                    self.rejected += 1
+                    return None
+                future = self.pool.submit(render, chart, params, fmt, dpi)
+                self.inflight[key] = future
+        if shared:
+            return future.result(), 'shared'
+        try:
+            data = future.result()
+            self.cache.put(key, data)
+            self.rendered += 1
+            return data, 'miss'
+        finally:
+            with self.lock:
+                del self.inflight[key]
+            self.slots.release()
+
+    def stats(self):
+        return {'workers': self.workers, 'rendered': self.rendered, 'rejected': self.rejected,
+                'rendering': len(self.inflight), 'cache_hits': self.cache.hits,
+                'cache_misses': self.cache.misses, 'cache_entries': len(self.cache.entries),
+                'cache_bytes': self.cache.bytes}
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    server_version = 'MemePiRender/1'
+
+    def _send(self, status, body, content_type='application/json', headers=()):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        service = self.server.service
+        if parts == ['charts']:
+            return self._send(200, {name: {'param': spec.param, 'choices': spec.choices,
+                                           'formats': ['svg'] if spec.svg else list(FORMATS),
+                                           'dpi': spec.dpi}
+                                    for name, spec in CHARTS.items()})
+        if parts == ['stats']:
+            return self._send(200, service.stats())
+        if len(parts) != 2 or parts[0] != 'render':
+            return self._send(404, {'error': 'use /charts, /stats or /render/<chart>'})
+        try:
+            chart, params, fmt, dpi = parse_request(
+                parts[1], urllib.parse.parse_qsl(url.query))
+        except ValueError as error:
+            return self._send(400, {'error': str(error)})
+
+        start = time.perf_counter()
+        try:
+            result = service.get(chart, params, fmt, dpi)
+        except Exception as error:  # a failed render must not take the server down
+            return self._send(500, {'error': f'{type(error).__name__}: {error}'})
+        if result is None:
+            return self._send(503, {'error': 'all render workers are busy'},
+                              headers=[('Retry-After', '1')])
+        data, cache = result
+        self._send(200, data, FORMATS[fmt], [
+            ('X-Render-Cache', cache),
+            ('X-Render-Time', f'{time.perf_counter() - start:.4f}'),
+            ('Cache-Control', 'no-cache'),
+        ])
+
+    def address_string(self):
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(service, host='127.0.0.1', port=DEFAULT_PORT, unix=None, verbose=False):
+    """Serve until interrupted; returns the server after shutdown"""
+    if unix:
+        if os.path.exists(unix):
+            os.unlink(unix)
+        server = UnixHTTPServer(unix, RenderHandler)
+        where = f'unix:{unix}'
+    else:
+        server = ThreadingHTTPServer((host, port), RenderHandler)
+        where = f'http://{host}:{server.server_address[1]}'
+    server.service = service
+    server.verbose = verbose
+    print(f'render service on {where} with {service.workers} warm worker(s)', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if unix and os.path.exists(unix):
+            os.unlink(unix)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve warm, cached chart renders over HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', help='listen on this Unix socket instead of TCP')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='render processes (default: all cores)')
+    parser.add_argument('--queue', type=int, default=None,
+                        help='requests allowed to wait for a worker (default: 4 per worker)')
+    parser.add_argument('--cache-mb', type=float, default=CACHE_BYTES / 2**20)
+    parser.add_argument('-v', '--verbose', action='store_true', help='log every request')
+    args = parser.parse_args()
+
+    service = RenderService(args.workers, args.queue, int(args.cache_mb * 2**20))
+    start = time.perf_counter()
+    service.warm()
+    print(f'workers warmed in {time.perf_counter() - start:.1f}s')
+    serve(service, args.host, args.port, args.unix, args.verbose)
@@ -0,0 +1,283 @@
+import argparse
+import time
+
+import numpy as np
+
+# Replay of MemePiStaking stake / withdraw / claim streams.
+#
+# pendingRewards = staked * rewardRatePerTokenPerSecond * (now - lastUpdate) / 1e18,
+# using the rate in force when the rewards are settled. Every stake,
+# withdraw and successful claim pays that out and resets lastUpdate; a
+# stake adds to lifetimeStaked and mints one NFT for every threshold
+# lifetimeStaked has reached (the contract does not remember minted tiers).
+#
+# Per-user state is kept as parallel arrays indexed by user id. Events are
+# processed in chunks of consecutive events, grouped by user, with running
+# stakes as segmented prefix sums and NFT tiers found by searchsorted over
+# the thresholds (see _Pool.apply). Amounts are float64 tokens, so the
+# contract's wei truncation is not modelled.
+
+STAKE, WITHDRAW, CLAIM = 0, 1, 2
+KIND_NAMES = ('stake', 'withdraw', 'claim')
+NFT_THRESHOLDS = (1_000, 10_000, 100_000)  # tokens (the constructor's 1k/10k/100k ether)
+REWARD_RATE = 10**9  # wei per token per second, about 3.15% a year
+WEI_PER_TOKEN = 1e18
+
+
+class StakerState:
+    """Struct-of-arrays UserInfo for every user id"""
+
+    def __init__(self, num_users):
+        self.staked = np.zeros(num_users)
+        self.last_update = np.zeros(num_users, dtype=np.int64)
+        self.lifetime = np.zeros(num_users)
+        self.rewards = np.zeros(num_users)  # total paid out
+        self.tier = np.zeros(num_users, dtype=np.int64)  # thresholds reached
+
+
+class StakingTrace:
+    """Pool totals recorded at the end of each chunk, plus the final user state"""
+
+    def __init__(self, times, total_staked, rewards_paid, accrued, tier_users, state,
+                 nft_mints, reverts, thresholds):
+        self.times = times
+        self.total_staked = total_staked
+        self.rewards_paid = rewards_paid
+        self.accrued = accrued  # pending but unclaimed, at the current rate
+        self.tier_users = tier_users  # (len(thresholds), points): users at or above each tier
+        self.state = state
+        self.nft_mints = nft_mints
+        self.reverts = reverts  # {kind name: reverted events}
+        self.thresholds = thresholds
+
+
+def rate_schedule(times, rate_times, rates, initial_rate):
+    """Reward rate in force at each event time (a change applies from its own timestamp)"""
+    if len(rate_times) == 0:
+        return np.full(len(times), float(initial_rate))
+    schedule = np.concatenate([[initial_rate], rates]).astype(float)
+    return schedule[np.searchsorted(rate_times, times, side='right')]
+
+
+def _segments(users):
+    """Stable order grouping events by user, with the start of every group"""
+    order = np.argsort(users, kind='stable')
+    grouped = users[order]
+    first = np.concatenate([[True], grouped[1:] != grouped[:-1]])
+    return order, first, np.cumsum(first) - 1
+
+
+class _Pool:
+    """Pool-wide running totals alongside the per-user arrays"""
+
+    def __init__(self, num_users, num_tiers):
+        self.state = StakerState(num_users)
+        self.total_staked = 0.0
+        self.paid = 0.0
+        self.weighted_update = 0.0  # sum(staked * last_update), for the pool-wide accrual
+        self.nft_mints = 0
+        self.reverts = np.zeros(3, dtype=np.int64)
+        self.tier_totals = np.zeros(num_tiers + 1, dtype=np.int64)  # users at each tier
+        self.tier_totals[0] = num_users
+
+    def apply(self, events, times, users, kinds, amounts, rates, thresholds):
+        """Apply a time-ordered batch of events, all later than the current state.
+
+        Every user's events are first replayed as if none reverted: the stake
+        before each event is a segmented prefix sum and lastUpdate is the
+        previous event's time. Each user's events before their first revert
+        are therefore exact and get committed; the reverted event is dropped
+        and whatever follows it goes round again. The loop runs once more
+        than the largest number of reverts any one user has in the batch.
+        """
+        state = self.state
+        while len(events):
+            order, first, group = _segments(users[events])
+            e = events[order]
+            u, t, kind, amount = users[e], times[e], kinds[e], amounts[e]
+            stake, withdraw = kind == STAKE, kind == WITHDRAW
+            delta = np.where(stake, amount, np.where(withdraw, -amount, 0.0))
+
+            running = np.cumsum(delta) - delta
+            staked = state.staked[u] + running - running[first][group]
+            previous = np.where(first, state.last_update[u], np.roll(t, 1))
+            pending = staked * rates[e] * (t - previous) / WEI_PER_TOKEN
+            ok = np.where(stake, amount > 0,
+                          np.where(withdraw, (amount > 0) & (staked >= amount), pending > 0))
+
+            # Commit each user's events up to (not including) the first revert
+            bad = np.flatnonzero(~ok)
+            cut = np.full(group[-1] + 1, len(e))
+            np.minimum.at(cut, group[bad], bad)
+            keep = np.arange(len(e)) < cut[group]
+            self.reverts += np.bincount(kind[cut[cut < len(e)]], minlength=3)
+
+            self._commit(u[keep], t[keep], stake[keep], delta[keep], staked[keep],
+                         pending[keep], first[keep], thresholds)
+            retry = np.arange(len(e)) > cut[group]
+            events = np.sort(e[retry])
+
+    def _commit(self, u, t, stake, delta, staked, pending, first, thresholds):
+        if len(u) == 0:
+            return
+        state = self.state
+        last = np.append(np.flatnonzero(first)[1:], len(u)) - 1
+        users = u[last]
+        new_staked = staked[last] + delta[last]
+        self.weighted_update += (new_staked * t[last]
+                                 - state.staked[users] * state.last_update[users]).sum()
+        self.total_staked += delta.sum()
+        self.paid += pending.sum()
+        np.add.at(state.rewards, u, pending)
+        state.staked[users] = new_staked
+        state.last_update[users] = t[last]
+
+        if stake.any():
+            su = u[stake]
+            lifetime = state.lifetime[su] + _segment_cumsum(delta[stake], su)
+            reached = np.searchsorted(thresholds, lifetime, side='right')
+            self.nft_mints += int(reached.sum())
+            # Lifetime only grows, so a user's last stake has their highest tier
+            ends = np.append(np.flatnonzero(su[1:] != su[:-1]), len(su) - 1)
+            staker, tier = su[ends], reached[ends]
+            state.lifetime[staker] = lifetime[ends]
+            crossed = tier > state.tier[staker]
+            np.subtract.at(self.tier_totals, state.tier[staker][crossed], 1)
+            np.add.at(self.tier_totals, tier[crossed], 1)
+            state.tier[staker] = np.maximum(state.tier[staker], tier)
+
+    def accrued(self, now, rate):
+        """Pending rewards across all users at time `now` and the given rate"""
+        return rate * (now * self.total_staked - self.weighted_update) / WEI_PER_TOKEN
+
+    def tier_users(self):
+        """Users at or above each threshold"""
+        return np.cumsum(self.tier_totals[::-1])[::-1][1:]
+
+
+def _segment_cumsum(values, keys):
+    """Inclusive cumulative sum restarting wherever keys (grouped) change"""
+    total = np.cumsum(values)
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    offsets = np.repeat((total - values)[starts], np.diff(np.append(starts, len(keys))))
+    return total - offsets
+
+
+def simulate(times, users, kinds, amounts, num_users=None, thresholds=NFT_THRESHOLDS,
+             reward_rate=REWARD_RATE, rate_times=(), rates=(), record_points=500):
+    """Replay a time-ordered event stream.
+
+    times (unix seconds), users (ids from 0), kinds (STAKE/WITHDRAW/CLAIM)
+    and amounts (tokens, ignored for claims) are parallel arrays. Rate
+    changes are (rate_times, rates) in wei per token per second. Totals
+    are recorded after every len(times) / record_points events.
+    """
+    times = np.asarray(times, dtype=np.int64)
+    users = np.asarray(users, dtype=np.int64)
+    kinds = np.asarray(kinds, dtype=np.int8)
+    amounts = np.asarray(amounts, dtype=float)
+    thresholds = np.asarray(thresholds, dtype=float)
+    rate_times = np.asarray(rate_times, dtype=np.int64)
+    n = len(times)
+    if num_users is None:
+        num_users = int(users.max(initial=-1)) + 1
+    event_rates = rate_schedule(times, rate_times, rates, reward_rate)
+
+    pool = _Pool(num_users, len(thresholds))
+    chunk = max(1, -(-n // record_points))
+    points = -(-n // chunk)
+    recorded_times = np.empty(points, dtype=np.int64)
+    staked, paid, accrued = np.empty(points), np.empty(points), np.empty(points)
+    tier_users = np.empty((len(thresholds), points), dtype=np.int64)
+    for p, start in enumerate(range(0, n, chunk)):
+        stop = min(start + chunk, n)
+        pool.apply(np.arange(start, stop), times, users, kinds, amounts, event_rates,
+                   thresholds)
+        recorded_times[p] = times[stop - 1]
+        staked[p], paid[p] = pool.total_staked, pool.paid
+        accrued[p] = pool.accrued(times[stop - 1], event_rates[stop - 1])
+        tier_users[:, p] = pool.tier_users()
+
+    return StakingTrace(recorded_times, staked, paid, accrued, tier_users, pool.state,
+                        pool.nft_mints, dict(zip(KIND_NAMES, pool.reverts.tolist())),
+                        thresholds)
+
+
+def simulate_reference(times, users, kinds, amounts, thresholds=NFT_THRESHOLDS,
+                       reward_rate=REWARD_RATE, rate_times=(), rates=()):
+    """Event-by-event Python replay, used to check simulate()"""
+    rates = list(rates)
+    rate_times = list(rate_times)
+    accounts = {}
+    paid, mints, next_rate = 0.0, 0, 0
+    rate = float(reward_rate)
+    for t, user, kind, amount in zip(times, users, kinds, amounts):
+        while next_rate < len(rate_times) and rate_times[next_rate] <= t:
+            rate = float(rates[next_rate])
+            next_rate += 1
+        info = accounts.setdefault(user, {'staked': 0.0, 'last': 0, 'lifetime': 0.0,
+                                          'rewards': 0.0})
+        pending = info['staked'] * rate * (t - info['last']) / WEI_PER_TOKEN
+        if kind == STAKE and amount > 0:
+            info['staked'] += amount
+            info['lifetime'] += amount
+            mints += sum(info['lifetime'] >= level for level in thresholds)
+        elif kind == WITHDRAW and 0 < amount <= info['staked']:
+            info['staked'] -= amount
+        elif not (kind == CLAIM and pending > 0):
+            continue
+        info['rewards'] += pending
+        paid += pending
+        info['last'] = t
+    return accounts, paid, mints
+
+
+def synthetic_events(n, num_users=300_000, seed=0, start_time=1_700_000_000,
+                     duration=365 * 86400):
+    """Random stream: about 50% stakes, 20% withdrawals, 30% claims over a year"""
+    rng = np.random.default_rng(seed)
+    times = start_time + np.sort(rng.integers(0, duration, n))
+    # Zipf-like activity: a few users act far more often than most
+    users = np.minimum(rng.pareto(1.1, n) * num_users / 50, num_users - 1).astype(np.int64)
+    kinds = rng.choice(3, n, p=[0.5, 0.2, 0.3]).astype(np.int8)
+    amounts = np.where(kinds == STAKE, rng.lognormal(6, 1.5, n), rng.lognormal(5, 1.5, n))
+    return times, users, kinds, amounts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='MemePiStaking reward and NFT tier replay')
+    parser.add_argument('-n', '--events', type=int, default=5_000_000)
+    parser.add_argument('--users', type=int, default=300_000)
+    parser.add_argument('--check', type=int, default=50_000,
+                        help='events to verify against the per-event Python loop')
+    args = parser.parse_args()
+
+    times, users, kinds, amounts = synthetic_events(args.events, args.users)
+    # Halve the rate a quarter of the way through
+    rate_times, rates = [times[len(times) // 4]], [REWARD_RATE // 2]
+
+    m = min(args.check, args.events)
+    start = time.perf_counter()
+    accounts, paid, mints = simulate_reference(times[:m].tolist(), users[:m].tolist(),
+                                               kinds[:m].tolist(), amounts[:m].tolist(),
+                                               rate_times=rate_times, rates=rates)
+    reference_rate = m / (time.perf_counter() - start)
+    trace = simulate(times[:m], users[:m], kinds[:m], amounts[:m], args.users,
+                     rate_times=rate_times, rates=rates)
+    assert trace.nft_mints == mints, 'NFT mint count differs from reference'
+    assert np.isclose(trace.rewards_paid[-1], paid, rtol=1e-9), 'rewards differ from reference'
+    ids = np.fromiter(accounts, dtype=np.int64)
+    assert np.allclose(trace.state.staked[ids], [accounts[i]['staked'] for i in ids.tolist()])
+    assert np.allclose(trace.state.rewards[ids], [accounts[i]['rewards'] for i in ids.tolist()])
+
+    start = time.perf_counter()
+    trace = simulate(times, users, kinds, amounts, args.users,
+                     rate_times=rate_times, rates=rates)
+    elapsed = time.perf_counter() - start
+    print(f'{args.events:,} events for {args.users:,} users in {elapsed:.2f}s '
+          f'({args.events / elapsed:,.0f} events/s, Python loop: {reference_rate:,.0f} events/s)')
+    print(f'staked {trace.total_staked[-1]:,.0f}, rewards paid {trace.rewards_paid[-1]:,.0f}, '
+          f'accrued {trace.accrued[-1]:,.0f} tokens')
+    print(f'NFT mints {trace.nft_mints:,}; reverted {trace.reverts}')
+    for level, count in zip(NFT_THRESHOLDS, trace.tier_users[:, -1]):
+        print(f'  users past {level:>7,} lifetime staked: {count:,}')
@@ -3,139 +3,378 @@ import matplotlib.pyplot as plt
 from matplotlib.ticker import FuncFormatter
 import os
 
+import animation_engine
+import artifact_cache
+import instrumentation
+import render_farm
+import responsive_images
+import tokenomics_model as model
+from animation_engine import Scene, StackedBands
+
 # Create output directory if it doesn't exist
 output_dir = os.path.dirname(os.path.abspath(__file__))
 os.makedirs(output_dir, exist_ok=True)
 
+SUPPLY_SNAPSHOTS = [0, 250, 500, 750, 1000]
+IMPACT_SNAPSHOTS = [0, 1, 2, 3, 4]
+GOVERNANCE_SNAPSHOTS = list(model.HOLDING_TIMES)  # days
+RATE_SNAPSHOTS = [6, 12, 18, 24]  # hours
+# Ranges sampled when template mode is asked for more snapshots: (low, high, decimals)
+SNAPSHOT_RANGES = {
+    'supply': (0, 1000, 0),
+    'price_impact': (0, 4, 2),
+    'governance': (30, 365, 0),
+    'transaction_rate': (1, 24, 2),
+}
+
 def format_billions(x, pos):
     """Format large numbers in billions"""
     return f'{x/1e9:.1f}B'
 
-def create_supply_snapshots():
+def save_figure(fig, output, responsive=()):
+    """Save and close a snapshot, plus srcset variants in the formats listed in responsive"""
+    if responsive:
+        responsive_images.save(fig, output, formats=responsive)
+    else:
+        plt.savefig(output)
+    plt.close(fig)
+
+def render_supply_snapshot(frame, output, responsive=()):
+    """Render one supply dynamics snapshot"""
+    # One broadcasted evaluation covers every snapshot
+    transactions, supply_grid = model.supply_curves(
+        [f / 1000 for f in SUPPLY_SNAPSHOTS], num_points=100)
+    _, burned_grid = model.burned_curves(
+        [f / 1000 for f in SUPPLY_SNAPSHOTS], num_points=100)
+    i = SUPPLY_SNAPSHOTS.index(frame)
+
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 12))
+
+    supply = supply_grid[0, i]
+    burned = burned_grid[0, i]
+
+    # Plot supply curve
+    ax1.plot(transactions, supply, 'b-', linewidth=2)
+    ax1.set_title(f'MemePi Supply Dynamics (Transaction Period: {frame})')
+    ax1.set_xlabel('Number of Transactions (thousands)')
+    ax1.set_ylabel('Total Supply')
+    ax1.yaxis.set_major_formatter(FuncFormatter(format_billions))
+    ax1.grid(True, alpha=0.3)
+
+    # Plot distribution
+    ax2.stackplot(transactions, [supply, burned],
+                 labels=['Remaining Supply', 'Burned Tokens'],
+                 colors=['#2ecc71', '#e74c3c'])
+    ax2.set_title('Token Distribution')
+    ax2.set_xlabel('Number of Transactions (thousands)')
+    ax2.set_ylabel('Token Amount')
+    ax2.yaxis.set_major_formatter(FuncFormatter(format_billions))
+    ax2.grid(True, alpha=0.3)
+    ax2.legend()
+
+    plt.tight_layout()
+    save_figure(fig, output, responsive)
+
+def render_price_impact_snapshot(current_volume, output, responsive=()):
+    """Render one price impact snapshot"""
+    volume_to_liquidity, impact = model.impact_curves()
+    impact = impact[0]
+    current_impact = model.price_impact(float(current_volume))
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+
+    # Plot full curve
+    ax.plot(volume_to_liquidity, impact, 'r-', linewidth=2, alpha=0.3)
+
+    # Plot current point
+    ax.plot(current_volume, current_impact, 'bo', markersize=10)
+
+    # Add reference line
+    ax.axhline(y=np.pi/2, color='g', linestyle='--', alpha=0.5,
+              label='Maximum Impact (π/2)')
+
+    ax.set_title(f'MemePi Price Impact Model (Volume/Liquidity: {current_volume})')
+    ax.set_xlabel('Transaction Volume / Liquidity Pool Size')
+    ax.set_ylabel('Price Impact')
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+
+    save_figure(fig, output, responsive)
+
+def render_governance_snapshot(time, output, responsive=()):
+    """Render one governance weight snapshot"""
+    balances, weights = model.governance_curves(GOVERNANCE_SNAPSHOTS)
+    weight = weights[GOVERNANCE_SNAPSHOTS.index(time)]
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+
+    ax.plot(balances, weight, 'b-', linewidth=2)
+    ax.set_title(f'MemePi Governance Weight (Holding Time: {time} days)')
+    ax.set_xlabel('Token Balance')
+    ax.set_ylabel('Voting Power')
+    ax.grid(True, alpha=0.3)
+
+    save_figure(fig, output, responsive)
+
+def render_transaction_rate_snapshot(current_hour, output, responsive=()):
+    """Render one transaction rate snapshot"""
+    hours, tx_limit = model.rate_curves()
+    tx_limit = tx_limit[0]
+    current_limit = model.transaction_limit(current_hour)
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+
+    # Plot full curve and current point
+    ax.plot(hours, tx_limit, 'b-', linewidth=2, alpha=0.3)
+    ax.plot(current_hour, current_limit, 'ro', markersize=10)
+
+    ax.set_title(f'MemePi Transaction Rate (Hour: {current_hour})')
+    ax.set_xlabel('Time (hours)')
+    ax.set_ylabel('Cumulative Transactions Allowed')
+    ax.grid(True, alpha=0.3)
+
+    save_figure(fig, output, responsive)
+
+# Template mode: each chart type's scaffolding (axes, formatters, grids,
+# legends, reference lines, background curves) is built and rasterized once,
+# and every snapshot only redraws the artists that differ (data and title).
+# All snapshots of a series share axis limits. annotate(*axes) may add
+# overlays and returns those that must stay above the data.
+
+def _share_limits(ax, x, ys):
+    """Autoscale once over every snapshot's data"""
+    ax.update_datalim(np.column_stack([[np.min(x), np.max(x)], [np.min(ys), np.max(ys)]]))
+    ax.autoscale_view()
+
+def supply_template(frames, figsize=(10, 12), annotate=None):
+    """Supply snapshot scaffolding; frame i of the scene shows frames[i]"""
+    periods = [f / 1000 for f in frames]
+    transactions, supply = model.supply_curves(periods, num_points=100)
+    _, burned = model.burned_curves(periods, num_points=100)
+    layers = np.stack([supply[0], burned[0]])  # (2, snapshots, points)
+
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=figsize)
+    line, = ax1.plot(transactions, supply[0, 0], 'b-', linewidth=2)
+    _share_limits(ax1, transactions, supply)
+    title = ax1.set_title('')
+    ax1.set_xlabel('Number of Transactions (thousands)')
+    ax1.set_ylabel('Total Supply')
+    bands = StackedBands(ax2, transactions, labels=['Remaining Supply', 'Burned Tokens'],
+                         colors=['#2ecc71', '#e74c3c'])
+    _share_limits(ax2, transactions, [0, layers.sum(axis=0).max()])
+    ax2.set_title('Token Distribution')
+    ax2.set_xlabel('Number of Transactions (thousands)')
+    ax2.set_ylabel('Token Amount')
+    for ax in (ax1, ax2):
+        ax.yaxis.set_major_formatter(FuncFormatter(format_billions))
+        ax.grid(True, alpha=0.3)
+    legend = ax2.legend()
+    overlays = annotate(ax1, ax2) if annotate is not None else []
+
+    def update(i):
+        line.set_ydata(supply[0, i])
+        bands.update(layers[:, i])
+        title.set_text(f'MemePi Supply Dynamics (Transaction Period: {frames[i]})')
+
+    update(0)
+    fig.tight_layout()
+    return Scene(fig, [line, title] + bands.polygons + [legend] + overlays, update,
+                 range(len(frames)))
+
+def price_impact_template(volumes, figsize=(10, 6), annotate=None):
+    """Price impact snapshot scaffolding; frame i marks volumes[i] on the curve"""
+    volume_to_liquidity, impact = model.impact_curves()
+    impacts = model.price_impact(np.asarray(volumes, dtype=float))
+
+    fig, ax = plt.subplots(figsize=figsize)
+    ax.plot(volume_to_liquidity, impact[0], 'r-', linewidth=2, alpha=0.3)
+    point, = ax.plot(volumes[:1], impacts[:1], 'bo', markersize=10)
+    _share_limits(ax, volumes, impacts)
+    ax.axhline(y=np.pi/2, color='g', linestyle='--', alpha=0.5,
+               label='Maximum Impact (π/2)')
+    title = ax.set_title('')
+    ax.set_xlabel('Transaction Volume / Liquidity Pool Size')
+    ax.set_ylabel('Price Impact')
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+    overlays = annotate(ax) if annotate is not None else []
+
+    def update(i):
+        point.set_data(volumes[i:i + 1], impacts[i:i + 1])
+        title.set_text(f'MemePi Price Impact Model (Volume/Liquidity: {volumes[i]})')
+
+    update(0)
+    return Scene(fig, [point, title] + overlays, update, range(len(volumes)))
+
+def governance_template(times, figsize=(10, 6), annotate=None):
+    """Governance weight snapshot scaffolding; frame i is holding time times[i]"""
+    balances, weights = model.governance_curves(times)
+
+    fig, ax = plt.subplots(figsize=figsize)
+    line, = ax.plot(balances, weights[0], 'b-', linewidth=2)
+    _share_limits(ax, balances, weights)
+    title = ax.set_title('')
+    ax.set_xlabel('Token Balance')
+    ax.set_ylabel('Voting Power')
+    ax.grid(True, alpha=0.3)
+    overlays = annotate(ax) if annotate is not None else []
+
+    def update(i):
+        line.set_ydata(weights[i])
+        title.set_text(f'MemePi Governance Weight (Holding Time: {times[i]} days)')
+
+    update(0)
+    return Scene(fig, [line, title] + overlays, update, range(len(times)))
+
+def transaction_rate_template(current_hours, figsize=(10, 6), annotate=None):
+    """Transaction rate snapshot scaffolding; frame i marks current_hours[i]"""
+    hours, tx_limit = model.rate_curves()
+    limits = model.transaction_limit(np.asarray(current_hours, dtype=float))
+
+    fig, ax = plt.subplots(figsize=figsize)
+    ax.plot(hours, tx_limit[0], 'b-', linewidth=2, alpha=0.3)
+    point, = ax.plot(current_hours[:1], limits[:1], 'ro', markersize=10)
+    _share_limits(ax, current_hours, limits)
+    title = ax.set_title('')
+    ax.set_xlabel('Time (hours)')
+    ax.set_ylabel('Cumulative Transactions Allowed')
+    ax.grid(True, alpha=0.3)
+    overlays = annotate(ax) if annotate is not None else []
+
+    def update(i):
+        point.set_data(current_hours[i:i + 1], limits[i:i + 1])
+        title.set_text(f'MemePi Transaction Rate (Hour: {current_hours[i]})')
+
+    update(0)
+    return Scene(fig, [point, title] + overlays, update, range(len(current_hours)))
+
+def save_snapshots(scene, output, values, dpi=None, tight=False, responsive=()):
+    """Write frame i of a template scene to output.format(values[i])"""
+    crop = animation_engine.tight_crop(scene, dpi) if tight else None
+    animation_engine.save_stills(scene, [output.format(v) for v in values], dpi, crop,
+                                 responsive_images.writer(responsive) if responsive else None)
+    plt.close(scene.fig)
+
+def snapshot_values(chart, num_snapshots=None):
+    """The snapshot list of a chart, or num_snapshots values spread over its range"""
+    if num_snapshots is None:
+        return {'supply': SUPPLY_SNAPSHOTS, 'price_impact': IMPACT_SNAPSHOTS,
+                'governance': GOVERNANCE_SNAPSHOTS, 'transaction_rate': RATE_SNAPSHOTS}[chart]
+    low, high, decimals = SNAPSHOT_RANGES[chart]
+    values = np.round(np.linspace(low, high, num_snapshots), decimals)
+    return [int(v) for v in values] if decimals == 0 else values.tolist()
+
+def render_supply_templates(output, values, responsive=()):
+    save_snapshots(supply_template(values), output, values, responsive=responsive)
+
+def render_price_impact_templates(output, values, responsive=()):
+    save_snapshots(price_impact_template(values), output, values, responsive=responsive)
+
+def render_governance_templates(output, values, responsive=()):
+    save_snapshots(governance_template(values), output, values, responsive=responsive)
+
+def render_transaction_rate_templates(output, values, responsive=()):
+    save_snapshots(transaction_rate_template(values), output, values, responsive=responsive)
+
+TEMPLATE_RENDERERS = {
+    'supply': (render_supply_templates, 'supply_snapshot_{}.png'),
+    'price_impact': (render_price_impact_templates, 'price_impact_{}.png'),
+    'governance': (render_governance_templates, 'governance_weight_{}.png'),
+    'transaction_rate': (render_transaction_rate_templates, 'transaction_rate_{}.png'),
+}
+
+def template_job(chart, num_snapshots=None, responsive=()):
+    """One job rendering a chart's whole snapshot series from its template"""
+    render, pattern = TEMPLATE_RENDERERS[chart]
+    return render_farm.make_job(render, os.path.join(output_dir, pattern),
+                                values=snapshot_values(chart, num_snapshots),
+                                responsive=responsive)
+
+def supply_snapshot_jobs(responsive=()):
+    """Render jobs for the supply snapshots"""
+    return [render_farm.make_job(render_supply_snapshot,
+                                 os.path.join(output_dir, f'supply_snapshot_{frame}.png'),
+                                 frame=frame, responsive=responsive)
+            for frame in SUPPLY_SNAPSHOTS]
+
+def price_impact_snapshot_jobs(responsive=()):
+    """Render jobs for the price impact snapshots"""
+    return [render_farm.make_job(render_price_impact_snapshot,
+                                 os.path.join(output_dir, f'price_impact_{volume}.png'),
+                                 current_volume=volume, responsive=responsive)
+            for volume in IMPACT_SNAPSHOTS]
+
+def governance_snapshot_jobs(responsive=()):
+    """Render jobs for the governance weight snapshots"""
+    return [render_farm.make_job(render_governance_snapshot,
+                                 os.path.join(output_dir, f'governance_weight_{time}.png'),
+                                 time=time, responsive=responsive)
+            for time in GOVERNANCE_SNAPSHOTS]
+
+def transaction_rate_snapshot_jobs(responsive=()):
+    """Render jobs for the transaction rate snapshots"""
+    return [render_farm.make_job(render_transaction_rate_snapshot,
+                                 os.path.join(output_dir, f'transaction_rate_{hour}.png'),
+                                 current_hour=hour, responsive=responsive)
+            for hour in RATE_SNAPSHOTS]
+
+def create_supply_snapshots(workers=1, template=False, num_snapshots=None):
     """Create snapshots of supply dynamics at different points"""
-    initial_supply = 314159265359
-    burn_rate = 0.02
-    
-    # Create snapshots at different points
-    snapshots = [0, 250, 500, 750, 1000]
-    for frame in snapshots:
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 12))
-        
-        transactions = np.linspace(0, 1000, 100)
-        supply = initial_supply * (1 - burn_rate) ** (transactions * frame/1000)
-        burned = initial_supply - supply
-        
-        # Plot supply curve
-        ax1.plot(transactions, supply, 'b-', linewidth=2)
-        ax1.set_title(f'MemePi Supply Dynamics (Transaction Period: {frame})')
-        ax1.set_xlabel('Number of Transactions (thousands)')
-        ax1.set_ylabel('Total Supply')
-        ax1.yaxis.set_major_formatter(FuncFormatter(format_billions))
-        ax1.grid(True, alpha=0.3)
-        
-        # Plot distribution
-        ax2.stackplot(transactions, [supply, burned],
-                     labels=['Remaining Supply', 'Burned Tokens'],
-                     colors=['#2ecc71', '#e74c3c'])
-        ax2.set_title('Token Distribution')
-        ax2.set_xlabel('Number of Transactions (thousands)')
-        ax2.set_ylabel('Token Amount')
-        ax2.yaxis.set_major_formatter(FuncFormatter(format_billions))
-        ax2.grid(True, alpha=0.3)
-        ax2.legend()
-        
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, f'supply_snapshot_{frame}.png'))
-        plt.close()
-
-def create_price_impact_snapshots():
+    if template:
+        return render_farm.render([template_job('supply', num_snapshots)], workers)
+    return render_farm.render(supply_snapshot_jobs(), workers)
+
+def create_price_impact_snapshots(workers=1, template=False, num_snapshots=None):
     """Create snapshots of price impact at different points"""
-    snapshots = [0, 1, 2, 3, 4]
-    volume_to_liquidity = np.linspace(0, 5, 1000)
-    k = np.pi/2
-    impact = k * np.arctan(volume_to_liquidity)
-    
-    for current_volume in snapshots:
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        # Plot full curve
-        ax.plot(volume_to_liquidity, impact, 'r-', linewidth=2, alpha=0.3)
-        
-        # Plot current point
-        current_impact = k * np.arctan(current_volume)
-        ax.plot(current_volume, current_impact, 'bo', markersize=10)
-        
-        # Add reference line
-        ax.axhline(y=np.pi/2, color='g', linestyle='--', alpha=0.5,
-                  label='Maximum Impact (π/2)')
-        
-        ax.set_title(f'MemePi Price Impact Model (Volume/Liquidity: {current_volume})')
-        ax.set_xlabel('Transaction Volume / Liquidity Pool Size')
-        ax.set_ylabel('Price Impact')
-        ax.grid(True, alpha=0.3)
-        ax.legend()
-        
-        plt.savefig(os.path.join(output_dir, f'price_impact_{current_volume}.png'))
-        plt.close()
+    if template:
+        return render_farm.render([template_job('price_impact', num_snapshots)], workers)
+    return render_farm.render(price_impact_snapshot_jobs(), workers)
 
-def create_governance_snapshots():
+def create_governance_snapshots(workers=1, template=False, num_snapshots=None):
     """Create snapshots of governance weight at different holding times"""
-    balances = np.linspace(0, 1000000, 1000)
-    holding_times = [30, 90, 180, 365]  # days
-    
-    for time in holding_times:
-        fig, ax = plt.subplots(figsize=(10, 6))
-        weight = balances * np.sqrt(time/np.pi)
-        
-        ax.plot(balances, weight, 'b-', linewidth=2)
-        ax.set_title(f'MemePi Governance Weight (Holding Time: {time} days)')
-        ax.set_xlabel('Token Balance')
-        ax.set_ylabel('Voting Power')
-        ax.grid(True, alpha=0.3)
-        
-        plt.savefig(os.path.join(output_dir, f'governance_weight_{time}.png'))
-        plt.close()
+    if template:
+        return render_farm.render([template_job('governance', num_snapshots)], workers)
+    return render_farm.render(governance_snapshot_jobs(), workers)
 
-def create_transaction_rate_snapshots():
+def create_transaction_rate_snapshots(workers=1, template=False, num_snapshots=None):
     """Create snapshots of transaction rate limits at different hours"""
-    hours = np.linspace(0, 24, 1000)
-    max_tx_per_hour = 11.46
-    snapshots = [6, 12, 18, 24]  # hours
-    
-    for current_hour in snapshots:
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        # Calculate limits
-        tx_limit = np.minimum(hours * max_tx_per_hour,
-                            hours * 0 + 24 * max_tx_per_hour)
-        current_limit = min(current_hour * max_tx_per_hour,
-                          24 * max_tx_per_hour)
-        
-        # Plot full curve and current point
-        ax.plot(hours, tx_limit, 'b-', linewidth=2, alpha=0.3)
-        ax.plot(current_hour, current_limit, 'ro', markersize=10)
-        
-        ax.set_title(f'MemePi Transaction Rate (Hour: {current_hour})')
-        ax.set_xlabel('Time (hours)')
-        ax.set_ylabel('Cumulative Transactions Allowed')
-        ax.grid(True, alpha=0.3)
-        
-        plt.savefig(os.path.join(output_dir, f'transaction_rate_{current_hour}.png'))
-        plt.close()
+    if template:
+        return render_farm.render([template_job('transaction_rate', num_snapshots)], workers)
+    return render_farm.render(transaction_rate_snapshot_jobs(), workers)
+
+def all_jobs(responsive=()):
+    """Every snapshot of every chart, as one list of independent jobs"""
+    return (supply_snapshot_jobs(responsive) + price_impact_snapshot_jobs(responsive) +
+            governance_snapshot_jobs(responsive) +
+            transaction_rate_snapshot_jobs(responsive))
+
+def template_jobs(num_snapshots=None, responsive=()):
+    """One template job per chart type"""
+    return [template_job(chart, num_snapshots, responsive) for chart in TEMPLATE_RENDERERS]
 
 if __name__ == "__main__":
+    parser = render_farm.make_parser("Generate MemePi visualization snapshots")
+    render_farm.add_template_arguments(parser)
+    responsive_images.add_arguments(parser)
+    args = parser.parse_args()
     print("Generating visualization snapshots...")
-    
-    print("1/4: Creating supply snapshots...")
-    create_supply_snapshots()
-    
-    print("2/4: Creating price impact snapshots...")
-    create_price_impact_snapshots()
-    
-    print("3/4: Creating governance weight snapshots...")
-    create_governance_snapshots()
-    
-    print("4/4: Creating transaction rate snapshots...")
-    create_transaction_rate_snapshots()
-    
+    report = instrumentation.from_args(args, 'static_visualizer', output_dir)
+
+    if args.template:
+        # One process per chart type; the manifest tracks one file per job, so
+        # template series are always rendered
+        jobs = template_jobs(args.snapshots, args.responsive)
+        print(f"Rendering {len(jobs)} snapshot series from templates...")
+        render_farm.render(jobs, args.workers, None, report)
+    else:
+        # All four charts share one pool so no core idles between charts
+        jobs = all_jobs(args.responsive)
+        cache = artifact_cache.ArtifactCache(output_dir, force=args.force)
+        print(f"Rendering {len(jobs)} snapshots...")
+        render_farm.render(jobs, args.workers, cache, report)
+        print(cache.summary())
+    if args.responsive:
+        print(f"{responsive_images.write_manifest(output_dir)} charts in the responsive manifest")
+    report.finish()
+
     print("All snapshots have been generated in the visualizations directory!")
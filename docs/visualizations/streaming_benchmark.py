@@ -0,0 +1,83 @@
+import argparse
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from PIL import Image
+
+import animation_engine
+import tokenomics_animator as animator
+
+FRAME_COUNTS = [25, 50, 100, 200]
+DPIS = [50, 100, 150]
+
+
+def save_in_memory(scene, path, fps=20, dpi=None):
+    """The previous Pillow path: keep every frame, then write the GIF at the end"""
+    images = [Image.frombytes('RGBA', (rgba.shape[1], rgba.shape[0]), rgba.tobytes())
+              for rgba in animation_engine.iter_frames(scene, dpi)]
+    images[0].save(path, save_all=True, append_images=images[1:],
+                   duration=int(1000 / fps), loop=0)
+
+
+def available_modes():
+    modes = ['pillow-in-memory', 'gif', 'apng']
+    if shutil.which('ffmpeg'):
+        modes += ['mp4', 'webm']
+    return modes
+
+
+def _child(mode, num_frames, dpi, path):
+    """Render one animation and print peak RSS (MiB) and wall time"""
+    scene = animator.supply_burn_scene(num_frames)
+    start = time.perf_counter()
+    if mode == 'pillow-in-memory':
+        save_in_memory(scene, path, dpi=dpi)
+    else:
+        animation_engine.save(scene, path, dpi=dpi, fmt=mode)
+    elapsed = time.perf_counter() - start
+    plt.close(scene.fig)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    print(f'{peak:.1f} {elapsed:.3f} {os.path.getsize(path)}')
+
+
+def measure(mode, num_frames, dpi, workdir):
+    """Run one configuration in a fresh process so peak RSS is not shared"""
+    ext = {'pillow-in-memory': 'gif', 'apng': 'png'}.get(mode, mode)
+    path = os.path.join(workdir, f'{mode}_{num_frames}_{dpi}.{ext}')
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child',
+                          mode, str(num_frames), str(dpi), path],
+                         check=True, capture_output=True, text=True).stdout
+    peak, elapsed, size = out.split()
+    return float(peak), float(elapsed), int(size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Peak memory of animation writers across frame counts and dpi')
+    parser.add_argument('--frames', type=int, nargs='+', default=FRAME_COUNTS)
+    parser.add_argument('--dpi', type=int, nargs='+', default=DPIS)
+    parser.add_argument('--modes', nargs='+', default=None,
+                        help=f'writers to compare (default: {" ".join(available_modes())})')
+    parser.add_argument('--child', nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, num_frames, dpi, path = args.child
+        _child(mode, int(num_frames), float(dpi), path)
+        sys.exit(0)
+
+    print(f"{'writer':<18}{'frames':>7}{'dpi':>6}{'peak RSS MiB':>14}{'seconds':>9}{'size KiB':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in args.modes or available_modes():
+            for dpi in args.dpi:
+                for num_frames in args.frames:
+                    peak, elapsed, size = measure(mode, num_frames, dpi, workdir)
+                    print(f'{mode:<18}{num_frames:>7}{dpi:>6}{peak:>14.1f}{elapsed:>9.2f}{size / 1024:>10.0f}')
@@ -0,0 +1,179 @@
+import os
+import shutil
+import struct
+import subprocess
+import zlib
+
+import numpy as np
+from PIL import GifImagePlugin, Image
+
+# Streaming animation writers. Each writer takes one RGBA frame at a time
+# and encodes it straight to disk (or to an encoder process), so memory
+# stays flat no matter how many frames an animation has.
+
+FORMATS = ('gif', 'apng', 'mp4', 'webm')
+
+
+class GifStreamWriter:
+    """GIF writer that encodes every frame against the first frame's palette.
+
+    The global palette is built once from the first frame and reused for all
+    later frames, so frames are never buffered for a shared-palette pass.
+    Like Pillow's own writer, each frame after the first only stores the
+    rectangle that differs from the previous one.
+    """
+
+    def __init__(self, path, fps=20, colors=256):
+        self.fp = open(path, 'wb')
+        self.duration = int(1000 / fps)
+        self.colors = colors
+        self.palette = None
+        self.previous = None
+
+    def write(self, rgba):
+        frame = Image.frombuffer('RGBA', (rgba.shape[1], rgba.shape[0]),
+                                 np.ascontiguousarray(rgba), 'raw', 'RGBA', 0, 1).convert('RGB')
+        if self.palette is None:
+            self.palette = frame.quantize(self.colors, dither=Image.Dither.NONE)
+            header, _ = GifImagePlugin.getheader(self.palette, info={'loop': 0})
+            for block in header:
+                self.fp.write(block)
+            indexed = self.palette
+        else:
+            indexed = frame.quantize(palette=self.palette, dither=Image.Dither.NONE)
+
+        pixels = np.asarray(indexed)
+        offset = (0, 0)
+        if self.previous is not None:
+            changed = pixels != self.previous
+            rows = np.flatnonzero(changed.any(axis=1))
+            cols = np.flatnonzero(changed.any(axis=0))
+            if len(rows):
+                box = (cols[0], rows[0], cols[-1] + 1, rows[-1] + 1)
+            else:
+                box = (0, 0, 1, 1)  # unchanged frame still needs its delay
+            offset = box[:2]
+            indexed = indexed.crop(box)
+        self.previous = pixels
+
+        for block in GifImagePlugin.getdata(indexed, offset, duration=self.duration):
+            self.fp.write(block)
+
+    def close(self):
+        self.fp.write(b';')  # GIF trailer
+        self.fp.close()
+
+
+def _png_chunk(tag, data):
+    return (struct.pack('>I', len(data)) + tag + data +
+            struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+
+
+class ApngStreamWriter:
+    """Animated PNG writer that compresses and appends one frame at a time.
+
+    The frame count in the acTL chunk is patched in place on close.
+    """
+
+    def __init__(self, path, fps=20, compression=6):
+        self.fp = open(path, 'wb')
+        self.fps = fps
+        self.compression = compression
+        self.sequence = 0
+        self.frames = 0
+        self.actl_offset = None
+
+    def _start(self, height, width):
+        self.fp.write(b'\x89PNG\r\n\x1a\n')
+        self.fp.write(_png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)))
+        self.actl_offset = self.fp.tell()
+        self.fp.write(_png_chunk(b'acTL', struct.pack('>II', 0, 0)))
+        # Scanline buffer reused by every frame: a filter byte plus RGBA pixels
+        self.scanlines = np.empty((height, 1 + width * 4), dtype=np.uint8)
+        self.scanlines[:, 0] = 1  # Sub filter, cheap and effective on flat charts
+
+    def write(self, rgba):
+        height, width = rgba.shape[:2]
+        if self.actl_offset is None:
+            self._start(height, width)
+        rows = rgba.reshape(height, width * 4)
+        self.scanlines[:, 1:5] = rows[:, :4]
+        np.subtract(rows[:, 4:], rows[:, :-4], out=self.scanlines[:, 5:])
+        data = zlib.compress(self.scanlines.tobytes(), self.compression)
+
+        self.fp.write(_png_chunk(b'fcTL', struct.pack(
+            '>IIIIIHHBB', self.sequence, width, height, 0, 0, 1, self.fps, 0, 0)))
+        self.sequence += 1
+        if self.frames == 0:
+            self.fp.write(_png_chunk(b'IDAT', data))
+        else:
+            self.fp.write(_png_chunk(b'fdAT', struct.pack('>I', self.sequence) + data))
+            self.sequence += 1
+        self.frames += 1
+
+    def close(self):
+        self.fp.write(_png_chunk(b'IEND', b''))
+        self.fp.seek(self.actl_offset)
+        self.fp.write(_png_chunk(b'acTL', struct.pack('>II', self.frames, 0)))
+        self.fp.close()
+
+
+class FFmpegStreamWriter:
+    """Pipe raw RGBA frames into a local ffmpeg for MP4 (H.264) or WebM (VP9)"""
+
+    CODECS = {
+        'mp4': ['-c:v', 'libx264', '-preset', 'medium', '-crf', '20'],
+        'webm': ['-c:v', 'libvpx-vp9', '-b:v', '0', '-crf', '32'],
+    }
+
+    def __init__(self, path, fps=20, container='mp4'):
+        if shutil.which('ffmpeg') is None:
+            raise RuntimeError(f'{container} output needs ffmpeg on the PATH')
+        self.path = path
+        self.fps = fps
+        self.container = container
+        self.process = None
+
+    def _start(self, height, width):
+        cmd = ['ffmpeg', '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}',
+               '-r', str(self.fps), '-i', '-',
+               # yuv420p needs even dimensions
+               '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+               '-pix_fmt', 'yuv420p'] + self.CODECS[self.container] + [self.path]
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+
+    def write(self, rgba):
+        if self.process is None:
+            self._start(*rgba.shape[:2])
+        self.process.stdin.write(memoryview(np.ascontiguousarray(rgba)).cast('B'))
+
+    def close(self):
+        if self.process is None:
+            return
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f'ffmpeg failed writing {self.path}')
+
+
+def format_for(path):
+    """Animation format implied by a file extension"""
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    return 'apng' if ext == 'png' else ext
+
+
+def open_writer(path, fps=20, fmt=None):
+    """Streaming writer for gif, apng, mp4 or webm, picked from the extension by default"""
+    fmt = fmt or format_for(path)
+    if fmt == 'gif':
+        return GifStreamWriter(path, fps)
+    if fmt == 'apng':
+        return ApngStreamWriter(path, fps)
+    if fmt in FFmpegStreamWriter.CODECS:
+        return FFmpegStreamWriter(path, fps, fmt)
+    raise ValueError(f'unsupported animation format: {fmt!r} (expected one of {FORMATS})')
+
+
+def extension_for(fmt):
+    """File extension used for an animation format"""
+    return 'png' if fmt == 'apng' else fmt
@@ -0,0 +1,293 @@
+import argparse
+import time
+
+import numpy as np
+
+# Exact replay of MemePiToken._afterTokenTransfer.
+#
+# uint256 amounts are held as int64 limbs in base 10**8, laid out limb-major
+# as a (NUM_LIMBS, n) array so each limb is one contiguous vector. Every fee,
+# running total and subtraction is exact while staying vectorized over
+# millions of transfers. Four limbs cover 10**32 wei, far above
+# MAX_SUPPLY * BURN_RATE.
+
+MAX_SUPPLY = 314_159_265 * 10**18
+BURN_RATE = 200  # basis points
+MARKETING_RATE = 100  # basis points
+FEE_DENOMINATOR = 10000
+ZERO_ADDRESS = 0
+
+LIMB_BASE = 10**8  # a power of 100, see _cascade_burn
+NUM_LIMBS = 4
+
+
+def to_limbs(amounts):
+    """Convert Python ints (wei) to a (NUM_LIMBS, n) limb array"""
+    values = np.array(list(amounts), dtype=object).reshape(-1)
+    limbs = np.empty((NUM_LIMBS, len(values)), dtype=np.int64)
+    for i in range(NUM_LIMBS):
+        limbs[i] = (values % LIMB_BASE).astype(np.int64)
+        values = values // LIMB_BASE
+    if len(values) and np.any(values != 0):
+        raise ValueError('amount does not fit in the limb representation')
+    return limbs
+
+
+def tokens_to_limbs(whole_tokens, wei=None):
+    """Limbs for whole token counts plus an optional wei remainder (< 10**18)"""
+    whole = np.asarray(whole_tokens, dtype=np.int64)
+    limbs = np.zeros((NUM_LIMBS, len(whole)), dtype=np.int64)
+    if wei is not None:
+        wei = np.asarray(wei, dtype=np.int64)
+        limbs[0] = wei % LIMB_BASE
+        limbs[1] = (wei // LIMB_BASE) % LIMB_BASE
+        limbs[2] = wei // LIMB_BASE**2
+    # 10**18 wei per token is 100 units of limb 2
+    limbs[2] += (whole % 10**6) * 100
+    limbs[3] = whole // 10**6
+    return _normalize(limbs)
+
+
+def from_limbs(limbs):
+    """Convert limb columns back to Python ints"""
+    limbs = np.asarray(limbs)
+    if limbs.ndim == 1:
+        limbs = limbs[:, None]
+    values = np.zeros(limbs.shape[1], dtype=object)
+    for i in reversed(range(limbs.shape[0])):
+        values = values * LIMB_BASE + limbs[i].astype(object)
+    return [int(v) for v in values]
+
+
+def limbs_to_float(limbs):
+    """Approximate limb columns as float64 (for plotting)"""
+    weights = float(LIMB_BASE) ** np.arange(limbs.shape[0])
+    return weights @ limbs
+
+
+def _normalize(limbs):
+    """Propagate carries in place so every limb but the top one is in [0, base)"""
+    for i in range(limbs.shape[0] - 1):
+        carry = np.floor_divide(limbs[i], LIMB_BASE)
+        limbs[i] -= carry * LIMB_BASE
+        limbs[i + 1] += carry
+    return limbs
+
+
+def _divide(limbs, divisor):
+    """Exact floor division of non-negative limb columns by a small int"""
+    quotient = np.empty_like(limbs)
+    remainder = np.zeros(limbs.shape[1], dtype=np.int64)
+    for i in reversed(range(limbs.shape[0])):
+        current = remainder * LIMB_BASE + limbs[i]
+        quotient[i] = current // divisor
+        remainder = current - quotient[i] * divisor
+    return quotient
+
+
+def _fee(limbs, rate):
+    """floor(amount * rate / 10000) for every column, exactly"""
+    divisor = FEE_DENOMINATOR // np.gcd(rate, FEE_DENOMINATOR)
+    return _divide(_normalize(limbs * (rate * divisor // FEE_DENOMINATOR)), divisor)
+
+
+def _cascade_burn(fee):
+    """Total burned by the marketing-fee cascade that starts with `fee`.
+
+    Level j >= 0 of the cascade moves a_j = floor(fee / 100**j) and burns
+    floor(a_j / 50) = floor(D / 100**(j+1)) with D = 2 * fee. Summed over all
+    levels that is Legendre's formula in base 100:
+
+        sum_{i>=1} floor(D / 100**i) = (D - digitsum_100(D)) / 99
+
+    The base-100 digit sum is cheap because each 10**8 limb holds exactly
+    four base-100 digits, so no per-level loop is needed.
+    """
+    doubled = _normalize(fee * 2)
+    digit_sum = np.zeros(doubled.shape[1], dtype=np.int64)
+    for limb in doubled:
+        for shift in (1, 100, 10**4, 10**6):
+            digit_sum += (limb // shift) % 100
+    doubled[0] -= digit_sum
+    return _divide(_normalize(doubled), 99)
+
+
+def _running_total(deltas, start):
+    """Exact prefix sums of limb columns, offset by a starting limb column"""
+    totals = np.cumsum(deltas, axis=1)
+    totals += start[:, None]
+    return _normalize(totals)
+
+
+def _transfer_fees(senders, recipients, amounts, excluded, marketing_wallet):
+    """Burned and marketing-wallet deltas per transfer, including the fee cascade.
+
+    The marketing fee is paid with _transfer(to, marketingWallet, fee), which
+    runs the hook again: it burns 2% of the fee from the marketing wallet and
+    moves 1% from the wallet to itself, and so on until the fee rounds to
+    zero, unless the recipient or marketing wallet is excluded from fees.
+    """
+    charged = ~(excluded[senders] | excluded[recipients] |
+                (senders == ZERO_ADDRESS) | (recipients == ZERO_ADDRESS))
+    amount = amounts * charged
+    burned = _fee(amount, BURN_RATE)
+    marketing = _fee(amount, MARKETING_RATE)
+
+    # Net change to the marketing wallet: it receives the first fee ...
+    wallet = marketing.copy()
+    # ... plus its own incoming transfers net of their fees, minus outgoing ones
+    to_wallet = recipients == marketing_wallet
+    from_wallet = senders == marketing_wallet
+    wallet[:, to_wallet] += amounts[:, to_wallet] - burned[:, to_wallet] - marketing[:, to_wallet]
+    wallet[:, from_wallet] -= amounts[:, from_wallet]
+
+    # Fee cascade: level 2 is hook(to, wallet), level 3+ is hook(wallet, wallet);
+    # every cascade burn comes out of the marketing wallet
+    if not excluded[marketing_wallet]:
+        cascade = _cascade_burn(marketing * ~excluded[recipients])
+        burned += cascade
+        wallet -= cascade
+    return _normalize(burned), _normalize(wallet)
+
+
+class SupplyTrace:
+    """Exact supply, burned and marketing-wallet totals after each recorded step"""
+
+    def __init__(self, steps, supply, burned, marketing):
+        self.steps = steps
+        self.supply = supply
+        self.burned = burned
+        self.marketing = marketing
+
+    def __len__(self):
+        return len(self.steps)
+
+    def at(self, i):
+        """(supply, burned, marketing) as exact ints at recorded step i"""
+        return tuple(from_limbs(series[:, i])[0]
+                     for series in (self.supply, self.burned, self.marketing))
+
+    def as_float(self):
+        """Float64 copies of the three series, in wei"""
+        return (limbs_to_float(self.supply), limbs_to_float(self.burned),
+                limbs_to_float(self.marketing))
+
+
+def simulate(senders, recipients, amounts, excluded=(), marketing_wallet=1,
+             initial_supply=MAX_SUPPLY, initial_marketing=0,
+             record_every=1, chunk_size=1_000_000):
+    """Replay transfers with exact uint256 fee semantics.
+
+    senders and recipients are integer account ids (0 is the zero address),
+    amounts is a limb array (see to_limbs / tokens_to_limbs) or a sequence
+    of ints in wei, and excluded lists the ids with isExcludedFromFees set.
+    Totals are recorded after every record_every-th transfer and after the
+    last one; work proceeds in chunks so temporaries stay bounded.
+    """
+    senders = np.asarray(senders, dtype=np.int64)
+    recipients = np.asarray(recipients, dtype=np.int64)
+    if not (isinstance(amounts, np.ndarray) and amounts.ndim == 2):
+        amounts = to_limbs(amounts)
+    n = len(senders)
+    num_accounts = int(max(senders.max(initial=0), recipients.max(initial=0),
+                           marketing_wallet, *excluded, 0)) + 1
+    excluded_mask = np.zeros(num_accounts, dtype=bool)
+    excluded_mask[list(excluded)] = True
+
+    recorded = np.arange(record_every - 1, n, record_every)
+    if n and (len(recorded) == 0 or recorded[-1] != n - 1):
+        recorded = np.append(recorded, n - 1)
+    burned_out = np.empty((NUM_LIMBS, len(recorded)), dtype=np.int64)
+    marketing_out = np.empty_like(burned_out)
+
+    burned_total = np.zeros(NUM_LIMBS, dtype=np.int64)
+    marketing_total = to_limbs([initial_marketing])[:, 0]
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        burned, wallet = _transfer_fees(senders[start:stop], recipients[start:stop],
+                                        amounts[:, start:stop], excluded_mask,
+                                        marketing_wallet)
+        burned = _running_total(burned, burned_total)
+        wallet = _running_total(wallet, marketing_total)
+        burned_total, marketing_total = burned[:, -1].copy(), wallet[:, -1].copy()
+
+        lo, hi = np.searchsorted(recorded, [start, stop])
+        burned_out[:, lo:hi] = burned[:, recorded[lo:hi] - start]
+        marketing_out[:, lo:hi] = wallet[:, recorded[lo:hi] - start]
+
+    supply_out = _normalize(to_limbs([initial_supply]) - burned_out)
+    return SupplyTrace(recorded, supply_out, burned_out, marketing_out)
+
+
+def simulate_reference(senders, recipients, amounts, excluded=(), marketing_wallet=1,
+                       initial_supply=MAX_SUPPLY, initial_marketing=0):
+    """Transfer-by-transfer Python int replay, used to check simulate()"""
+    excluded = set(excluded)
+    burned_total, wallet = 0, initial_marketing
+    out = []
+
+    def hook(sender, recipient, amount):
+        nonlocal burned_total, wallet
+        if (sender in excluded or recipient in excluded or
+                sender == ZERO_ADDRESS or recipient == ZERO_ADDRESS):
+            return
+        burn = amount * BURN_RATE // FEE_DENOMINATOR
+        fee = amount * MARKETING_RATE // FEE_DENOMINATOR
+        if burn > 0:
+            burned_total += burn
+            if recipient == marketing_wallet:
+                wallet -= burn
+        if fee > 0:
+            if recipient != marketing_wallet:
+                wallet += fee
+            hook(recipient, marketing_wallet, fee)
+
+    for sender, recipient, amount in zip(senders, recipients, amounts):
+        if sender == marketing_wallet:
+            wallet -= amount
+        if recipient == marketing_wallet:
+            wallet += amount
+        hook(sender, recipient, amount)
+        out.append((initial_supply - burned_total, burned_total, wallet))
+    return out
+
+
+def synthetic_transfers(n, num_accounts=100_000, seed=0):
+    """Random transfers with lognormal token amounts and wei remainders"""
+    rng = np.random.default_rng(seed)
+    senders = rng.integers(1, num_accounts, n)
+    recipients = rng.integers(1, num_accounts, n)
+    whole = np.minimum(rng.lognormal(3, 2, n), 10**7).astype(np.int64)
+    wei = rng.integers(0, 10**18, n)
+    return senders, recipients, tokens_to_limbs(whole, wei)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Exact MemePiToken supply replay on synthetic transfers')
+    parser.add_argument('-n', '--transfers', type=int, default=10_000_000)
+    parser.add_argument('--check', type=int, default=20_000,
+                        help='transfers to verify against the Python int loop')
+    args = parser.parse_args()
+
+    # Account 1 is the marketing wallet, accounts 2 and 3 are fee-exempt
+    excluded = (2, 3)
+    senders, recipients, amounts = synthetic_transfers(args.transfers)
+
+    m = min(args.check, args.transfers)
+    start = time.perf_counter()
+    expected = simulate_reference(senders[:m].tolist(), recipients[:m].tolist(),
+                                  from_limbs(amounts[:, :m]), excluded)
+    reference_rate = m / (time.perf_counter() - start)
+    trace = simulate(senders[:m], recipients[:m], amounts[:, :m], excluded)
+    assert [trace.at(i) for i in range(m)] == expected, 'mismatch against reference'
+
+    start = time.perf_counter()
+    trace = simulate(senders, recipients, amounts, excluded, record_every=1000)
+    elapsed = time.perf_counter() - start
+    supply, burned, marketing = trace.at(len(trace) - 1)
+    print(f'{args.transfers:,} transfers in {elapsed:.2f}s '
+          f'({args.transfers / elapsed:,.0f}/s, Python int loop: {reference_rate:,.0f}/s)')
+    print(f'supply    {supply:>40,} wei')
+    print(f'burned    {burned:>40,} wei')
+    print(f'marketing {marketing:>40,} wei')
@@ -0,0 +1,471 @@
+import argparse
+import functools
+import glob
+import io
+import os
+import re
+import time
+import zlib
+import xml.etree.ElementTree as ET
+from collections import Counter
+
+import numpy as np
+
+# Lean rewrite of matplotlib's SVG output for the web.
+#
+# matplotlib writes every vertex at six decimals, one command per line, a
+# style attribute per element, hashed ids and an id on every group. The
+# rewrite keeps the drawing and drops the rest:
+#
+#   paths    polylines of at least MIN_POINTS vertices are simplified with
+#            Ramer-Douglas-Peucker to within `tolerance` CSS pixels at the
+#            file's natural size; all coordinates are rounded to `decimals`
+#            and written relative (m/l/h/v/q/c) with implicit separators.
+#            Rounding is done on absolute values, so errors do not add up.
+#   glyphs   every glyph and marker definition moves to one <defs>; a glyph
+#            run drawn more than once (repeated tick labels) is defined once
+#            there and placed with a single <use>.
+#   markup   metadata, comments, whitespace and unreferenced ids go; groups
+#            left without attributes are unwrapped; referenced ids become
+#            short; styles used more than once become CSS classes.
+#
+# Glyph outlines (the paths drawn through a scale transform) are not
+# simplified, and elements inside <defs> keep their inline styles, which
+# reach every <use> of them unchanged.
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+XLINK_NS = 'http://www.w3.org/1999/xlink'
+TOLERANCE_PX = 0.25
+DECIMALS = 1
+MIN_POINTS = 8
+PARSE_REPEATS = 20
+_HREF = f'{{{XLINK_NS}}}href'
+_PATH_TOKEN = re.compile(r'[MLQCZmlqczHVhv]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_URL = re.compile(r'url\(#([^)]+)\)')
+_TRANSLATE = re.compile(r'translate\(([^)]*)\)')
+_LETTERS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_ARITY = {'M': 2, 'L': 2, 'Q': 4, 'C': 6, 'Z': 0}
+
+ET.register_namespace('', SVG_NS)
+ET.register_namespace('xlink', XLINK_NS)
+
+
+def _tag(element):
+    return element.tag.rpartition('}')[2]
+
+
+def _parse_path(d):
+    """[(command, points)] of an absolute M/L/Q/C/Z path, or None for anything else"""
+    tokens = _PATH_TOKEN.findall(d)
+    segments, command, values = [], None, []
+
+    def close():
+        arity = _ARITY[command]
+        if arity == 0:
+            segments.append(('Z', np.empty((0, 2))))
+            return not values
+        if not values or len(values) % arity:
+            return False
+        points = np.array(values, dtype=float).reshape(-1, arity // 2, 2)
+        first = 'L' if command == 'M' else command  # extra M pairs are line-tos
+        segments.append((command, points[0]))
+        segments.extend((first, p) for p in points[1:])
+        return True
+
+    for token in tokens:
+        if token == 'z':
+            token = 'Z'
+        if token in _ARITY:
+            if command is not None and not close():
+                return None
+            command, values = token, []
+        elif command is None or token.isalpha():
+            return None  # relative or H/V commands: matplotlib does not write them
+        else:
+            values.append(token)
+    if command is not None and not close():
+        return None
+    return segments
+
+
+def rdp(points, tolerance):
+    """Indices of the points Ramer-Douglas-Peucker keeps, to within tolerance of the polyline"""
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, n - 1)]
+    while stack:
+        lo, hi = stack.pop()
+        if hi - lo < 2:
+            continue
+        a, chord = points[lo], points[hi] - points[lo]
+        offset = points[lo + 1:hi] - a
+        length = chord @ chord
+        t = np.clip(offset @ chord / length, 0, 1) if length else np.zeros(len(offset))
+        distance = np.hypot(*(offset - t[:, None] * chord).T)
+        i = int(np.argmax(distance))
+        if distance[i] > tolerance:
+            keep[lo + 1 + i] = True
+            stack += [(lo, lo + 1 + i), (lo + 1 + i, hi)]
+    return np.flatnonzero(keep)
+
+
+def simplify(segments, tolerance):
+    """segments with every run of line-tos of MIN_POINTS or more vertices reduced by rdp()"""
+    result, run = [], []
+
+    def flush():
+        if len(run) > 1:
+            points = np.array(run)
+            kept = rdp(points, tolerance) if len(run) >= MIN_POINTS else range(len(run))
+            result.extend(('L', points[i:i + 1]) for i in kept[1:])
+        run.clear()
+
+    start = None
+    for command, points in segments:
+        if command == 'L':
+            run.append(points[0])
+            continue
+        flush()
+        result.append((command, points))
+        if command == 'M':
+            start = points[0]
+        run.append(start if command == 'Z' else points[-1])
+    flush()
+    return result
+
+
+def _number(n, decimals):
+    """Integer n in units of 10**-decimals as the shortest decimal string"""
+    digits = str(abs(n))
+    if decimals:
+        digits = digits.rjust(decimals + 1, '0')
+        digits = (digits[:-decimals].lstrip('0') + '.' + digits[-decimals:]).rstrip('0').rstrip('.')
+    return ('-' if n < 0 else '') + (digits or '0')
+
+
+def encode_path(segments, decimals):
+    """Minified relative path data for absolute segments, rounded to decimals"""
+    scale = 10 ** decimals
+    out, last, previous = [], None, ''
+    cx = cy = sx = sy = 0
+
+    def emit(command, *values):
+        nonlocal last, previous
+        if command != last or command == 'm' or last == 'z':
+            if not (last == 'm' and command == 'l'):
+                out.append(command)
+                previous = ''
+        last = command
+        for value in values:
+            text = _number(value, decimals)
+            if previous and not (text[0] == '-' or (text[0] == '.' and '.' in previous)):
+                out.append(' ')
+            out.append(text)
+            previous = text
+
+    drawn = False
+    for command, points in segments:
+        q = np.rint(points * scale).astype(np.int64).tolist()
+        if command == 'M':
+            (x, y), = q
+            emit('m', x - cx, y - cy)
+            cx, cy = sx, sy = x, y
+            drawn = False
+        elif command == 'L':
+            (x, y), = q
+            dx, dy = x - cx, y - cy
+            if dx == 0 and dy == 0 and drawn:
+                continue
+            if dy == 0 and dx:
+                emit('h', dx)
+            elif dx == 0 and dy:
+                emit('v', dy)
+            else:
+                emit('l', dx, dy)
+            cx, cy, drawn = x, y, True
+        elif command == 'Z':
+            emit('z')
+            cx, cy = sx, sy
+        else:
+            emit(command.lower(), *(v - c for p in q for v, c in zip(p, (cx, cy))))
+            cx, cy = q[-1]
+            drawn = True
+    return ''.join(out)
+
+
+def _round_translate(transform, decimals):
+    def rounded(match):
+        values = (_number(round(float(v) * 10 ** decimals), decimals)
+                  for v in _NUMBER.findall(match.group(1)))
+        return f"translate({' '.join(values).removesuffix(' 0')})"
+    return _TRANSLATE.sub(rounded, transform)
+
+
+def _minify_style(style):
+    style = re.sub(r'\s*([:;{}])\s*', r'\1', style).strip().strip(';')
+    style = re.sub(r'#([0-9a-fA-F])\1([0-9a-fA-F])\2([0-9a-fA-F])\3\b', r'#\1\2\3', style)
+    return re.sub(r'(?<![\d.])0\.(\d)', r'.\1', style)
+
+
+def _short_id(number):
+    """a, b, ..., Z, aa, ab, ...: ids are XML names, so they may not start with a digit"""
+    name = ''
+    while True:
+        number, digit = divmod(number, len(_LETTERS))
+        name = _LETTERS[digit] + name
+        if not number:
+            return name
+        number -= 1
+
+
+def _pixels_per_unit(root):
+    """CSS pixels per user unit at the file's natural size"""
+    width = root.get('width', '')
+    box = root.get('viewBox', '').split()
+    match = re.fullmatch(r'([\d.]+)(pt|px)?', width)
+    if not match or len(box) != 4 or not float(box[2]):
+        return 1.0
+    pixels = float(match.group(1)) * (96 / 72 if match.group(2) == 'pt' else 1)
+    return pixels / float(box[2])
+
+
+def optimize(data, tolerance=TOLERANCE_PX, decimals=DECIMALS):
+    """Lean SVG bytes for matplotlib SVG bytes; tolerance in CSS pixels"""
+    root = ET.fromstring(data)
+    parents = {child: parent for parent in root.iter() for child in parent}
+    tolerance /= _pixels_per_unit(root)
+
+    # One <defs>, first, holding every definition
+    defs = ET.Element(f'{{{SVG_NS}}}defs')
+    for element in list(root.iter()):
+        if _tag(element) == 'metadata':
+            parents[element].remove(element)
+        elif _tag(element) == 'defs':
+            defs.extend(element)
+            parents[element].remove(element)
+    defined = set(defs.iter())
+    root.insert(0, defs)
+    root.attrib.pop('version', None)
+
+    for element in root.iter():
+        if element.text and not element.text.strip():
+            element.text = None
+        if element.tail and not element.tail.strip():
+            element.tail = None
+        tag = _tag(element)
+        if tag == 'path' and 'd' in element.attrib:
+            segments = _parse_path(element.get('d'))
+            if segments is not None:
+                if 'transform' not in element.attrib:  # glyphs are scaled font outlines
+                    segments = simplify(segments, tolerance)
+                element.set('d', encode_path(segments, decimals))
+        if tag in ('use', 'rect'):
+            for key in ('x', 'y', 'width', 'height'):
+                if key in element.attrib:
+                    element.set(key, _number(round(float(element.get(key)) * 10 ** decimals),
+                                             decimals))
+        if 'transform' in element.attrib:
+            element.set('transform', _round_translate(element.get('transform'), decimals + 1))
+        if 'style' in element.attrib:
+            element.set('style', _minify_style(element.get('style')))
+
+    # Glyph runs drawn more than once become one definition
+    runs = {}
+    for group in root.iter(f'{{{SVG_NS}}}g'):
+        children = list(group)
+        if (len(children) > 1 and group not in defined
+                and all(_tag(c) == 'use' and 'style' not in c.attrib for c in children)):
+            runs.setdefault(b''.join(ET.tostring(c) for c in children), []).append(group)
+    for number, groups in enumerate(g for g in runs.values() if len(g) > 1):
+        run = ET.SubElement(defs, f'{{{SVG_NS}}}g', id=f'text-run-{number}')
+        run.extend(list(groups[0]))
+        for group in groups:
+            for child in list(group):
+                group.remove(child)
+            ET.SubElement(group, f'{{{SVG_NS}}}use', {_HREF: f'#text-run-{number}'})
+
+    # Short ids for referenced elements, none for the rest
+    referenced = set()
+    for element in root.iter():
+        for key, value in element.attrib.items():
+            if key == _HREF and value.startswith('#'):
+                referenced.add(value[1:])
+            referenced.update(_URL.findall(value))
+    names = {}
+    for element in root.iter():
+        name = element.attrib.pop('id', None)
+        if name in referenced:
+            names[name] = _short_id(len(names))
+            element.set('id', names[name])
+    for element in root.iter():
+        for key, value in element.attrib.items():
+            if key == _HREF and value[1:] in names:
+                element.set(key, '#' + names[value[1:]])
+            elif 'url(#' in value:
+                element.set(key, _URL.sub(lambda m: f'url(#{names.get(m[1], m[1])})', value))
+
+    # Unwrap groups without attributes; <g transform><use/></g> becomes one <use>
+    parents = {child: parent for parent in root.iter() for child in parent}
+    defined = set(defs.iter())
+    for group in [g for g in root.iter(f'{{{SVG_NS}}}g') if g not in defined]:
+        parent = parents[group]
+        children = list(group)
+        if not group.attrib:
+            index = list(parent).index(group)
+            parent.remove(group)
+            for offset, child in enumerate(children):
+                parent.insert(index + offset, child)
+                parents[child] = parent
+        elif (len(children) == 1 and _tag(children[0]) == 'use'
+              and set(group.attrib) <= {'transform', 'style'}
+              and not set(group.attrib) & set(children[0].attrib)):
+            children[0].attrib.update(group.attrib)
+            index = list(parent).index(group)
+            parent.remove(group)
+            parent.insert(index, children[0])
+            parents[children[0]] = parent
+
+    # Repeated styles become classes
+    styled = [e for e in root.iter() if 'style' in e.attrib and e not in defined]
+    counts = Counter(e.get('style') for e in styled)
+    classes = {style: f's{i}' for i, style in
+               enumerate(s for s, count in counts.most_common() if count > 1)}
+    for element in styled:
+        if element.get('style') in classes:
+            element.set('class', classes[element.attrib.pop('style')])
+    sheet = defs.find(f'{{{SVG_NS}}}style')
+    if sheet is None:
+        sheet = ET.Element(f'{{{SVG_NS}}}style')
+        defs.insert(0, sheet)
+    sheet.attrib.pop('type', None)
+    css = _minify_style(sheet.text or '')
+    sheet.text = css + ''.join(f'.{name}{{{style}}}' for style, name in classes.items())
+    if not len(defs):
+        root.remove(defs)
+    return ET.tostring(root, encoding='unicode').replace(' />', '/>').encode()
+
+
+def measure(data):
+    """Size, compressed size, element and number counts, and parse time of SVG bytes.
+
+    Parse time is the best of PARSE_REPEATS runs of building the XML tree and
+    tokenizing every coordinate; a browser's costs scale with the same counts.
+    """
+    best = float('inf')
+    for _ in range(PARSE_REPEATS):
+        start = time.perf_counter()
+        root = ET.fromstring(data)
+        numbers = sum(len(_NUMBER.findall(e.get('d', ''))) for e in root.iter())
+        best = min(best, time.perf_counter() - start)
+    return {'bytes': len(data), 'gzip': len(zlib.compress(data, 9)),
+            'elements': sum(1 for _ in root.iter()), 'numbers': numbers, 'parse_ms': best * 1000}
+
+
+def report(rows):
+    """Lines comparing (name, original bytes, lean bytes) rows"""
+    header = (f"{'file':<32} {'bytes':>17} {'gzip':>15} {'elements':>11} "
+              f"{'path numbers':>15} {'parse ms':>13}")
+    lines, totals = [header], np.zeros((2, 5))
+    for name, original, lean in rows:
+        before, after = measure(original), measure(lean)
+        values = np.array([[m['bytes'], m['gzip'], m['elements'], m['numbers'], m['parse_ms']]
+                           for m in (before, after)])
+        totals += values
+        lines.append(_row(name, values))
+    if len(rows) > 1:
+        lines.append(_row('total', totals))
+    return lines
+
+
+def _row(name, values):
+    columns = [f'{a:>7,.0f} {b:>6,.0f}' for a, b in values[:, :4].T]
+    columns.append(f'{values[0, 4]:>5.1f} {values[1, 4]:>5.1f}')
+    ratio = values[1, 0] / values[0, 0]
+    return (f'{name:<32} {columns[0]:>17} {columns[1]:>15} {columns[2]:>11} {columns[3]:>15} '
+            f'{columns[4]:>13}  ({ratio:.0%} of original)')
+
+
+def _write(path, data):
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+
+_settings = None  # (tolerance, decimals) once enable() is called
+written = []  # (path, original bytes, lean bytes) of every SVG saved since
+
+
+def enable(tolerance=TOLERANCE_PX, decimals=DECIMALS):
+    """Make Figure.savefig write lean SVG to .svg paths in this process"""
+    global _settings
+    if _settings is None:
+        from matplotlib.figure import Figure
+        original = Figure.savefig
+
+        @functools.wraps(original)
+        def savefig(self, fname, *args, **kwargs):
+            is_path = isinstance(fname, (str, os.PathLike))
+            fmt = kwargs.get('format') or (os.path.splitext(fname)[1][1:] if is_path else None)
+            if not is_path or fmt != 'svg':
+                return original(self, fname, *args, **kwargs)
+            buffer = io.BytesIO()
+            original(self, buffer, *args, **kwargs)
+            lean = optimize(buffer.getvalue(), *_settings)
+            _write(os.fspath(fname), lean)
+            written.append((os.fspath(fname), buffer.getvalue(), lean))
+        Figure.savefig = savefig
+    _settings = (tolerance, decimals)
+
+
+def add_arguments(parser):
+    """--lean [PX], for scripts that save SVG charts"""
+    parser.add_argument('--lean', nargs='?', type=float, const=TOLERANCE_PX, default=None,
+                        metavar='PX',
+                        help='write simplified, quantized and minified SVG, keeping paths '
+                             f'within PX CSS pixels (default: {TOLERANCE_PX}), and print a '
+                             'size and parse-time comparison')
+    return parser
+
+
+def from_args(args):
+    """enable() when --lean was given"""
+    if args.lean is not None:
+        enable(args.lean)
+
+
+def finish():
+    """Print the comparison for every SVG written since enable()"""
+    if written:
+        print('\n'.join(report([(os.path.basename(path), original, lean)
+                                for path, original, lean in written])))
+
+
+if __name__ == "__main__":
+    output_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Compare (and write) lean versions of SVG charts')
+    parser.add_argument('files', nargs='*',
+                        help='SVG files (default: every chart in this directory)')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE_PX,
+                        help=f'path simplification tolerance in CSS pixels (default: {TOLERANCE_PX})')
+    parser.add_argument('--decimals', type=int, default=DECIMALS,
+                        help=f'coordinate decimals (default: {DECIMALS})')
+    parser.add_argument('--output-dir', help='write the lean files here')
+    parser.add_argument('--in-place', action='store_true', help='overwrite the input files')
+    args = parser.parse_args()
+
+    rows = []
+    for path in args.files or sorted(glob.glob(os.path.join(output_dir, '*.svg'))):
+        with open(path, 'rb') as f:
+            original = f.read()
+        start = time.perf_counter()
+        lean = optimize(original, args.tolerance, args.decimals)
+        elapsed = time.perf_counter() - start
+        rows.append((os.path.basename(path), original, lean))
+        if args.in_place or args.output_dir:
+            directory = args.output_dir or os.path.dirname(path)
+            os.makedirs(directory, exist_ok=True)
+            _write(os.path.join(directory, os.path.basename(path)), lean)
+        print(f'{os.path.basename(path)}: optimized in {elapsed * 1000:.0f} ms')
+    print('\n'.join(report(rows)))
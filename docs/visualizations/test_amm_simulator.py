@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+import amm_simulator
+
+# simulate() against the per-trade reference loop, including zero-size trades,
+# and the input it must refuse: non-finite or negative amounts, unknown kinds.
+
+
+def test_amm_matches_reference():
+    kinds, amounts = amm_simulator.synthetic_trades(5000, seed=7)
+    amounts[::50] = 0
+    tokens, eth, received = amm_simulator.simulate_reference(kinds.tolist(), amounts.tolist())
+    trace = amm_simulator.simulate(kinds, amounts)
+    assert trace.token_reserve[-1] == pytest.approx(tokens, rel=1e-12)
+    assert trace.eth_reserve[-1] == pytest.approx(eth, rel=1e-12)
+    assert np.allclose(trace.received, received, rtol=1e-12, atol=0)
+
+
+@pytest.mark.parametrize('bad', [np.nan, np.inf, -1.0])
+def test_amm_rejects_non_finite_or_negative_amounts(bad):
+    with pytest.raises(ValueError, match='finite and non-negative'):
+        amm_simulator.simulate([amm_simulator.SELL, amm_simulator.BUY, amm_simulator.SELL],
+                               [1e6, bad, 1e6])
+
+
+def test_amm_rejects_unknown_kinds():
+    with pytest.raises(ValueError, match='SELL or BUY'):
+        amm_simulator.simulate([amm_simulator.SELL, 2], [1.0, 1.0])
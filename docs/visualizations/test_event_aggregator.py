@@ -0,0 +1,90 @@
+import json
+
+import numpy as np
+import pytest
+
+import chain_store
+import event_aggregator
+from governance_engine import decode_addresses
+
+# Resuming from the .npz checkpoint must give what one update over the whole
+# source gives: appends cut at random bytes (so most end mid-line), a re-sent
+# stretch of events the (block, log_index) check has to drop, and a
+# chain_store transfers directory read from the saved row.
+
+
+@pytest.fixture
+def events(tmp_path):
+    path = str(tmp_path / 'seed.jsonl')
+    wallet = event_aggregator.append_synthetic_events(path, 1500, seed=1)
+    event_aggregator.append_synthetic_events(path, 1500, seed=2)
+    with open(path) as handle:
+        lines = handle.readlines()
+    return lines, bytes(decode_addresses([wallet])[0]).ljust(20, b'\0')
+
+
+def _assert_same(got, want):
+    assert (got.minted, got.burned, got.fees) == (want.minted, want.burned, want.fees)
+    assert (got.events, got.last, got.previous) == (want.events, want.last, want.previous)
+    assert got.hours.tolist() == want.hours.tolist()
+    assert got.hour_counts.tolist() == want.hour_counts.tolist()
+    for a, b in zip(got.series(200), want.series(200)):
+        assert np.allclose(a, b, rtol=1e-12)  # float hour totals are summed per batch
+
+
+def _cuts(size, n, seed):
+    return np.append(np.sort(np.random.default_rng(seed).choice(size, n, replace=False)), size)
+
+
+def test_file_resume_matches_one_pass(tmp_path, events):
+    lines, wallet = events
+    # The node re-sends the 40 events before line 2000 along with the new ones
+    content = ''.join(lines[:2000] + lines[1960:]).encode()
+    single = event_aggregator.Aggregator(None, wallet)
+    (tmp_path / 'all.jsonl').write_bytes(content)
+    single.update(str(tmp_path / 'all.jsonl'))
+
+    path, checkpoint = str(tmp_path / 'events.jsonl'), str(tmp_path / 'events.npz')
+    written = 0
+    for cut in _cuts(len(content), 12, seed=3):
+        with open(path, 'ab') as handle:
+            handle.write(content[written:cut])
+        written = cut
+        aggregator = event_aggregator.Aggregator(checkpoint, wallet)
+        aggregator.update(path, batch_rows=256)
+        assert aggregator.cursor == content.rfind(b'\n', 0, cut) + 1  # partial line held back
+    _assert_same(event_aggregator.Aggregator(checkpoint), single)
+
+    clean = event_aggregator.Aggregator(None, wallet)
+    (tmp_path / 'clean.jsonl').write_text(''.join(lines))
+    clean.update(str(tmp_path / 'clean.jsonl'))
+    _assert_same(single, clean)
+    assert clean.events == len(lines) and clean.fees > 0
+
+
+def test_store_resume_matches_one_pass(tmp_path, events):
+    lines, wallet = events
+    records = [json.loads(line) for line in lines]
+    fields = chain_store.resolve_fields('transfers', list(records[0]))
+    columns = chain_store.export_columns('transfers', records, fields, 'wei')
+    store, checkpoint = str(tmp_path / 'store'), str(tmp_path / 'store.npz')
+    for cut in _cuts(len(records), 6, seed=4):
+        # The store is rebuilt with more rows; the checkpoint resumes at its row cursor
+        with chain_store.StoreWriter(store, 'transfers') as writer:
+            writer.append({name: values[:cut] for name, values in columns.items()})
+        aggregator = event_aggregator.Aggregator(checkpoint, wallet)
+        aggregator.update(store, batch_rows=300)
+        assert aggregator.cursor == cut
+    single = event_aggregator.Aggregator(None, wallet)
+    single.update(store)
+    _assert_same(event_aggregator.Aggregator(checkpoint), single)
+
+
+def test_checkpoint_refuses_another_source(tmp_path, events):
+    lines, wallet = events
+    for name in ('a.jsonl', 'b.jsonl'):
+        (tmp_path / name).write_text(''.join(lines[:100]))
+    checkpoint = str(tmp_path / 'a.npz')
+    event_aggregator.Aggregator(checkpoint, wallet).update(str(tmp_path / 'a.jsonl'))
+    with pytest.raises(ValueError, match='checkpoint belongs to'):
+        event_aggregator.Aggregator(checkpoint).update(str(tmp_path / 'b.jsonl'))
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+import farming_simulator
+
+# The float64 accumulators against the exact integer path: emergency
+# withdrawals, withdrawals that revert and a pool switched off late, with and
+# without a mass update of the other pools.
+
+
+def _farming_log(n=3000, num_users=30, seed=3):
+    times, kinds, pools, users, amounts = farming_simulator.synthetic_events(
+        n, num_users, seed=seed)
+    rng = np.random.default_rng(seed)
+    kinds[(rng.random(len(kinds)) < 0.02) & (kinds == farming_simulator.WITHDRAW)] = \
+        farming_simulator.EMERGENCY
+    big = (rng.random(len(kinds)) < 0.05) & (kinds == farming_simulator.WITHDRAW)
+    amounts[big] *= 1e6  # more than the user holds: reverts
+    # Switch pool 1 off for the last stretch
+    at = len(times) * 3 // 4
+    return (np.insert(times, at, times[at]), np.insert(kinds, at, farming_simulator.SET_POOL),
+            np.insert(pools, at, 1), np.insert(users, at, -1), np.insert(amounts, at, 0.0))
+
+
+@pytest.mark.parametrize('mass_update', [False, True])
+def test_farming_float_matches_exact(mass_update):
+    events = _farming_log()
+    alloc_points = (40, 30, 20, 10)
+    fast = farming_simulator.simulate(*events, alloc_points, mass_update=mass_update)
+    exact = farming_simulator.simulate(*events, alloc_points, mass_update=mass_update,
+                                       exact=True)
+    assert fast.reverts == exact.reverts
+    assert fast.reverts['withdraw'] > 0
+    assert np.allclose(fast.harvested, exact.harvested, rtol=1e-6)
+    assert np.allclose(fast.emitted, exact.emitted, rtol=1e-6)
+    assert np.allclose(fast.lp, exact.lp, rtol=1e-9)
+    assert np.allclose(fast.user_rewards, exact.user_rewards, rtol=1e-6, atol=1e-6)
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from governance_engine import decode_addresses, encode_address
+
+# decode_addresses() accepts exactly '0x' + 40 hex digits, in either case, and
+# refuses anything else rather than casting it to something that decodes.
+
+ADDRESS = '0x' + '0123456789abcdefABCDEF0123456789abcdef01'
+
+
+def test_decode_round_trips_str_bytes_and_object_input():
+    for values in ([ADDRESS], [ADDRESS.encode()], np.array([ADDRESS], dtype=object)):
+        assert encode_address(decode_addresses(values)[0]) == ADDRESS.lower()
+
+
+@pytest.mark.parametrize('bad', [
+    ADDRESS + '0',               # too long: an S42 cast would drop the extra digit
+    ADDRESS + 'zz',
+    ADDRESS[:-1],                # too short
+    'zz' + ADDRESS[2:],          # no 0x prefix
+    '0X' + ADDRESS[2:],
+    ADDRESS[:-1] + 'g',          # not hex
+    '0x' + 'é' * 40,
+])
+def test_decode_rejects_anything_but_0x_and_40_hex_digits(bad):
+    with pytest.raises(ValueError, match='0x followed by 40 hex digits'):
+        decode_addresses([ADDRESS, bad])
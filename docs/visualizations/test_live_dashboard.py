@@ -0,0 +1,61 @@
+import json
+
+import numpy as np
+import pytest
+
+import event_aggregator
+import live_dashboard
+
+# poll() on a file with a malformed line mid-stream: it must skip the line,
+# report it and apply everything around it, exactly as if it were not there.
+
+
+def _write(path, lines):
+    path.write_text(''.join(json.dumps(line) + '\n' for line in lines))
+
+
+@pytest.fixture
+def events(tmp_path):
+    path = tmp_path / 'events.jsonl'
+    event_aggregator.append_synthetic_events(str(path), 300, seed=1)
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+@pytest.mark.parametrize('field, value', [('to', '0xnothex'), ('from', '0x' + '0' * 41),
+                                          ('value', 'abc'), ('value', '1' * 40)])
+def test_poll_skips_a_line_that_does_not_decode(tmp_path, events, field, value):
+    bad = dict(events[150], **{field: value})
+    _write(tmp_path / 'bad.jsonl', events[:150] + [bad] + events[150:])
+    _write(tmp_path / 'good.jsonl', events)
+    live = live_dashboard.LiveSeries(str(tmp_path / 'bad.jsonl'))
+    expected = live_dashboard.LiveSeries(str(tmp_path / 'good.jsonl'))
+    assert live.poll() == expected.poll()
+    assert live.skipped == 1
+    start = sum(len(json.dumps(line)) + 1 for line in events[:150])
+    assert f'line at byte {start}:' in live.last_error
+
+
+def test_update_reports_bad_lines_in_every_batch(tmp_path, events):
+    lines = list(events)
+    lines.insert(100, dict(events[99], to='0xnothex'))
+    lines.insert(200, dict(events[199], value='abc'))
+    _write(tmp_path / 'bad.jsonl', lines)
+    _write(tmp_path / 'good.jsonl', events)
+    errors = []
+    aggregator = event_aggregator.Aggregator(None)
+    aggregator.update(str(tmp_path / 'bad.jsonl'), batch_rows=64, on_error=errors.append)
+    expected = event_aggregator.Aggregator(None)
+    expected.update(str(tmp_path / 'good.jsonl'))
+    assert len(errors) == 2
+    for got, want in zip(aggregator.series(), expected.series()):
+        assert np.allclose(got, want, rtol=1e-12)  # batch edges move the float sums
+    # Without on_error the same line stops the update
+    with pytest.raises(ValueError, match='hex digits'):
+        event_aggregator.Aggregator(None).update(str(tmp_path / 'bad.jsonl'), batch_rows=64)
+
+
+def test_a_bad_first_line_raises_even_with_on_error(tmp_path, events):
+    _write(tmp_path / 'bad.jsonl', [dict(events[0], value='abc')] + events[1:])
+    with pytest.raises(ValueError, match='line at byte 0'):
+        event_aggregator.Aggregator(None).update(str(tmp_path / 'bad.jsonl'),
+                                                 on_error=print)
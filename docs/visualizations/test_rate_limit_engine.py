@@ -0,0 +1,54 @@
+import numpy as np
+
+import chain_store
+import rate_limit_engine
+
+# replay() and LiveReplay against the per-transfer reference loop. LiveReplay is
+# fed in batches of random size, so most end mid-hour and some fall between a
+# burn and its fee leg.
+
+
+def test_rate_limit_matches_reference():
+    senders, times = rate_limit_engine.synthetic_log(30_000, num_addresses=500, days=2)
+    expected = rate_limit_engine.replay_reference(senders.tolist(), times.tolist())
+    report = rate_limit_engine.replay(senders, times)
+    assert report.rejected == expected
+    assert report.per_hour.sum(axis=1).tolist() == [expected[rule]
+                                                     for rule in rate_limit_engine.RULES]
+    assert expected['combined'] > 0
+
+
+def _addresses(ids):
+    return np.array([b'%020d' % i for i in ids.tolist()], dtype='S20')
+
+
+def _transfer_columns(senders, times, seed=4):
+    """Each transfer (sender id + 1 -> someone) followed by its burn and marketing fee legs"""
+    rng = np.random.default_rng(seed)
+    n = len(senders)
+    wallet = np.array([b'wallet'], dtype='S20')
+    recipient = _addresses(rng.integers(10**6, 2 * 10**6, n))
+    zero = np.array([chain_store.ZERO_ADDRESS] * n, dtype='S20')
+    columns = {
+        'sender': np.stack([_addresses(senders + 1), recipient, recipient], axis=1),
+        'recipient': np.stack([recipient, zero, np.repeat(wallet, n)], axis=1),
+        'block': np.repeat(np.arange(n)[:, None], 3, axis=1),
+        'timestamp': np.repeat(np.asarray(times)[:, None], 3, axis=1),
+    }
+    return {name: values.reshape(-1) for name, values in columns.items()}
+
+
+def test_live_replay_matches_reference_across_batches():
+    senders, times = rate_limit_engine.synthetic_log(20_000, num_addresses=300, days=2, seed=5)
+    expected = rate_limit_engine.replay_reference(senders.tolist(), times.tolist())
+    columns = _transfer_columns(senders, times)
+    # Batches of random size, so most end mid-hour and some between a burn and its fee leg
+    cuts = np.sort(np.random.default_rng(6).choice(len(columns['block']), 40, replace=False))
+    live = rate_limit_engine.LiveReplay()
+    per_hour = 0
+    for lo, hi in zip(np.r_[0, cuts], np.r_[cuts, len(columns['block'])]):
+        _, rejected = live.add({name: values[lo:hi] for name, values in columns.items()})
+        per_hour += rejected.sum(axis=1)
+    assert live.transfers == len(senders)
+    assert live.rejected == expected
+    assert per_hour.tolist() == [expected[rule] for rule in rate_limit_engine.RULES]
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+import staking_simulator
+
+# simulate() against the per-event reference loop: withdrawals that revert,
+# zero stakes and withdrawals, and a reward-rate change a third of the way in,
+# recorded at every event, at a handful of points and once.
+
+
+def _staking_log(n=4000, num_users=50, seed=2):
+    times, users, kinds, amounts = staking_simulator.synthetic_events(n, num_users, seed)
+    rng = np.random.default_rng(seed)
+    # Withdrawals larger than any stake revert; zero stakes and withdrawals are no-ops
+    amounts[rng.random(n) < 0.05] *= 1e6
+    amounts[rng.random(n) < 0.05] = 0
+    return times, users, kinds, amounts
+
+
+@pytest.mark.parametrize('record_points', [1, 7, 4000])
+def test_staking_matches_reference(record_points):
+    times, users, kinds, amounts = _staking_log()
+    rate_times, rates = [times[len(times) // 3]], [staking_simulator.REWARD_RATE // 2]
+    accounts, paid, mints = staking_simulator.simulate_reference(
+        times.tolist(), users.tolist(), kinds.tolist(), amounts.tolist(),
+        rate_times=rate_times, rates=rates)
+    trace = staking_simulator.simulate(times, users, kinds, amounts, rate_times=rate_times,
+                                       rates=rates, record_points=record_points)
+    ids = np.fromiter(accounts, dtype=np.int64)
+    assert trace.nft_mints == mints
+    assert trace.rewards_paid[-1] == pytest.approx(paid, rel=1e-9)
+    assert np.allclose(trace.state.staked[ids], [accounts[i]['staked'] for i in ids.tolist()])
+    assert np.allclose(trace.state.lifetime[ids],
+                       [accounts[i]['lifetime'] for i in ids.tolist()])
+    assert np.allclose(trace.state.rewards[ids], [accounts[i]['rewards'] for i in ids.tolist()])
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+import supply_simulator
+
+# simulate() against the event-at-a-time loop it replaces, on small seeded logs
+# that reach the edge cases: fee-exempt and zero addresses, the marketing wallet
+# on either side, fees that round to 0 wei and chunk boundaries mid-stream.
+# Run with `python -m pytest docs/visualizations`.
+
+
+def _supply_log(n=3000, seed=1):
+    """Transfers among 40 accounts, with mints, burns and the wallet (1) and exempt ids (2, 3)"""
+    rng = np.random.default_rng(seed)
+    senders, recipients, amounts = supply_simulator.synthetic_transfers(n, 40, seed)
+    senders[rng.random(n) < 0.05] = supply_simulator.ZERO_ADDRESS
+    recipients[rng.random(n) < 0.05] = supply_simulator.ZERO_ADDRESS
+    amounts[:, rng.random(n) < 0.05] = 0
+    amounts[:, :10] = supply_simulator.to_limbs(range(10))  # fees that round to 0 wei
+    return senders, recipients, amounts
+
+
+@pytest.mark.parametrize('chunk_size', [1, 97, 10**6])
+def test_supply_matches_reference(chunk_size):
+    senders, recipients, amounts = _supply_log()
+    excluded = (2, 3)
+    expected = supply_simulator.simulate_reference(
+        senders.tolist(), recipients.tolist(), supply_simulator.from_limbs(amounts), excluded)
+    trace = supply_simulator.simulate(senders, recipients, amounts, excluded,
+                                      chunk_size=chunk_size)
+    assert [trace.at(i) for i in range(len(trace))] == expected
+
+
+def test_supply_records_every_kth_step_and_the_last():
+    senders, recipients, amounts = _supply_log(1001)
+    expected = supply_simulator.simulate_reference(
+        senders.tolist(), recipients.tolist(), supply_simulator.from_limbs(amounts))
+    trace = supply_simulator.simulate(senders, recipients, amounts, record_every=100,
+                                      chunk_size=64)
+    assert trace.steps.tolist() == list(range(99, 1001, 100)) + [1000]
+    assert [trace.at(i) for i in range(len(trace))] == [expected[s] for s in trace.steps]
@@ -1,196 +1,194 @@
 import numpy as np
 import matplotlib.pyplot as plt
-import matplotlib.animation as animation
 from matplotlib.ticker import FuncFormatter
 import os
 
+import animation_engine
+import artifact_cache
+import chart_data
+import instrumentation
+import render_farm
+import streaming_writer
+import tokenomics_model as model
+from animation_engine import Scene, SplitTitle, StackedBands
+
 # Create output directory if it doesn't exist
 output_dir = os.path.dirname(os.path.abspath(__file__))
 os.makedirs(output_dir, exist_ok=True)
 
+NUM_FRAMES = 100
+
 def format_billions(x, pos):
     """Format large numbers in billions"""
     return f'{x/1e9:.1f}B'
 
-def animate_supply_burn():
-    """Animate the token supply reduction and burn process"""
+def supply_burn_scene(num_frames=NUM_FRAMES):
+    """Supply line and remaining/burned bands, one frame per transaction period"""
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 12))
-    initial_supply = 314159265359
-    burn_rate = 0.02
-    
-    # Initialize plots
-    transactions = np.linspace(0, 1000, 100)
-    supply = initial_supply * np.ones_like(transactions)
-    burned = np.zeros_like(transactions)
-    line1, = ax1.plot([], [], 'b-', linewidth=2)
-    stack = ax2.stackplot([], [], labels=['Remaining Supply', 'Burned Tokens'],
+    initial_supply = model.INITIAL_SUPPLY
+
+    # Every frame's curve comes from a single broadcasted evaluation
+    periods = np.arange(num_frames) / num_frames
+    transactions, supply_frames = model.supply_curves(periods, num_points=100)
+    _, burned_frames = model.burned_curves(periods, num_points=100)
+    layers = np.stack([supply_frames[0], burned_frames[0]])  # (2, frames, points)
+
+    # Static scaffolding, built once
+    line1, = ax1.plot(transactions, supply_frames[0, 0], 'b-', linewidth=2)
+    bands = StackedBands(ax2, transactions, labels=['Remaining Supply', 'Burned Tokens'],
                          colors=['#2ecc71', '#e74c3c'])
-    
-    def init():
-        ax1.set_xlim(0, 1000)
-        ax1.set_ylim(0, initial_supply * 1.1)
-        ax2.set_xlim(0, 1000)
-        ax2.set_ylim(0, initial_supply * 1.1)
-        return line1, stack
-    
-    def animate(frame):
-        current_supply = initial_supply * (1 - burn_rate) ** (transactions * frame/100)
-        current_burned = initial_supply - current_supply
-        
-        line1.set_data(transactions, current_supply)
-        
-        # Update stackplot
-        ax2.clear()
-        ax2.stackplot(transactions, [current_supply, current_burned],
-                     labels=['Remaining Supply', 'Burned Tokens'],
-                     colors=['#2ecc71', '#e74c3c'])
-        
-        # Update labels and formatting
-        ax1.set_title('MemePi Supply Dynamics')
-        ax1.set_xlabel('Number of Transactions (thousands)')
-        ax1.set_ylabel('Total Supply')
-        ax1.yaxis.set_major_formatter(FuncFormatter(format_billions))
-        ax1.grid(True, alpha=0.3)
-        
-        ax2.set_title('Token Distribution')
-        ax2.set_xlabel('Number of Transactions (thousands)')
-        ax2.set_ylabel('Token Amount')
-        ax2.yaxis.set_major_formatter(FuncFormatter(format_billions))
-        ax2.grid(True, alpha=0.3)
-        ax2.legend()
-        
-        plt.tight_layout()
-        return line1, stack
-    
-    anim = animation.FuncAnimation(fig, animate, init_func=init, frames=100,
-                                 interval=50, blit=True)
-    anim.save(os.path.join(output_dir, 'supply_burn_animation.gif'),
-             writer='pillow', fps=20)
-    plt.close()
-
-def animate_price_impact():
-    """Animate the price impact function with varying transaction sizes"""
-    fig, ax = plt.subplots(figsize=(10, 6))
-    volume_to_liquidity = np.linspace(0, 5, 1000)
-    k = np.pi/2
-    impact = k * np.arctan(volume_to_liquidity)
-    
-    line, = ax.plot([], [], 'r-', linewidth=2, alpha=0.3)
-    point, = ax.plot([], [], 'bo', markersize=10)
-    max_line = ax.axhline(y=np.pi/2, color='g', linestyle='--', alpha=0.5,
-                         label='Maximum Impact (π/2)')
-    
-    def init():
-        line.set_data([], [])
-        point.set_data([], [])
-        ax.set_xlim(0, 5)
-        ax.set_ylim(0, 2)
-        return line, point, max_line
-    
-    def animate(frame):
-        current_volume = frame * 5 / 100
-        current_impact = k * np.arctan(current_volume)
-        
-        line.set_data(volume_to_liquidity, impact)
-        point.set_data([current_volume], [current_impact])
-        
-        ax.set_title('MemePi Price Impact Model')
-        ax.set_xlabel('Transaction Volume / Liquidity Pool Size')
-        ax.set_ylabel('Price Impact')
+    for ax, title in ((ax1, 'MemePi Supply Dynamics'), (ax2, 'Token Distribution')):
+        ax.set_xlim(0, 1000)
+        ax.set_ylim(0, initial_supply * 1.1)
+        ax.set_title(title)
+        ax.set_xlabel('Number of Transactions (thousands)')
+        ax.yaxis.set_major_formatter(FuncFormatter(format_billions))
         ax.grid(True, alpha=0.3)
-        ax.legend()
-        
-        return line, point, max_line
-    
-    anim = animation.FuncAnimation(fig, animate, init_func=init, frames=100,
-                                 interval=50, blit=True)
-    anim.save(os.path.join(output_dir, 'price_impact_animation.gif'),
-             writer='pillow', fps=20)
-    plt.close()
-
-def animate_governance_weight():
-    """Animate governance weight changes over time"""
+    ax1.set_ylabel('Total Supply')
+    ax2.set_ylabel('Token Amount')
+    legend = ax2.legend()
+    fig.tight_layout()
+
+    def update(frame):
+        line1.set_ydata(supply_frames[0, frame])
+        bands.update(layers[:, frame])
+
+    # The legend is redrawn after the bands so it stays on top of them
+    return Scene(fig, [line1] + bands.polygons + [legend], update, range(num_frames))
+
+def price_impact_scene(num_frames=NUM_FRAMES):
+    """Point moving along the price impact curve"""
     fig, ax = plt.subplots(figsize=(10, 6))
-    balances = np.linspace(0, 1000000, 1000)
-    line, = ax.plot([], [], 'b-', linewidth=2)
-    
-    def init():
-        line.set_data([], [])
-        ax.set_xlim(0, 1000000)
-        ax.set_ylim(0, 1000000)
-        return (line,)
-    
-    def animate(frame):
-        holding_time = frame * 365 / 100  # Animate up to 365 days
-        weight = balances * np.sqrt(holding_time/np.pi)
-        
-        line.set_data(balances, weight)
-        
-        ax.set_title(f'MemePi Governance Weight (Holding Time: {holding_time:.1f} days)')
-        ax.set_xlabel('Token Balance')
-        ax.set_ylabel('Voting Power')
-        ax.grid(True, alpha=0.3)
-        
-        return (line,)
-    
-    anim = animation.FuncAnimation(fig, animate, init_func=init, frames=100,
-                                 interval=50, blit=True)
-    anim.save(os.path.join(output_dir, 'governance_weight_animation.gif'),
-             writer='pillow', fps=20)
-    plt.close()
-
-def animate_transaction_rate():
-    """Animate transaction rate limits over a day"""
+    volume_to_liquidity, impact = model.impact_curves()
+    volumes = np.arange(num_frames) * 5 / num_frames
+    impacts = model.price_impact(volumes)
+
+    ax.plot(volume_to_liquidity, impact[0], 'r-', linewidth=2, alpha=0.3)
+    point, = ax.plot([volumes[0]], [impacts[0]], 'bo', markersize=10)
+    ax.axhline(y=np.pi/2, color='g', linestyle='--', alpha=0.5,
+               label='Maximum Impact (π/2)')
+    ax.set_xlim(0, 5)
+    ax.set_ylim(0, 2)
+    ax.set_title('MemePi Price Impact Model')
+    ax.set_xlabel('Transaction Volume / Liquidity Pool Size')
+    ax.set_ylabel('Price Impact')
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+
+    def update(frame):
+        point.set_data(volumes[frame:frame + 1], impacts[frame:frame + 1])
+
+    return Scene(fig, [point], update, range(num_frames))
+
+def governance_weight_scene(num_frames=NUM_FRAMES):
+    """Voting power line as holding time grows to a year"""
     fig, ax = plt.subplots(figsize=(10, 6))
-    hours = np.linspace(0, 24, 1000)
-    max_tx_per_hour = 11.46
-    
-    line, = ax.plot([], [], 'b-', linewidth=2, alpha=0.3)
-    point, = ax.plot([], [], 'ro', markersize=10)
-    
-    def init():
-        line.set_data([], [])
-        point.set_data([], [])
-        ax.set_xlim(0, 24)
-        ax.set_ylim(0, max_tx_per_hour * 24 * 1.1)
-        return line, point
-    
-    def animate(frame):
-        current_hour = frame * 24 / 100
-        tx_limit = np.minimum(hours * max_tx_per_hour,
-                            hours * 0 + 24 * max_tx_per_hour)
-        current_limit = min(current_hour * max_tx_per_hour,
-                          24 * max_tx_per_hour)
-        
-        line.set_data(hours, tx_limit)
-        point.set_data([current_hour], [current_limit])
-        
-        ax.set_title(f'MemePi Transaction Rate (Hour: {current_hour:.1f})')
-        ax.set_xlabel('Time (hours)')
-        ax.set_ylabel('Cumulative Transactions Allowed')
-        ax.grid(True, alpha=0.3)
-        
-        return line, point
-    
-    anim = animation.FuncAnimation(fig, animate, init_func=init, frames=100,
-                                 interval=50, blit=True)
-    anim.save(os.path.join(output_dir, 'transaction_rate_animation.gif'),
-             writer='pillow', fps=20)
-    plt.close()
+    holding_times = np.arange(num_frames) * 365 / num_frames  # Animate up to 365 days
+    balances, weights = model.governance_curves(holding_times)
+
+    line, = ax.plot(balances, weights[0], 'b-', linewidth=2)
+    ax.set_xlim(0, 1000000)
+    ax.set_ylim(0, 1000000)
+    tails = [f'{days:.1f} days)' for days in holding_times]
+    title = SplitTitle(ax, 'MemePi Governance Weight (Holding Time: ', max(tails, key=len))
+    ax.set_xlabel('Token Balance')
+    ax.set_ylabel('Voting Power')
+    ax.grid(True, alpha=0.3)
+
+    def update(frame):
+        line.set_ydata(weights[frame])
+        title.set_text(tails[frame])
+
+    return Scene(fig, [line, title.tail], update, range(num_frames))
+
+def transaction_rate_scene(num_frames=NUM_FRAMES):
+    """Point moving along the cumulative transaction limit over a day"""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    max_tx_per_hour = model.MAX_TX_PER_HOUR
+    hours, tx_limit = model.rate_curves(max_tx_per_hour)
+    current_hours = np.arange(num_frames) * 24 / num_frames
+    current_limits = model.transaction_limit(current_hours, max_tx_per_hour)
+
+    ax.plot(hours, tx_limit[0], 'b-', linewidth=2, alpha=0.3)
+    point, = ax.plot([current_hours[0]], [current_limits[0]], 'ro', markersize=10)
+    ax.set_xlim(0, 24)
+    ax.set_ylim(0, max_tx_per_hour * 24 * 1.1)
+    tails = [f'{hour:.1f})' for hour in current_hours]
+    title = SplitTitle(ax, 'MemePi Transaction Rate (Hour: ', max(tails, key=len))
+    ax.set_xlabel('Time (hours)')
+    ax.set_ylabel('Cumulative Transactions Allowed')
+    ax.grid(True, alpha=0.3)
+
+    def update(frame):
+        point.set_data(current_hours[frame:frame + 1], current_limits[frame:frame + 1])
+        title.set_text(tails[frame])
+
+    return Scene(fig, [point, title.tail], update, range(num_frames))
+
+def animate_supply_burn(output=None, num_frames=NUM_FRAMES, dpi=None):
+    """Animate the token supply reduction and burn process"""
+    scene = supply_burn_scene(num_frames)
+    animation_engine.save(scene, output or os.path.join(output_dir, 'supply_burn_animation.gif'),
+                          fps=20, dpi=dpi)
+    plt.close(scene.fig)
+
+def animate_price_impact(output=None, num_frames=NUM_FRAMES, dpi=None):
+    """Animate the price impact function with varying transaction sizes"""
+    scene = price_impact_scene(num_frames)
+    animation_engine.save(scene, output or os.path.join(output_dir, 'price_impact_animation.gif'),
+                          fps=20, dpi=dpi)
+    plt.close(scene.fig)
+
+def animate_governance_weight(output=None, num_frames=NUM_FRAMES, dpi=None):
+    """Animate governance weight changes over time"""
+    scene = governance_weight_scene(num_frames)
+    animation_engine.save(scene, output or os.path.join(output_dir, 'governance_weight_animation.gif'),
+                          fps=20, dpi=dpi)
+    plt.close(scene.fig)
+
+def animate_transaction_rate(output=None, num_frames=NUM_FRAMES, dpi=None):
+    """Animate transaction rate limits over a day"""
+    scene = transaction_rate_scene(num_frames)
+    animation_engine.save(scene, output or os.path.join(output_dir, 'transaction_rate_animation.gif'),
+                          fps=20, dpi=dpi)
+    plt.close(scene.fig)
+
+def animation_jobs(fmt='gif', num_frames=NUM_FRAMES, dpi=None):
+    """Render jobs for the four animations, one process each"""
+    ext = streaming_writer.extension_for(fmt)
+    return [
+        render_farm.make_job(animate, os.path.join(output_dir, f'{name}_animation.{ext}'),
+                             num_frames=num_frames, dpi=dpi)
+        for name, animate in (('supply_burn', animate_supply_burn),
+                              ('price_impact', animate_price_impact),
+                              ('governance_weight', animate_governance_weight),
+                              ('transaction_rate', animate_transaction_rate))
+    ]
 
 if __name__ == "__main__":
-    print("Generating animations... This may take a few minutes.")
-    
-    print("1/4: Creating supply and burn animation...")
-    animate_supply_burn()
-    
-    print("2/4: Creating price impact animation...")
-    animate_price_impact()
-    
-    print("3/4: Creating governance weight animation...")
-    animate_governance_weight()
-    
-    print("4/4: Creating transaction rate animation...")
-    animate_transaction_rate()
-    
-    print("All animations have been generated in the visualizations directory!")
+    parser = render_farm.make_parser("Generate MemePi tokenomics animations")
+    parser.add_argument('--format', choices=streaming_writer.FORMATS + ('data',), default='gif',
+                        help='animation format (mp4 and webm need ffmpeg; data writes the '
+                             'series for docs/script.js to animate instead; default: gif)')
+    parser.add_argument('--frames', type=int, default=NUM_FRAMES,
+                        help=f'frames per animation (default: {NUM_FRAMES})')
+    parser.add_argument('--dpi', type=float, default=None,
+                        help='render resolution (default: figure dpi)')
+    args = parser.parse_args()
+    if args.format == 'data':
+        index = chart_data.export(output_dir, args.frames)
+        size = sum(entry['bytes'] for entry in index['series'].values())
+        print(f"Wrote {chart_data.DATA_NAME} ({size} bytes) and {chart_data.INDEX_NAME}; "
+              "docs/script.js animates them in the browser")
+    else:
+        print("Generating animations... This may take a few minutes.")
+
+        # The four animations are independent and render concurrently
+        cache = artifact_cache.ArtifactCache(output_dir, force=args.force)
+        report = instrumentation.from_args(args, 'tokenomics_animator', output_dir)
+        render_farm.render(animation_jobs(args.format, args.frames, args.dpi), args.workers,
+                           cache, report)
+        print(cache.summary())
+        report.finish()
+
+        print("All animations have been generated in the visualizations directory!")
@@ -0,0 +1,125 @@
+import numpy as np
+from functools import lru_cache
+
+# Model parameters shared by every visualizer script
+INITIAL_SUPPLY = 314159265359
+BURN_RATE = 0.02
+MARKETING_RATE = 0.01
+IMPACT_SCALE = np.pi / 2
+MAX_TX_PER_HOUR = 11.46
+HOLDING_TIMES = (30, 90, 180, 365)  # days
+
+
+def _as_key(values):
+    """Turn a scalar or array-like into a hashable tuple of floats"""
+    return tuple(float(v) for v in np.atleast_1d(values))
+
+
+def _frozen(array):
+    """Mark a cached array read-only so callers cannot corrupt the cache"""
+    array.setflags(write=False)
+    return array
+
+
+@lru_cache(maxsize=None)
+def axis(start, stop, num_points):
+    """Cached np.linspace shared by all curves on the same grid"""
+    return _frozen(np.linspace(start, stop, num_points))
+
+
+@lru_cache(maxsize=None)
+def _supply_grid(burn_rates, scales, start, stop, num_points, initial_supply):
+    transactions = axis(start, stop, num_points)
+    # (1 - b) ** (x * s) == exp(log1p(-b) * s * x), broadcast over all three axes
+    log_decay = np.log1p(-np.array(burn_rates))[:, None, None]
+    exponent = np.array(scales)[None, :, None] * transactions[None, None, :]
+    return _frozen(initial_supply * np.exp(log_decay * exponent))
+
+
+def supply_curves(scales=1.0, burn_rates=BURN_RATE, start=0, stop=1000,
+                  num_points=1000, initial_supply=INITIAL_SUPPLY):
+    """Supply S0 * (1-b)^(n*s) for every burn rate b and scale s.
+
+    Returns the transaction axis and an array shaped
+    (len(burn_rates), len(scales), num_points).
+    """
+    transactions = axis(start, stop, num_points)
+    supply = _supply_grid(_as_key(burn_rates), _as_key(scales), start, stop,
+                          num_points, initial_supply)
+    return transactions, supply
+
+
+@lru_cache(maxsize=None)
+def _burned_grid(burn_rates, scales, start, stop, num_points, initial_supply):
+    supply = _supply_grid(burn_rates, scales, start, stop, num_points, initial_supply)
+    return _frozen(initial_supply - supply)
+
+
+def burned_curves(scales=1.0, burn_rates=BURN_RATE, start=0, stop=1000,
+                  num_points=1000, initial_supply=INITIAL_SUPPLY):
+    """Cumulative burned amount S0 - S, shaped like supply_curves"""
+    transactions = axis(start, stop, num_points)
+    burned = _burned_grid(_as_key(burn_rates), _as_key(scales), start, stop,
+                          num_points, initial_supply)
+    return transactions, burned
+
+
+def price_impact(volume_to_liquidity, k=IMPACT_SCALE):
+    """Price impact I(v) = k * arctan(v/L), vectorized over any shape"""
+    return k * np.arctan(volume_to_liquidity)
+
+
+@lru_cache(maxsize=None)
+def _impact_grid(scales, start, stop, num_points):
+    ratio = axis(start, stop, num_points)
+    return _frozen(price_impact(ratio[None, :], np.array(scales)[:, None]))
+
+
+def impact_curves(k=IMPACT_SCALE, start=0, stop=5, num_points=1000):
+    """Price impact curves for one or more scale factors k"""
+    ratio = axis(start, stop, num_points)
+    return ratio, _impact_grid(_as_key(k), start, stop, num_points)
+
+
+def governance_weight(balances, holding_times):
+    """Voting power Balance * sqrt(t/pi) broadcast over holding times x balances"""
+    factor = np.sqrt(np.atleast_1d(np.asarray(holding_times, dtype=float)) / np.pi)
+    return factor[:, None] * np.asarray(balances, dtype=float)[None, :]
+
+
+@lru_cache(maxsize=None)
+def _governance_grid(holding_times, start, stop, num_points):
+    balances = axis(start, stop, num_points)
+    return _frozen(governance_weight(balances, holding_times))
+
+
+def governance_curves(holding_times=HOLDING_TIMES, start=0, stop=1000000,
+                      num_points=1000):
+    """Voting power curves shaped (len(holding_times), num_points)"""
+    balances = axis(start, stop, num_points)
+    return balances, _governance_grid(_as_key(holding_times), start, stop, num_points)
+
+
+def transaction_limit(hours, max_tx_per_hour=MAX_TX_PER_HOUR):
+    """Cumulative transactions allowed after the given hours, capped at one day"""
+    hours = np.asarray(hours, dtype=float)
+    return np.minimum(hours * max_tx_per_hour, 24 * max_tx_per_hour)
+
+
+@lru_cache(maxsize=None)
+def _rate_grid(rates, start, stop, num_points):
+    hours = axis(start, stop, num_points)
+    return _frozen(transaction_limit(hours[None, :], np.array(rates)[:, None]))
+
+
+def rate_curves(max_tx_per_hour=MAX_TX_PER_HOUR, start=0, stop=24, num_points=1000):
+    """Transaction limit curves shaped (len(max_tx_per_hour), num_points)"""
+    hours = axis(start, stop, num_points)
+    return hours, _rate_grid(_as_key(max_tx_per_hour), start, stop, num_points)
+
+
+def clear_cache():
+    """Drop every cached curve, e.g. after changing model constants"""
+    for cached in (axis, _supply_grid, _burned_grid, _impact_grid,
+                   _governance_grid, _rate_grid):
+        cached.cache_clear()
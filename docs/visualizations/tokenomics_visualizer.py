@@ -1,8 +1,21 @@
+import argparse
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.ticker import FuncFormatter
 import os
 
+import amm_simulator
+import chain_store
+import downsample
+import event_aggregator
+import farming_simulator
+import instrumentation
+import monte_carlo
+import rate_limit_engine
+import staking_simulator
+import svg_optimizer
+import tokenomics_model as model
+
 # Create output directory if it doesn't exist
 output_dir = os.path.dirname(os.path.abspath(__file__))
 os.makedirs(output_dir, exist_ok=True)
@@ -11,48 +24,73 @@ def format_billions(x, pos):
     """Format large numbers in billions"""
     return f'{x/1e9:.1f}B'
 
-def plot_supply_dynamics():
-    """Visualize token supply reduction over time"""
-    initial_supply = 314159265359
-    burn_rate = 0.02
-    transactions = np.linspace(0, 1000, 1000)
-    supply = initial_supply * (1 - burn_rate) ** transactions
+def plot_supply_dynamics(series=None):
+    """Visualize token supply reduction over time.
 
+    series is an optional (timestamps, supply, burned) tuple of observed
+    data, from chain_store.supply_series or event_aggregator, plotted in
+    place of the model curve.
+    """
     plt.figure(figsize=(10, 6))
-    plt.plot(transactions, supply, 'b-', linewidth=2)
+    if series is None:
+        transactions, supply = model.supply_curves()
+        downsample.plot(plt.gca(), transactions, supply[0, 0], 'b-', linewidth=2)
+        plt.xlabel('Number of Transactions (thousands)')
+    else:
+        times, supply, _ = series
+        downsample.plot(plt.gca(), times.astype('datetime64[s]'), supply, 'b-', linewidth=2)
+        plt.xlabel('Block Time (UTC)')
     plt.gca().yaxis.set_major_formatter(FuncFormatter(format_billions))
     plt.title('MemePi Supply Dynamics Over Transactions')
-    plt.xlabel('Number of Transactions (thousands)')
     plt.ylabel('Total Supply')
     plt.grid(True, alpha=0.3)
     plt.savefig(os.path.join(output_dir, 'supply_dynamics.svg'), format='svg', bbox_inches='tight')
     plt.close()
 
-def plot_price_impact():
-    """Visualize price impact function"""
-    volume_to_liquidity = np.linspace(0, 5, 1000)
-    k = np.pi/2
-    impact = k * np.arctan(volume_to_liquidity)
+def plot_price_impact(empirical=None):
+    """Visualize price impact function.
+
+    empirical is an optional amm_simulator.ImpactCurves, drawn over the
+    model curve.
+    """
+    volume_to_liquidity, impact = model.impact_curves()
+    impact = impact[0]
 
     plt.figure(figsize=(10, 6))
-    plt.plot(volume_to_liquidity, impact, 'r-', linewidth=2)
+    plt.plot(volume_to_liquidity, impact, 'r-', linewidth=2,
+             label='Model' if empirical is not None else None)
     plt.axhline(y=np.pi/2, color='g', linestyle='--', alpha=0.5, label='Maximum Impact (π/2)')
+    if empirical is not None:
+        plt.plot(empirical.ratio, empirical.sell, 'b-', linewidth=2, label='x·y=k Sell: Price Drop')
+        plt.plot(empirical.ratio, empirical.sell_cost, 'b:', linewidth=2,
+                 label='x·y=k Sell: Shortfall incl. Fees')
+        plt.plot(empirical.buy_ratio, empirical.buy, 'm-', linewidth=2,
+                 label='x·y=k Buy: Price Rise')
+        if empirical.trades is not None:
+            for (ratio, moves), style, side in zip(empirical.trades.values(), ('bo', 'mo'),
+                                                   ('Sells', 'Buys')):
+                plt.plot(ratio, moves, style, markersize=4, label=f'Simulated {side} (median)')
+        plt.plot(empirical.ratio, empirical.fitted_k * np.arctan(empirical.ratio), 'c--',
+                 linewidth=1.5, label=f'Fitted k = {empirical.fitted_k:.3f}')
+        plt.ylim(0, impact.max() * 1.1)
     plt.title('MemePi Price Impact Model')
     plt.xlabel('Transaction Volume / Liquidity Pool Size')
     plt.ylabel('Price Impact')
     plt.grid(True, alpha=0.3)
-    plt.legend()
+    if empirical is None:
+        plt.legend()
+    else:
+        plt.legend(loc='upper left', bbox_to_anchor=(1.01, 1))
     plt.savefig(os.path.join(output_dir, 'price_impact.svg'), format='svg', bbox_inches='tight')
     plt.close()
 
 def plot_governance_weight():
     """Visualize governance weight calculation"""
-    balances = np.linspace(0, 1000000, 1000)
-    holding_times = np.array([30, 90, 180, 365])  # days
+    holding_times = model.HOLDING_TIMES  # days
+    balances, weights = model.governance_curves(holding_times)
 
     plt.figure(figsize=(10, 6))
-    for time in holding_times:
-        weight = balances * np.sqrt(time/np.pi)
+    for time, weight in zip(holding_times, weights):
         plt.plot(balances, weight, label=f'{time} days', linewidth=2)
 
     plt.title('MemePi Governance Weight by Balance and Holding Time')
@@ -63,24 +101,27 @@ def plot_governance_weight():
     plt.savefig(os.path.join(output_dir, 'governance_weight.svg'), format='svg', bbox_inches='tight')
     plt.close()
 
-def plot_burn_distribution():
-    """Visualize cumulative burn effect"""
-    transactions = np.linspace(0, 1000, 1000)
-    initial_supply = 314159265359
-    burn_rate = 0.02
-    
-    remaining_supply = initial_supply * (1 - burn_rate) ** transactions
-    burned_amount = initial_supply - remaining_supply
+def plot_burn_distribution(series=None):
+    """Visualize cumulative burn effect, from the model or a (timestamps, supply, burned) tuple"""
+    if series is None:
+        transactions, remaining_supply = model.supply_curves()
+        _, burned_amount = model.burned_curves()
+        remaining_supply, burned_amount = remaining_supply[0, 0], burned_amount[0, 0]
+        xlabel = 'Number of Transactions (thousands)'
+    else:
+        times, remaining_supply, burned_amount = series
+        transactions = times.astype('datetime64[s]')
+        xlabel = 'Block Time (UTC)'
 
     plt.figure(figsize=(10, 6))
-    plt.stackplot(transactions, 
-                 [remaining_supply, burned_amount],
-                 labels=['Remaining Supply', 'Burned Tokens'],
-                 colors=['#2ecc71', '#e74c3c'])
+    downsample.stackplot(plt.gca(), transactions,
+                         [remaining_supply, burned_amount],
+                         labels=['Remaining Supply', 'Burned Tokens'],
+                         colors=['#2ecc71', '#e74c3c'])
     
     plt.gca().yaxis.set_major_formatter(FuncFormatter(format_billions))
     plt.title('MemePi Token Distribution Over Time')
-    plt.xlabel('Number of Transactions (thousands)')
+    plt.xlabel(xlabel)
     plt.ylabel('Token Amount')
     plt.grid(True, alpha=0.3)
     plt.legend()
@@ -89,13 +130,12 @@ def plot_burn_distribution():
 
 def plot_transaction_rate():
     """Visualize transaction rate limits"""
-    hours = np.linspace(0, 24, 1000)
-    max_tx_per_hour = 11.46
-    tx_limit = np.minimum(hours * max_tx_per_hour, hours * 0 + 24 * max_tx_per_hour)
+    hours, tx_limit = model.rate_curves()
+    tx_limit = tx_limit[0]
 
     plt.figure(figsize=(10, 6))
-    plt.plot(hours, tx_limit, 'b-', linewidth=2)
-    plt.fill_between(hours, tx_limit, alpha=0.2)
+    downsample.plot(plt.gca(), hours, tx_limit, 'b-', linewidth=2)
+    downsample.fill_between(plt.gca(), hours, tx_limit, alpha=0.2)
     plt.title('MemePi Maximum Transaction Rate')
     plt.xlabel('Time (hours)')
     plt.ylabel('Cumulative Transactions Allowed')
@@ -103,10 +143,300 @@ def plot_transaction_rate():
     plt.savefig(os.path.join(output_dir, 'transaction_rate.svg'), format='svg', bbox_inches='tight')
     plt.close()
 
+def _rate_limit_report():
+    """A synthetic week of transfers replayed under the rate limit rules"""
+    return rate_limit_engine.replay(*rate_limit_engine.synthetic_log(2_000_000, 300_000))
+
+def plot_rate_limit_rejections(report=None):
+    """Rejected transfers per rule, by UTC hour of day and over the replayed log"""
+    if report is None:
+        report = _rate_limit_report()
+    colors = {'cooldown': 'b', 'daily': 'r', 'combined': 'g'}
+    width = 0.8 / len(rate_limit_engine.RULES)
+
+    fig, (by_hour, over_time) = plt.subplots(2, 1, figsize=(10, 9))
+    for i, rule in enumerate(rate_limit_engine.RULES):
+        by_hour.bar(np.arange(24) + (i - 1) * width, report.by_hour_of_day[i], width,
+                    color=colors[rule], alpha=0.7,
+                    label=f'{rule.capitalize()} ({report.rejected[rule]:,})')
+        downsample.plot(over_time, report.hours.astype('datetime64[s]'), report.per_hour[i],
+                        color=colors[rule], linewidth=1, label=rule.capitalize())
+    by_hour.set_title('MemePi Rate Limit Rejections by Hour')
+    by_hour.set_xlabel('Hour of Day (UTC)')
+    by_hour.set_ylabel('Rejected Transfers')
+    by_hour.set_xticks(range(0, 24, 2))
+    by_hour.legend()
+    by_hour.grid(True, alpha=0.3)
+    over_time.set_xlabel('Time')
+    over_time.set_ylabel('Rejected Transfers per Hour')
+    over_time.tick_params(axis='x', labelrotation=30)
+    over_time.legend()
+    over_time.grid(True, alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(os.path.join(output_dir, 'rate_limit_rejections.svg'), format='svg',
+                bbox_inches='tight')
+    plt.close(fig)
+
+def _fan(ax, x, bands, color, label):
+    """Shade nested percentile bands around the median"""
+    qs = sorted(bands)
+    for lo, hi in zip(qs, reversed(qs)):
+        if lo >= hi:
+            break
+        downsample.fill_between(ax, x, bands[lo], bands[hi], color=color, alpha=0.2,
+                                linewidth=0, label=f'{lo}–{hi}th percentile')
+    downsample.plot(ax, x, bands[50], color=color, linewidth=2, label=f'Median {label}')
+
+def plot_supply_fan_chart(result=None):
+    """Visualize Monte Carlo supply percentile bands under random volumes"""
+    if result is None:
+        result = monte_carlo.run(monte_carlo.LogNormal(model.INITIAL_SUPPLY / 50), paths=10000)
+
+    plt.figure(figsize=(10, 6))
+    _fan(plt.gca(), result.steps, result.supply_bands(), '#3498db', 'supply')
+    plt.gca().yaxis.set_major_formatter(FuncFormatter(format_billions))
+    plt.title(f'MemePi Supply Under Random Transfer Volumes ({result.paths:,} paths)')
+    plt.xlabel('Number of Transactions (thousands)')
+    plt.ylabel('Total Supply')
+    plt.grid(True, alpha=0.3)
+    plt.legend()
+    plt.savefig(os.path.join(output_dir, 'supply_fan_chart.svg'), format='svg', bbox_inches='tight')
+    plt.close()
+
+def plot_burn_fan_chart(result=None):
+    """Visualize Monte Carlo bands of the cumulative burn"""
+    if result is None:
+        result = monte_carlo.run(monte_carlo.LogNormal(model.INITIAL_SUPPLY / 50), paths=10000)
+
+    plt.figure(figsize=(10, 6))
+    _fan(plt.gca(), result.steps, result.burned_bands(), '#e74c3c', 'burned')
+    plt.axhline(y=result.initial_supply, color='g', linestyle='--', alpha=0.5,
+                label='Initial Supply')
+    plt.gca().yaxis.set_major_formatter(FuncFormatter(format_billions))
+    plt.title(f'MemePi Cumulative Burn Under Random Transfer Volumes ({result.paths:,} paths)')
+    plt.xlabel('Number of Transactions (thousands)')
+    plt.ylabel('Burned Tokens')
+    plt.grid(True, alpha=0.3)
+    plt.legend()
+    plt.savefig(os.path.join(output_dir, 'burn_fan_chart.svg'), format='svg', bbox_inches='tight')
+    plt.close()
+
+def plot_governance_concentration(table):
+    """Visualize how concentrated voting power is across a holder snapshot"""
+    population, power_share = table.lorenz()
+
+    plt.figure(figsize=(10, 6))
+    plt.plot(population * 100, power_share * 100, 'b-', linewidth=2, label='Voting Power')
+    plt.plot([0, 100], [0, 100], color='g', linestyle='--', alpha=0.5, label='Perfect Equality')
+    plt.title(f'MemePi Voting Power Distribution ({len(table):,} holders, '
+              f'Gini {table.gini():.2f}, Nakamoto {table.nakamoto():,})')
+    plt.xlabel('Holders, Least to Most Powerful (%)')
+    plt.ylabel('Cumulative Voting Power (%)')
+    plt.grid(True, alpha=0.3)
+    plt.legend()
+    plt.savefig(os.path.join(output_dir, 'governance_concentration.svg'), format='svg', bbox_inches='tight')
+    plt.close()
+
+def _staking_trace():
+    """One year of synthetic MemePiStaking activity"""
+    return staking_simulator.simulate(*staking_simulator.synthetic_events(1_000_000, 100_000))
+
+def plot_staking_rewards(trace=None):
+    """Visualize total stake against rewards paid and still accruing"""
+    if trace is None:
+        trace = _staking_trace()
+    dates = trace.times.astype('datetime64[s]')
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    downsample.plot(ax, dates, trace.total_staked, 'b-', linewidth=2, label='Total Staked')
+    ax.set_xlabel('Time')
+    ax.set_ylabel('Total Staked (tokens)')
+    rewards = ax.twinx()
+    downsample.stackplot(rewards, dates, [trace.rewards_paid, trace.accrued],
+                         labels=['Rewards Paid', 'Accrued, Unclaimed'],
+                         colors=['#2ecc71', '#f1c40f'], alpha=0.5)
+    rewards.set_ylabel('Rewards (tokens)')
+    ax.set_title(f'MemePi Staking Rewards ({len(trace.state.staked):,} users)')
+    ax.grid(True, alpha=0.3)
+    handles = ax.get_legend_handles_labels()
+    extra = rewards.get_legend_handles_labels()
+    ax.legend(handles[0] + extra[0], handles[1] + extra[1], loc='upper left')
+    fig.savefig(os.path.join(output_dir, 'staking_rewards.svg'), format='svg', bbox_inches='tight')
+    plt.close(fig)
+
+def plot_nft_tiers(trace=None):
+    """Visualize how many stakers have reached each NFT threshold"""
+    if trace is None:
+        trace = _staking_trace()
+    dates = trace.times.astype('datetime64[s]')
+
+    plt.figure(figsize=(10, 6))
+    for level, users in zip(trace.thresholds, trace.tier_users):
+        downsample.step(plt.gca(), dates, users, where='post', linewidth=2,
+                        label=f'Lifetime Staked ≥ {level:,.0f}')
+    plt.title(f'MemePi Staking NFT Tiers ({trace.nft_mints:,} mints)')
+    plt.xlabel('Time')
+    plt.ylabel('Users')
+    plt.grid(True, alpha=0.3)
+    plt.legend()
+    plt.savefig(os.path.join(output_dir, 'nft_tiers.svg'), format='svg', bbox_inches='tight')
+    plt.close()
+
+def plot_staking_reward_distribution(trace=None):
+    """Visualize the spread of rewards earned per staker"""
+    if trace is None:
+        trace = _staking_trace()
+    rewards = trace.state.rewards[trace.state.rewards > 0]
+
+    plt.figure(figsize=(10, 6))
+    if len(rewards):
+        bins = np.logspace(np.log10(rewards.min()), np.log10(rewards.max()), 60)
+        plt.hist(rewards, bins=bins, color='#9b59b6', alpha=0.8)
+        plt.axvline(np.median(rewards), color='g', linestyle='--', alpha=0.5,
+                    label=f'Median {np.median(rewards):,.2f}')
+        plt.legend()
+    plt.xscale('log')
+    plt.title('MemePi Staking Rewards per User')
+    plt.xlabel('Rewards Received (tokens)')
+    plt.ylabel('Users')
+    plt.grid(True, alpha=0.3)
+    plt.savefig(os.path.join(output_dir, 'staking_reward_distribution.svg'), format='svg',
+                bbox_inches='tight')
+    plt.close()
+
+def _farm_trace():
+    """Three years of synthetic MemePiFarming activity over four pools"""
+    return farming_simulator.simulate(*farming_simulator.synthetic_events(1_000_000),
+                                      alloc_points=(40, 30, 20, 10))
+
+def plot_farming_emissions(trace=None):
+    """Visualize cumulative farming emissions split by pool"""
+    if trace is None:
+        trace = _farm_trace()
+
+    plt.figure(figsize=(10, 6))
+    downsample.stackplot(plt.gca(), trace.times.astype('datetime64[s]'), trace.emitted,
+                         labels=[f'Pool {pid}' for pid in range(len(trace.emitted))])
+    plt.gca().yaxis.set_major_formatter(FuncFormatter(lambda x, pos: f'{x/1e6:.0f}M'))
+    plt.title('MemePi Farming Emissions by Pool')
+    plt.xlabel('Time')
+    plt.ylabel('Cumulative Rewards Emitted (MEPI)')
+    plt.grid(True, alpha=0.3)
+    plt.legend(loc='upper left')
+    plt.savefig(os.path.join(output_dir, 'farming_emissions.svg'), format='svg', bbox_inches='tight')
+    plt.close()
+
+def plot_farming_apr(trace=None):
+    """Visualize each pool's APR as deposits and emission settings change"""
+    if trace is None:
+        trace = _farm_trace()
+    dates = trace.times.astype('datetime64[s]')
+
+    plt.figure(figsize=(10, 6))
+    for pid, apr in enumerate(trace.apr):
+        downsample.plot(plt.gca(), dates, apr * 100, linewidth=2, label=f'Pool {pid}')
+    plt.yscale('log')
+    plt.title('MemePi Farming APR (1 LP = 1 MEPI)')
+    plt.xlabel('Time')
+    plt.ylabel('APR (%)')
+    plt.grid(True, alpha=0.3, which='both')
+    plt.legend()
+    plt.savefig(os.path.join(output_dir, 'farming_apr.svg'), format='svg', bbox_inches='tight')
+    plt.close()
+
+def plot_farming_pools(trace=None):
+    """One panel per pool: LP staked against that pool's emission rate"""
+    if trace is None:
+        trace = _farm_trace()
+    dates = trace.times.astype('datetime64[s]')
+    num_pools = len(trace.lp)
+    cols = min(num_pools, 2)
+    rows = -(-num_pools // cols)
+
+    fig, axes = plt.subplots(rows, cols, figsize=(6 * cols, 4 * rows), squeeze=False,
+                             sharex=True)
+    for pid, ax in enumerate(axes.flat):
+        if pid >= num_pools:
+            ax.set_visible(False)
+            continue
+        downsample.plot(ax, dates, trace.lp[pid], 'b-', linewidth=2, label='LP Staked')
+        ax.set_title(f'Pool {pid} (harvested {trace.harvested[pid]:,.0f} MEPI)')
+        ax.set_ylabel('LP Staked')
+        ax.grid(True, alpha=0.3)
+        rate = ax.twinx()
+        downsample.step(rate, dates, trace.rate[pid], 'r-', where='post', linewidth=1.5,
+                        label='Emission Rate')
+        rate.set_ylabel('MEPI per Second')
+        rate.set_ylim(bottom=0)
+        ax.tick_params(axis='x', labelrotation=30)
+        if pid == 0:
+            lines = ax.get_legend_handles_labels()
+            extra = rate.get_legend_handles_labels()
+            ax.legend(lines[0] + extra[0], lines[1] + extra[1], loc='upper left')
+    fig.suptitle('MemePi Farming Pools')
+    fig.tight_layout()
+    fig.savefig(os.path.join(output_dir, 'farming_pools.svg'), format='svg', bbox_inches='tight')
+    plt.close(fig)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Render the SVG tokenomics charts')
+    parser.add_argument('--transfers', help='chain_store transfers directory to plot supply from')
+    parser.add_argument('--events', help='event file aggregated incrementally by event_aggregator')
+    parser.add_argument('--holders', help='chain_store holders directory for the governance chart')
+    parser.add_argument('--from-block', type=int, default=None)
+    parser.add_argument('--to-block', type=int, default=None)
+    parser.add_argument('--snapshot-time', type=int, default=None)
+    parser.add_argument('--amm', action='store_true',
+                        help='overlay simulated constant-product pool impact on the price chart')
+    instrumentation.add_arguments(parser)
+    svg_optimizer.add_arguments(parser)
+    args = parser.parse_args()
+    report = instrumentation.from_args(args, 'tokenomics_visualizer', output_dir)
+    svg_optimizer.from_args(args)
+
+    series = None
+    if args.transfers:
+        transfers = chain_store.ColumnStore(args.transfers)
+        series = chain_store.supply_series(
+            transfers, transfers.select(block=(args.from_block, args.to_block)))
+    elif args.events:
+        aggregator = event_aggregator.Aggregator(args.events.rstrip('/') + '.aggregate.npz')
+        aggregator.update(args.events)
+        series = aggregator.series()[:3]
+
     # Generate all visualizations
-    plot_supply_dynamics()
-    plot_price_impact()
-    plot_governance_weight()
-    plot_burn_distribution()
-    plot_transaction_rate()
+    report.run(plot_supply_dynamics, series)
+    report.run(plot_price_impact, amm_simulator.empirical_impact() if args.amm else None)
+    report.run(plot_governance_weight)
+    report.run(plot_burn_distribution, series)
+    report.run(plot_transaction_rate)
+    rate_limits = None
+    if args.transfers:
+        rate_limits = rate_limit_engine.replay_store(
+            transfers, transfers.select(block=(args.from_block, args.to_block)))
+    report.run(plot_rate_limit_rejections, rate_limits)
+
+    # One Monte Carlo run feeds both fan charts
+    result = monte_carlo.run(monte_carlo.LogNormal(model.INITIAL_SUPPLY / 50), paths=10000)
+    report.run(plot_supply_fan_chart, result)
+    report.run(plot_burn_fan_chart, result)
+
+    # Staking chart family, from one synthetic replay
+    trace = _staking_trace()
+    report.run(plot_staking_rewards, trace)
+    report.run(plot_nft_tiers, trace)
+    report.run(plot_staking_reward_distribution, trace)
+
+    # Farming charts, from one synthetic replay
+    farm = _farm_trace()
+    report.run(plot_farming_emissions, farm)
+    report.run(plot_farming_apr, farm)
+    report.run(plot_farming_pools, farm)
+
+    if args.holders:
+        holders = chain_store.ColumnStore(args.holders)
+        report.run(plot_governance_concentration,
+                   chain_store.holder_table(holders, args.snapshot_time))
+
+    report.finish()
+    svg_optimizer.finish()
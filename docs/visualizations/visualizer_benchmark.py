@@ -0,0 +1,376 @@
+import argparse
+import datetime
+import functools
+import inspect
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+import animation_engine
+import annotated_visualizer
+import chain_store
+import event_aggregator
+import farming_simulator
+import governance_engine
+import instrumentation
+import monte_carlo
+import rate_limit_engine
+import staking_simulator
+import static_visualizer
+import streaming_writer
+import supply_simulator
+import tokenomics_animator
+import tokenomics_model as model
+import tokenomics_visualizer
+
+# Per-stage timings for every create_*, plot_* and animate_* function.
+#
+# Each target runs in a fresh process, so model caches start cold and peak
+# RSS belongs to that target alone. Inside the run four stages are timed:
+#
+#   compute  calls into the model and simulator modules
+#   artists  everything else up to savefig (figure setup, tight_layout)
+#   draw     an Agg canvas draw, per dpi
+#   encode   savefig minus that draw, per dpi; for SVG the whole savefig,
+#            since the vector backend draws while it writes
+#
+# Animations split the same way: draw is producing each frame, encode is
+# the streaming writer. Nothing is written next to the real artifacts.
+
+SCRIPTS = {
+    'static': static_visualizer,
+    'annotated': annotated_visualizer,
+    'visualizer': tokenomics_visualizer,
+    'animator': tokenomics_animator,
+}
+PREFIXES = ('create_', 'plot_', 'animate_')
+COMPUTE_MODULES = (model, monte_carlo, staking_simulator, farming_simulator, rate_limit_engine,
+                   governance_engine, chain_store, event_aggregator, supply_simulator)
+# Targets that need an argument get one built here; building it counts as compute
+INPUTS = {
+    'visualizer.plot_governance_concentration':
+        lambda: (governance_engine.synthetic_holders(1_000_000),),
+}
+DPIS = [100, 300]
+ANIMATION_FRAMES = 10
+HISTORY_NAME = '.benchmark_history.jsonl'
+THRESHOLD = 0.10
+MIN_DELTA = 0.005  # seconds; smaller changes are timer noise
+
+
+def targets():
+    """Qualified names of every benchmarked function, in script order"""
+    names = []
+    for label, module in SCRIPTS.items():
+        for name, func in vars(module).items():
+            if (name.startswith(PREFIXES) and inspect.isfunction(func)
+                    and func.__module__ == module.__name__):
+                names.append(f'{label}.{name}')
+    return names
+
+
+def _time_compute(stages):
+    """Route every public model/simulator function through the compute stage"""
+    for module in COMPUTE_MODULES:
+        for name, func in list(vars(module).items()):
+            if name.startswith('_') or not inspect.isfunction(func) \
+                    or func.__module__ != module.__name__:
+                continue
+
+            def timed(*args, _func=func, **kwargs):
+                with stages.stage('compute'):
+                    return _func(*args, **kwargs)
+            setattr(module, name, functools.wraps(func)(timed))
+
+
+def _measure_savefig(stages, dpis, draw, encode, sizes):
+    """Replace Figure.savefig with per-dpi draw/encode measurements that write nothing"""
+    original = Figure.savefig
+
+    def savefig(fig, fname, **kwargs):
+        kwargs.pop('dpi', None)
+        fmt = kwargs.pop('format', None) or os.path.splitext(str(fname))[1][1:] or 'png'
+        with stages.stage('measure'):
+            original_dpi = fig.dpi
+            for dpi in (dpis if fmt != 'svg' else dpis[:1]):
+                fig.set_dpi(dpi)
+                start = time.perf_counter()
+                fig.canvas.draw()
+                drawn = time.perf_counter() - start
+                buffer = io.BytesIO()
+                start = time.perf_counter()
+                original(fig, buffer, format=fmt, dpi=dpi, **kwargs)
+                saved = time.perf_counter() - start
+                draw[dpi] += drawn
+                encode[dpi] += saved if fmt == 'svg' else max(saved - drawn, 0.0)
+                sizes[dpi] += buffer.tell()
+            fig.set_dpi(original_dpi)
+    Figure.savefig = savefig
+
+
+def _measure_animation(stages, dpis, draw, encode, sizes, workdir):
+    """Replace animation_engine.save with a per-dpi frame/encoder split"""
+    def save(scene, path, fps=20, dpi=None, fmt=None):
+        with stages.stage('measure'):
+            for dpi in dpis:
+                target = os.path.join(workdir, f'{dpi}_{os.path.basename(path)}')
+                writer = streaming_writer.open_writer(target, fps, fmt)
+                frames = animation_engine.iter_frames(scene, dpi)
+                while True:
+                    start = time.perf_counter()
+                    rgba = next(frames, None)
+                    draw[dpi] += time.perf_counter() - start
+                    if rgba is None:
+                        break
+                    start = time.perf_counter()
+                    writer.write(rgba)
+                    encode[dpi] += time.perf_counter() - start
+                start = time.perf_counter()
+                writer.close()
+                encode[dpi] += time.perf_counter() - start
+                sizes[dpi] += os.path.getsize(target)
+    animation_engine.save = save
+
+
+def run_target(name, dpis, repeat=3, frames=ANIMATION_FRAMES):
+    """Run one target in this process; returns its stage timings (best of repeat)"""
+    label, func_name = name.split('.')
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    best = None
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(repeat):
+            model.clear_cache()
+            stages = instrumentation.Stages()
+            draw, encode, sizes = defaultdict(float), defaultdict(float), defaultdict(int)
+            _time_compute(stages)
+            func = getattr(SCRIPTS[label], func_name)
+            if func_name.startswith('animate_'):
+                _measure_animation(stages, dpis, draw, encode, sizes, workdir)
+                kwargs = {'output': os.path.join(workdir, f'{func_name}.gif'),
+                          'num_frames': frames}
+            else:
+                _measure_savefig(stages, dpis, draw, encode, sizes)
+                kwargs = {'workers': 1} if func_name.startswith('create_') else {}
+            try:
+                with stages.stage('artists'):
+                    args = ()
+                    if name in INPUTS:
+                        with stages.stage('compute'):
+                            args = INPUTS[name]()
+                    func(*args, **kwargs)
+            finally:
+                _restore()
+                plt.close('all')
+            result = {
+                'compute': stages.totals['compute'],
+                'artists': stages.totals['artists'],
+                'draw': {str(dpi): draw[dpi] for dpi in draw},
+                'encode': {str(dpi): encode[dpi] for dpi in encode},
+                'bytes': {str(dpi): sizes[dpi] for dpi in sizes},
+            }
+            result['total'] = (result['compute'] + result['artists'] +
+                               sum(result['draw'].values()) + sum(result['encode'].values()))
+            best = result if best is None else _best(best, result)
+    best['peak_rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    best['baseline_rss'] = baseline_rss
+    return best
+
+
+_ORIGINALS = {}
+
+
+def _remember():
+    """Snapshot everything the measurement hooks replace"""
+    _ORIGINALS['savefig'] = Figure.savefig
+    _ORIGINALS['save'] = animation_engine.save
+    _ORIGINALS['compute'] = [(module, dict(vars(module))) for module in COMPUTE_MODULES]
+
+
+def _restore():
+    Figure.savefig = _ORIGINALS['savefig']
+    animation_engine.save = _ORIGINALS['save']
+    for module, namespace in _ORIGINALS['compute']:
+        for name, value in namespace.items():
+            if getattr(module, name, None) is not value:
+                setattr(module, name, value)
+
+
+def _best(a, b):
+    """Stage-wise minimum of two runs"""
+    merged = {}
+    for key, value in a.items():
+        if isinstance(value, dict):
+            merged[key] = {k: min(v, b[key].get(k, v)) for k, v in value.items()}
+        else:
+            merged[key] = min(value, b[key])
+    merged['bytes'] = a['bytes']
+    return merged
+
+
+def measure(name, dpis, repeat, frames):
+    """Benchmark one target in a fresh interpreter"""
+    with tempfile.NamedTemporaryFile('r', suffix='.json') as result:
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--child', name,
+                        result.name, ','.join(map(str, dpis)), str(repeat), str(frames)],
+                       check=True, stdout=subprocess.DEVNULL)
+        return json.load(result)
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def flatten(results):
+    """{'target/metric': value} for every timed stage and peak RSS"""
+    flat = {}
+    for name, result in results.items():
+        for key in ('compute', 'artists', 'total', 'peak_rss'):
+            flat[f'{name}/{key}'] = result[key]
+        for key in ('draw', 'encode'):
+            for dpi, value in result[key].items():
+                flat[f'{name}/{key}@{dpi}'] = value
+    return flat
+
+
+def _pick(history, ref):
+    """A history entry by index (-1 is the latest run) or by label"""
+    try:
+        return history[int(ref)]
+    except ValueError:
+        matches = [entry for entry in history if entry.get('label') == ref]
+        if not matches:
+            raise SystemExit(f'no benchmark run labelled {ref!r}')
+        return matches[-1]
+
+
+def compare(base, head, threshold=THRESHOLD, min_delta=MIN_DELTA):
+    """(metric, base, head, ratio) for every metric that got worse by more than threshold"""
+    before, after = flatten(base['results']), flatten(head['results'])
+    regressions = []
+    for metric, old in before.items():
+        new = after.get(metric)
+        if new is None or old <= 0:
+            continue
+        noise = min_delta if not metric.endswith('_rss') else 0
+        if new > old * (1 + threshold) and new - old > noise:
+            regressions.append((metric, old, new, new / old))
+    return regressions
+
+
+def _format(metric, value):
+    return f'{value / 2**20:.1f} MiB' if metric.endswith('_rss') else f'{value * 1000:.1f} ms'
+
+
+def print_results(results):
+    dpis = sorted({dpi for result in results.values() for dpi in result['draw']}, key=float)
+    header = f"{'target':<48}{'compute':>9}{'artists':>9}"
+    header += ''.join(f'{"draw@" + d:>10}{"enc@" + d:>10}' for d in dpis)
+    print(header + f"{'total':>9}{'RSS MiB':>9}")
+    for name, result in results.items():
+        row = f"{name:<48}{result['compute'] * 1000:>9.1f}{result['artists'] * 1000:>9.1f}"
+        for dpi in dpis:
+            for stage in ('draw', 'encode'):
+                value = result[stage].get(dpi)
+                row += f'{value * 1000:>10.1f}' if value is not None else f"{'-':>10}"
+        print(row + f"{result['total'] * 1000:>9.1f}{result['peak_rss'] / 2**20:>9.1f}")
+    print('(milliseconds)')
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        name, path, dpis, repeat, frames = sys.argv[2:7]
+        _remember()
+        result = run_target(name, [int(dpi) for dpi in dpis.split(',')],
+                            int(repeat), int(frames))
+        with open(path, 'w') as f:
+            json.dump(result, f)
+        sys.exit(0)
+
+    default_history = os.path.join(os.path.dirname(os.path.abspath(__file__)), HISTORY_NAME)
+    parser = argparse.ArgumentParser(
+        description='Per-stage benchmark of the create_*, plot_* and animate_* functions')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help='benchmark the targets and append to the history')
+    run.add_argument('targets', nargs='*', help='substrings of target names (default: all)')
+    run.add_argument('--dpi', type=int, nargs='+', default=DPIS)
+    run.add_argument('--repeat', type=int, default=3, help='runs per target; the best is kept')
+    run.add_argument('--frames', type=int, default=ANIMATION_FRAMES,
+                     help='frames per animation')
+    run.add_argument('--label', help='name for this run, usable with compare')
+    run.add_argument('--history', default=default_history)
+    run.add_argument('--list', action='store_true', help='print the target names and exit')
+    cmp = commands.add_parser('compare', help='flag regressions between two recorded runs')
+    cmp.add_argument('base', nargs='?', default='-2', help='index or label (default: -2)')
+    cmp.add_argument('head', nargs='?', default='-1', help='index or label (default: -1)')
+    cmp.add_argument('--threshold', type=float, default=THRESHOLD,
+                     help=f'relative slowdown that counts as a regression (default: {THRESHOLD})')
+    cmp.add_argument('--min-delta', type=float, default=MIN_DELTA,
+                     help=f'ignore timing changes below this many seconds (default: {MIN_DELTA})')
+    cmp.add_argument('--history', default=default_history)
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        names = [name for name in targets()
+                 if not args.targets or any(part in name for part in args.targets)]
+        if args.list:
+            print('\n'.join(names))
+            sys.exit(0)
+        results = {}
+        for name in names:
+            print(f'benchmarking {name}...', flush=True)
+            results[name] = measure(name, args.dpi, args.repeat, args.frames)
+        entry = {
+            'time': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'label': args.label,
+            'commit': _commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'matplotlib': matplotlib.__version__,
+            'machine': f'{platform.system()} {platform.machine()} ({os.cpu_count()} cpus)',
+            'dpis': args.dpi,
+            'repeat': args.repeat,
+            'frames': args.frames,
+            'results': results,
+        }
+        with open(args.history, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+        print_results(results)
+        print(f'appended to {args.history}')
+    else:
+        history = load_history(args.history)
+        if len(history) < 2:
+            raise SystemExit(f'need two runs in {args.history} to compare')
+        base, head = _pick(history, args.base), _pick(history, args.head)
+        regressions = compare(base, head, args.threshold, args.min_delta)
+        print(f"comparing {base['time']} ({base.get('label') or base.get('commit')}) -> "
+              f"{head['time']} ({head.get('label') or head.get('commit')})")
+        for metric, old, new, ratio in regressions:
+            print(f'  REGRESSION {metric:<60} {_format(metric, old):>12} -> '
+                  f'{_format(metric, new):>12} (+{ratio - 1:.0%})')
+        print(f'{len(regressions)} regression(s) beyond {args.threshold:.0%}')
+        sys.exit(1 if regressions else 0)
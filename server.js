@@ -1,9 +1,12 @@
 const express = require('express');
 const path = require('path');
 const cors = require('cors');
+const http = require('http');
 
 const app = express();
 const PORT = process.env.PORT || 3000;
+// Warm chart renderer: python docs/visualizations/render_server.py
+const RENDER_SERVICE = process.env.RENDER_SERVICE || 'http://127.0.0.1:8765';
 
 // Enable CORS for all routes
 app.use(cors());
@@ -26,6 +29,21 @@ app.get('/api/tokenomics', (req, res) => {
     });
 });
 
+// Fresh charts from the render service, e.g. /api/chart/price_impact?current_volume=2.5
+app.get('/api/chart/:chart', (req, res) => {
+    const target = new URL(`/render/${encodeURIComponent(req.params.chart)}`, RENDER_SERVICE);
+    for (const [key, value] of Object.entries(req.query)) {
+        target.searchParams.set(key, value);
+    }
+    http.get(target, (upstream) => {
+        res.status(upstream.statusCode);
+        res.set('Content-Type', upstream.headers['content-type']);
+        upstream.pipe(res);
+    }).on('error', () => {
+        res.status(503).json({ error: 'render service unavailable' });
+    });
+});
+
 // Handle all other routes by serving index.html (for SPA)
 app.get('*', (req, res) => {
     res.sendFile(path.join(__dirname, 'docs', 'index.html'));